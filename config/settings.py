@@ -20,6 +20,59 @@ DATABASE_URL = (
     f"postgresql://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}"
 )
 
+# Connection pool shared by every session of the process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True") == "True"
+
+# Local memory-mapped OHLC cache in front of get_stock_data
+OHLC_CACHE_ENABLED = os.getenv("OHLC_CACHE_ENABLED", "True") == "True"
+OHLC_CACHE_DIR = os.getenv("OHLC_CACHE_DIR", ".cache/ohlc")
+
+# OHLC table layout: 'legacy' (ohlc_data) or 'timeseries' (partitioned ohlc_bars, see src/database/timeseries.py)
+OHLC_STORAGE = os.getenv("OHLC_STORAGE", "legacy")
+OHLC_PARTITION_INTERVAL = os.getenv("OHLC_PARTITION_INTERVAL", "year")  # 'year' or 'month' (dense intraday)
+
+# Alpha Vantage HTTP client
+ALPHA_VANTAGE_BASE_URL = os.getenv("ALPHA_VANTAGE_BASE_URL", "https://www.alphavantage.co/query")
+ALPHA_VANTAGE_REQUESTS_PER_MINUTE = float(os.getenv("ALPHA_VANTAGE_REQUESTS_PER_MINUTE", "5"))  # plan quota
+ALPHA_VANTAGE_MAX_WORKERS = int(os.getenv("ALPHA_VANTAGE_MAX_WORKERS", "8"))  # concurrent requests in flight
+ALPHA_VANTAGE_TIMEOUT = float(os.getenv("ALPHA_VANTAGE_TIMEOUT", "30"))  # seconds per request
+ALPHA_VANTAGE_MAX_RETRIES = int(os.getenv("ALPHA_VANTAGE_MAX_RETRIES", "3"))
+
+# A trading day's bars count as final (and fetched) once this local time has passed on the exchange
+MARKET_TIMEZONE = os.getenv("MARKET_TIMEZONE", "America/New_York")
+MARKET_SETTLED_TIME = os.getenv("MARKET_SETTLED_TIME", "18:00")  # two hours after the 16:00 close
+
+# Market data providers, in order of preference; the next one is fired when the previous one
+# has not answered within the hedge budget, or failed
+DATA_PROVIDERS = [name.strip() for name in os.getenv("DATA_PROVIDERS", "alpha_vantage,yahoo").split(",") if name.strip()]
+PROVIDER_HEDGE_BUDGET = float(os.getenv("PROVIDER_HEDGE_BUDGET", "2.0"))  # seconds
+
+# Parsed-query cache in front of the local parser and the LLM
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))  # seconds; entries also expire at midnight
+
+# In-process memo of backtest results (also persisted in the backtest_cache table)
+BACKTEST_MEMO_SIZE = int(os.getenv("BACKTEST_MEMO_SIZE", "256"))
+
+# Monte Carlo / bootstrap confidence intervals computed for each new backtest (0 paths disables them)
+ROBUSTNESS_PATHS = int(os.getenv("ROBUSTNESS_PATHS", "10000"))
+ROBUSTNESS_CONFIDENCE = float(os.getenv("ROBUSTNESS_CONFIDENCE", "0.95"))
+
+# Indicator arrays shared by charts and backtests, keyed by series fingerprint, indicator and parameters
+INDICATOR_CACHE_SIZE = int(os.getenv("INDICATOR_CACHE_SIZE", "512"))
+
+# Background analysis pipeline of the app: shared workers, process-wide memo of fetched bars
+# (backtest results are memoized on the bars' fingerprint) and each session's own runs (an identical
+# query reuses its run)
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+PIPELINE_CACHE_SIZE = int(os.getenv("PIPELINE_CACHE_SIZE", "64"))
+PIPELINE_DATA_TTL = float(os.getenv("PIPELINE_DATA_TTL", "300"))  # seconds
+PIPELINE_SESSION_TTL = float(os.getenv("PIPELINE_SESSION_TTL", "600"))  # seconds
+
 # Other settings
 DEBUG = os.getenv("DEBUG", "False") == "True"
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
\ No newline at end of file
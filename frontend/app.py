@@ -6,6 +6,7 @@ import os
 import pandas as pd
 import requests
 import sys
+import time
 from pathlib import Path
 import plotly.express as px
 from typing import Optional
@@ -31,12 +32,50 @@ sys.path.append(str(ROOT_DIR))
 logger.info(f"Added {ROOT_DIR} to Python path")
 
 
-from config.settings import OPENAI_API_KEY, DATABASE_URL
+from config.settings import OPENAI_API_KEY, DATABASE_URL, PIPELINE_CACHE_SIZE, PIPELINE_SESSION_TTL
 from src.database.operations import DatabaseOperations
+from src.database.engine import pool_stats
 from src.agents.query_parser import QueryParser
 from src.agents.data_fetcher import DataFetcher
 from frontend.styles.trading_theme import load_trading_theme
-
+from frontend.components.charts import display_price_chart, display_table
+from src.agents.pipeline import STAGES, AnalysisPipeline, PipelineRun, TTLCache
+
+# Seconds between two looks at a running pipeline
+POLL_INTERVAL = 0.1
+STAGE_LABELS = {
+    'parse': 'Interpretando la consulta',
+    'fetch': 'Obteniendo datos',
+    'indicators': 'Calculando indicadores',
+    'backtest': 'Ejecutando el backtest',
+}
+
+
+@st.cache_resource
+def get_query_parser() -> QueryParser:
+    """One QueryParser (and OpenAI client) shared by every session of this process"""
+    logger.info("Initializing QueryParser with OpenAI API")
+    return QueryParser()
+
+@st.cache_resource
+def get_database_operations() -> DatabaseOperations:
+    """One DatabaseOperations over the process-wide pooled engine"""
+    return DatabaseOperations()
+
+@st.cache_resource
+def get_data_fetcher() -> DataFetcher:
+    return DataFetcher(get_database_operations())
+
+@st.cache_resource
+def get_pipeline() -> AnalysisPipeline:
+    """Background pipeline and its process-wide data/result memo, shared by every session"""
+    return AnalysisPipeline(get_query_parser(), get_data_fetcher(), get_database_operations())
+
+def get_session_runs() -> TTLCache:
+    """This session's pipeline runs by query"""
+    if 'pipeline_runs' not in st.session_state:
+        st.session_state['pipeline_runs'] = TTLCache(PIPELINE_CACHE_SIZE, PIPELINE_SESSION_TTL)
+    return st.session_state['pipeline_runs']
 
 def initialize_llm() -> Optional[QueryParser]:
     try:
@@ -45,8 +84,7 @@ def initialize_llm() -> Optional[QueryParser]:
             st.error("OpenAI API key not found")
             return None
         
-        logger.info("Initializing QueryParser with OpenAI API")
-        parser = QueryParser()
+        parser = get_query_parser()
         logger.info("QueryParser initialized successfully")
         return parser
     except Exception as e:
@@ -64,18 +102,16 @@ def main():
     if parser is None:
         st.stop()
 
-    # Initialize database operations
+    # Check out one pooled connection (shared across sessions), so an unreachable database shows up here
     try:
-        db_ops = DatabaseOperations()
-        logger.info("Database operations initialized successfully")
+        with get_database_operations().engine.connect():
+            pass
+        logger.info(f"Database connection checked. Pool stats: {pool_stats()}")
     except Exception as e:
         logger.error(f"Failed to initialize database: {str(e)}")
         st.error("Failed to connect to database")
         st.stop()
 
-    # Initialize DataFetcher
-    fetcher = DataFetcher(db_ops)
-
     # Layout and input
     col1, col2, col3 = st.columns([1,3,1])
     with col2:
@@ -92,85 +128,91 @@ def main():
         if not query.strip():
             st.warning("Por favor, ingrese una consulta válida.")
             st.stop()
+        # Kept across reruns, so paging through the data table does not clear the results
+        st.session_state['active_query'] = query
 
+    active_query = st.session_state.get('active_query')
+    if active_query:
+        # Runs in the background; an identical query reuses this session's run (finished or in flight)
+        run = get_pipeline().submit(active_query, get_session_runs())
         try:
-            # Parse query
-            parsed_query = parser.parse_query(query)
-            logger.info(f"Parsed query: {parsed_query}")
-            
-            # Fetch data
-            data = fetcher.fetch_data(parsed_query)
-            
-            if data is not None and not data.empty:
-                st.success("Datos obtenidos exitosamente")
-                
-                # Display data
-                with st.expander("Ver datos"):
-                    st.dataframe(data)
-                
-                # Calculate SMAs
-                data['SMA_10'] = data['close_price'].rolling(window=10).mean()
-                data['SMA_20'] = data['close_price'].rolling(window=20).mean()
-                
-                # Create price chart with SMAs
-                fig = px.line(
-                    data,
-                    x='bar_date',
-                    y=['close_price', 'SMA_10', 'SMA_20'],
-                    labels={
-                        'bar_date': 'Fecha',
-                        'value': 'Precio',
-                        'variable': 'Indicador',
-                        'close_price': 'Precio',
-                        'SMA_10': 'Media Móvil 10',
-                        'SMA_20': 'Media Móvil 20'
-                    },
-                    title=f'Precios de {parsed_query["ticker"].upper()}'
-                )
-                st.plotly_chart(fig)
-
-                # Run backtest
-                from src.backtesting.two_sma import run_two_sma_backtest
-                logger.info("Executing the Two-SMA backtest")
-                ticker = parsed_query["ticker"]
-                try:
-                    #result, buy_hold_return_pct = run_two_sma_backtest(data, db_ops, ticker)
-                    result = run_two_sma_backtest(data, db_ops, ticker)
-                    st.success("Backtest completado correctamente. Resultados almacenados en la base de datos.")
-
-                    # Display backtest results
-                    st.write("### Resultados del Backtest")
-                    st.write(result)
-
-                    #st.write("### Gráficos del Backtest")
-                    #st.write(bt.plot(),unsafe_allow_html=True)
-
-                    # Display backtest plots
-                    #st.write("### Gráficos del Backtest")
-                    #try:
-                        # Use a default style that's guaranteed to exist    
-                        #plt.style.use('default')
-
-                        # Create figure with larger size
-                        #plt.figure(figsize=(12, 8))
-
-                        #fig_backtest = result.plot()
-                        #st.pyplot(fig_backtest, clear_figure=True)
-
-                    #except Exception as e:
-                        #logger.error(f"Error generating backtest plot: {str(e)}")
-                        #st.error("No se pudo generar el gráfico del backtest")
-
-                except Exception as e:
-                    logger.error(f"Error processing backtest: {str(e)}")
-                    st.error(f"Hubo un error ejecutando el backtest: {str(e)}")
-
-            else:
-                st.warning("No se encontraron datos para esta consulta.")
-                
-        except Exception as e:
-            logger.error(f"Error processing query: {str(e)}")
-            st.error(f"Error al procesar la consulta: {str(e)}")
+            render_run(run)
+        finally:
+            logger.info(f"Database pool stats: {pool_stats()}. Pipeline caches: {get_pipeline().cache_stats()}")
+
+def render_run(run: PipelineRun):
+    """Render each stage of the run as soon as it is done, polling the background worker"""
+    progress = st.progress(0.0)
+    rendered = set()
+    while True:
+        for stage in STAGES:
+            if not run.done(stage):
+                break
+            if stage not in rendered:
+                rendered.add(stage)
+                if not render_stage(run, stage):
+                    progress.empty()
+                    return
+        pending = [STAGE_LABELS[stage] for stage in STAGES if not run.done(stage)]
+        if not pending:
+            progress.empty()
+            return
+        progress.progress(run.progress, text=f"{pending[0]}...")
+        time.sleep(POLL_INTERVAL)
+
+def render_stage(run: PipelineRun, stage: str) -> bool:
+    """Show one finished stage; returns False when there is nothing more to show"""
+    status = run.stages[stage]['status']
+    if status == 'skipped':
+        return False
+    if status == 'failed':
+        error = run.stages[stage]['error']
+        if stage == 'backtest':
+            st.error(f"Hubo un error ejecutando el backtest: {str(error)}")
+        else:
+            st.error(f"Error al procesar la consulta: {str(error)}")
+        return False
+
+    if stage == 'fetch':
+        data = run.result('fetch')
+        if data is None or data.empty:
+            st.warning("No se encontraron datos para esta consulta.")
+            return False
+        st.success("Datos obtenidos exitosamente")
+        # Display data, one page at a time
+        with st.expander("Ver datos"):
+            display_table(data)
+
+    elif stage == 'indicators':
+        # Price chart with SMAs (memoized: the backtest reuses the same arrays), downsampled to the chart width
+        data = run.result('fetch')
+        indicators = run.result('indicators')
+        display_price_chart(
+            data,
+            {
+                'Precio': data['close_price'].to_numpy(dtype=float),
+                'Media Móvil 10': indicators['SMA_10'],
+                'Media Móvil 20': indicators['SMA_20']
+            },
+            title=f'Precios de {run.result("parse")["ticker"].upper()}'
+        )
+
+    elif stage == 'backtest':
+        result = run.result('backtest')
+        # Repeats of a backtest are served from the memo or the database, so nothing is written every time
+        st.success("Backtest completado correctamente.")
+
+        # Display backtest results
+        st.write("### Resultados del Backtest")
+        st.write(result)
+
+        if result.get('_robustness') is not None:
+            st.write("### Intervalos de confianza (bootstrap)")
+            st.dataframe(result['_robustness'])
+
+        st.caption(" · ".join(f"{STAGE_LABELS[name]}: {state['seconds']:.2f}s"
+                              for name, state in run.stages.items() if state['seconds'] is not None))
+    return True
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
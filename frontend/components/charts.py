@@ -1,8 +1,65 @@
 # frontend/components/charts.py
+from typing import Dict, Optional
+import numpy as np
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
+from frontend.components.downsampling import downsample_indices
 
-def display_chart(data: pd.DataFrame, column: str = "close"):
-    fig = px.line(data, x='date', y=column, title=f'{column.capitalize()} Over Time')
-    st.plotly_chart(fig)
\ No newline at end of file
+# Width the charts are downsampled for; Streamlit does not report the real one
+CHART_WIDTH_PX = 1200
+TABLE_PAGE_SIZE = 500
+
+
+def bar_timestamps(data: pd.DataFrame) -> np.ndarray:
+    """datetime64 bar times of a get_stock_data frame (bar_date/bar_time columns) or a typed one (index)"""
+    if 'bar_date' not in data.columns:
+        return data.index.to_numpy(dtype='datetime64[ns]')
+    timestamps = pd.to_datetime(data['bar_date'].astype(str))
+    if 'bar_time' in data.columns:
+        timestamps = timestamps + pd.to_timedelta(data['bar_time'].astype(str))
+    return timestamps.to_numpy(dtype='datetime64[ns]')
+
+
+def line_figure(timestamps: np.ndarray, series: Dict[str, np.ndarray], title: str, primary: Optional[str] = None,
+                width_px: int = CHART_WIDTH_PX, method: str = 'minmax_lttb', y_title: str = 'Precio') -> go.Figure:
+    """
+    WebGL line chart of several series sharing one time axis, with at most ~2 points per pixel.
+
+    Points are picked on the `primary` series (the first one by default) and reused for the others,
+    so overlays such as moving averages stay aligned with it. Payload and render time depend on
+    `width_px`, not on the number of bars.
+    """
+    primary = primary or next(iter(series))
+    x = np.asarray(timestamps, dtype='datetime64[ns]')
+    keep = downsample_indices(x.view(np.int64), np.asarray(series[primary], dtype=np.float64), width_px, method)
+    fig = go.Figure()
+    for name, values in series.items():
+        fig.add_trace(go.Scattergl(x=x[keep], y=np.asarray(values, dtype=np.float64)[keep], mode='lines', name=name))
+    fig.update_layout(title=title, xaxis_title='Fecha', yaxis_title=y_title, legend_title='Indicador')
+    if len(keep) < len(x):
+        fig.add_annotation(text=f"{len(keep):,} de {len(x):,} barras", showarrow=False,
+                           xref='paper', yref='paper', x=1, y=1.05, xanchor='right')
+    return fig
+
+
+def display_chart(data: pd.DataFrame, column: str = "close_price"):
+    fig = line_figure(bar_timestamps(data), {column: data[column].to_numpy(dtype=float)},
+                      title=f'{column.capitalize()} Over Time')
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def display_price_chart(data: pd.DataFrame, series: Dict[str, np.ndarray], title: str):
+    """Downsampled WebGL chart of `series` (label -> values aligned with the rows of `data`)"""
+    st.plotly_chart(line_figure(bar_timestamps(data), series, title), use_container_width=True)
+
+
+def display_table(data: pd.DataFrame, key: str = 'data_table', page_size: int = TABLE_PAGE_SIZE):
+    """Show one page of `data` at a time; only the selected page is sent to the browser"""
+    n_pages = max(-(-len(data) // page_size), 1)
+    page = 1
+    if n_pages > 1:
+        page = int(st.number_input(f"Página (de {n_pages:,})", min_value=1, max_value=n_pages, value=1, key=key))
+    start = (page - 1) * page_size
+    st.dataframe(data.iloc[start:start + page_size])
+    st.caption(f"Filas {start + 1:,}-{min(start + page_size, len(data)):,} de {len(data):,}")
@@ -1,19 +1,25 @@
 # src/agents/data_fetcher.py
-from typing import Dict, Optional
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 import logging
-from src.database.operations import DatabaseOperations
-from src.api.alpha_vantage import fetch_alpha_vantage_data  # Ensure this is correctly implemented
+from src.database.operations import DatabaseOperations, ROLLUP_PERIODS, ROLLUP_SOURCE_TIMEFRAME
+from src.api.alpha_vantage import INTRADAY_TIMEFRAMES, get_client, intraday_months
+from src.api.providers import fetch_market_data, get_hedged_fetcher
+from src.utils.data_helpers import last_completed_session, missing_intervals
 
 logger = logging.getLogger(__name__)
 
+# Alpha Vantage 'compact' output holds the latest 100 daily bars, roughly 140 calendar days
+COMPACT_WINDOW_DAYS = 140
+
 class DataFetcher:
     def __init__(self, db_ops: DatabaseOperations):
         logger.info("Initializing DataFetcher")
         self.db_ops = db_ops
 
     def fetch_data(self, query_params: Dict[str, str]) -> Optional[pd.DataFrame]:
-        """Fetches data based on query parameters, either from DB or API"""
+        """Fetches data based on query parameters, downloading only the date intervals missing from the DB"""
         ticker = query_params.get("ticker")
         start_date = query_params.get("start_date")
         end_date = query_params.get("end_date")
@@ -22,32 +28,139 @@ class DataFetcher:
         logger.info(f"Fetching data for ticker: {ticker}, timeframe: {timeframe}, dates: {start_date} to {end_date}")
 
         try:
-            # Attempt to retrieve data from the database
-            data = self.db_ops.get_stock_data(ticker, start_date, end_date, timeframe)
+            start, end = self.resolve_range(start_date, end_date)
+
+            # Weekly/monthly bars are rolled up in the database from daily bars, so only daily data is
+            # ever downloaded, from the start of the first requested period
+            source_timeframe = timeframe
+            fetch_start = start
+            if timeframe in ROLLUP_PERIODS:
+                source_timeframe = ROLLUP_SOURCE_TIMEFRAME
+                fetch_start = self._period_start(start, timeframe)
+
+            # Work out which parts of the range have never been fetched. Days after the last settled
+            # session (weekends, today before the close) have no final bars yet, so they are never gaps
+            gaps = missing_intervals(fetch_start, min(end, last_completed_session()),
+                                     self.db_ops.get_coverage(ticker, source_timeframe))
+            if gaps and timeframe in INTRADAY_TIMEFRAMES:
+                logger.info(f"Missing intervals in database: {gaps}. Fetching intraday month slices from API")
+                self._fill_intraday_gaps(ticker, timeframe, gaps)
+            elif gaps:
+                logger.info(f"Missing intervals in database: {gaps}. Fetching from API")
+                self._fill_gaps({**query_params, "timeframe": source_timeframe}, gaps)
+            else:
+                logger.info("Requested range fully covered by database")
+
+            data = self.db_ops.get_stock_data(ticker, start.isoformat(), end.isoformat(), timeframe)
+            if (data is None or data.empty) and timeframe in ROLLUP_PERIODS:
+                # Daily bars stored before rollups existed
+                self.db_ops.refresh_rollups(ticker, fetch_start, end, [timeframe])
+                data = self.db_ops.get_stock_data(ticker, start.isoformat(), end.isoformat(), timeframe)
             if data is not None and not data.empty:
-                logger.info("Data retrieved from database")
+                logger.info(f"Data retrieved from database. Rows: {len(data)}")
                 return data
-            
-            # If data not found, fetch from external API
-            logger.info("Data not found in database. Fetching from API")
-            api_data = fetch_alpha_vantage_data(query_params)
-            
-            if api_data is not None and not api_data.empty:
-                logger.info("Data fetched from API successfully")
-                
-                # Save fetched data to the database
-                self.db_ops.save_stock_data(api_data)
-                logger.info("Fetched data saved to database")
-                
-                data = self.db_ops.get_stock_data(ticker, start_date, end_date, timeframe)
-                if data is not None and not data.empty:
-                    logger.info("Data extracted from database after API fetch")
-                    return data
 
-            else:
-                logger.warning("No data returned from API")
-                return None
+            logger.warning("No data available for the requested range")
+            return None
 
         except Exception as e:
             logger.error(f"Error fetching data: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    @staticmethod
+    def _period_start(day: date, timeframe: str) -> date:
+        if timeframe == 'weekly':
+            return day - timedelta(days=day.weekday())
+        return day.replace(day=1)
+
+    def resolve_range(self, start_date: Optional[str], end_date: Optional[str]) -> Tuple[date, date]:
+        """Parse the query dates, defaulting to the year up to today when the parser left them empty"""
+        end = pd.Timestamp(end_date).date() if end_date else date.today()
+        start = pd.Timestamp(start_date).date() if start_date else end - timedelta(days=365)
+        return start, min(end, date.today())
+
+    def _fill_gaps(self, query_params: Dict[str, str], gaps: List[Tuple[date, date]]):
+        """Download the smallest provider output that covers every gap, save it and record its coverage"""
+        ticker = query_params["ticker"]
+        timeframe = query_params["timeframe"]
+        today = date.today()
+        first_gap = min(gap_start for gap_start, _ in gaps)
+        last_gap = max(gap_end for _, gap_end in gaps)
+
+        outputsize = 'full'
+        if timeframe == 'daily' and first_gap >= today - timedelta(days=COMPACT_WINDOW_DAYS):
+            outputsize = 'compact'
+
+        api_data = fetch_market_data({**query_params, "outputsize": outputsize})
+        if outputsize == 'compact' and not api_data.empty and api_data['bar_date'].min() > first_gap:
+            logger.info("Compact output does not reach the oldest gap. Fetching full history")
+            outputsize = 'full'
+            api_data = fetch_market_data({**query_params, "outputsize": outputsize})
+
+        if api_data is None or api_data.empty:
+            logger.warning("No data returned from API")
+            return
+
+        logger.info(f"Data fetched from API successfully ({outputsize}). Rows: {len(api_data)}. "
+                    f"Provider stats: {get_hedged_fetcher().provider_stats()}")
+        self.db_ops.save_stock_data(api_data)
+        logger.info("Fetched data saved to database")
+
+        first_bar = api_data['bar_date'].min()
+        last_bar = api_data['bar_date'].max()
+        # A full history has nothing before its first bar. Gaps stop at the last settled session, so
+        # sessions up to their end without a bar (holidays) are covered too
+        covered_from = min(first_bar, first_gap) if outputsize == 'full' else first_bar
+        covered_until = max(last_bar, last_gap)
+        self.db_ops.record_coverage(ticker, timeframe, covered_from, covered_until)
+
+    def _fill_intraday_gaps(self, ticker: str, timeframe: str, gaps: List[Tuple[date, date]]) -> int:
+        """
+        Download the intraday month slices overlapping the gaps and save each one before the next is
+        taken, so memory holds a few months of bars rather than the whole history. Returns bars received.
+        """
+        settled = last_completed_session()
+        months = sorted({month for gap_start, gap_end in gaps for month in intraday_months(gap_start, gap_end)})
+        received = 0
+        for month, arrays in get_client().fetch_intraday(ticker, timeframe, months):
+            if arrays is None:
+                logger.warning(f"No {timeframe} bars returned for {ticker} in {month}")
+                continue
+            self.db_ops.save_stock_data(arrays.to_table_frame())
+            # The slice is the whole month; its sessions after the last settled one may still be forming
+            month_start = pd.Timestamp(month).date()
+            covered_until = min((pd.Timestamp(month) + pd.offsets.MonthEnd(0)).date(), settled)
+            if covered_until >= month_start:
+                self.db_ops.record_coverage(ticker, timeframe, month_start, covered_until)
+            received += arrays.n_bars
+            logger.info(f"Saved {arrays.n_bars} {timeframe} bars of {ticker} for {month}")
+        return received
+
+    def backfill(self, tickers: List[str], timeframe: str = 'daily') -> Dict[str, int]:
+        """Download the full history of many tickers concurrently, saving each one as it arrives"""
+        settled = last_completed_session()
+        rows = {}
+        for ticker, api_data in get_client().fetch_many(tickers, timeframe):
+            if api_data.empty:
+                logger.warning(f"No data returned from API for {ticker}")
+                rows[ticker] = 0
+                continue
+            self.db_ops.save_stock_data(api_data)
+            self.db_ops.record_coverage(ticker, timeframe, api_data['bar_date'].min(),
+                                        max(api_data['bar_date'].max(), settled))
+            rows[ticker] = len(api_data)
+        logger.info(f"Backfilled {sum(rows.values())} bars for {len(rows)} tickers")
+        return rows
+
+    def backfill_intraday(self, tickers: List[str], timeframe: str, start_date: str,
+                          end_date: Optional[str] = None) -> Dict[str, int]:
+        """Download the missing intraday months of many tickers, one ticker at a time, month by month"""
+        if timeframe not in INTRADAY_TIMEFRAMES:
+            raise ValueError(f"Unsupported intraday timeframe '{timeframe}', expected one of {INTRADAY_TIMEFRAMES}")
+        start, end = self.resolve_range(start_date, end_date)
+        rows = {}
+        for ticker in tickers:
+            gaps = missing_intervals(start, min(end, last_completed_session()), self.db_ops.get_coverage(ticker, timeframe))
+            rows[ticker] = self._fill_intraday_gaps(ticker, timeframe, gaps) if gaps else 0
+        logger.info(f"Backfilled {sum(rows.values())} {timeframe} bars for {len(rows)} tickers")
+        return rows
@@ -0,0 +1,170 @@
+# src/agents/local_parser.py
+import logging
+import re
+from datetime import date, timedelta
+from typing import Dict, Optional, Set, Tuple
+from dateutil.relativedelta import relativedelta
+from src.agents.query_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Company names users type instead of the symbol (matched on the normalized query)
+TICKER_ALIASES = {
+    'apple': 'AAPL',
+    'microsoft': 'MSFT',
+    'google': 'GOOGL',
+    'alphabet': 'GOOGL',
+    'amazon': 'AMZN',
+    'tesla': 'TSLA',
+    'meta': 'META',
+    'facebook': 'META',
+    'nvidia': 'NVDA',
+    'netflix': 'NFLX',
+    'intel': 'INTC',
+    'amd': 'AMD',
+    'ibm': 'IBM',
+    'oracle': 'ORCL',
+    'coca cola': 'KO',
+    'coca-cola': 'KO',
+    'disney': 'DIS',
+    'walmart': 'WMT',
+    'visa': 'V',
+    'mastercard': 'MA',
+    'jpmorgan': 'JPM',
+    'berkshire': 'BRK.B',
+    'boeing': 'BA',
+    'pfizer': 'PFE',
+    'mcdonalds': 'MCD',
+    'nike': 'NKE',
+    'paypal': 'PYPL',
+    'adobe': 'ADBE',
+    'salesforce': 'CRM',
+    'exxon': 'XOM',
+}
+
+# Upper-case words that look like symbols but are not tickers
+NON_TICKERS = {'SMA', 'EMA', 'RSI', 'MACD', 'OHLC', 'USD', 'EUR', 'YTD', 'API', 'I', 'A', 'DE', 'DEL', 'EL', 'LA', 'Y'}
+
+TIMEFRAME_WORDS = {
+    'daily': r'diari[oa]s?|daily',
+    'weekly': r'semanal(?:es)?|weekly',
+    'monthly': r'mensual(?:es)?|monthly',
+    '1min': r'1 ?min(?:uto|ute)?s?',
+    '5min': r'5 ?min(?:utos|utes)?',
+    '15min': r'15 ?min(?:utos|utes)?',
+    '30min': r'30 ?min(?:utos|utes)?',
+    '60min': r'60 ?min(?:utos|utes)?|horari[oa]s?|hourly',
+}
+
+UNITS = {
+    'dia': 'days', 'dias': 'days', 'day': 'days', 'days': 'days',
+    'semana': 'weeks', 'semanas': 'weeks', 'week': 'weeks', 'weeks': 'weeks',
+    'mes': 'months', 'meses': 'months', 'month': 'months', 'months': 'months',
+    'ano': 'years', 'anos': 'years', 'year': 'years', 'years': 'years',
+}
+UNIT_PATTERN = '|'.join(sorted(UNITS, key=len, reverse=True))
+
+# Anything date-like left over after matching means the query is beyond this parser
+LEFTOVER_DATE_HINTS = re.compile(
+    r'\d|\b(?:desde|hasta|entre|since|until|between|before|after|ago|hace|antes|despues|'
+    r'enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|octubre|noviembre|diciembre|'
+    r'january|february|march|april|may|june|july|august|september|october|november|december|'
+    r'trimestre|quarter|semestre)\b'
+)
+
+
+class LocalQueryParser:
+    """
+    Deterministic parser for the common query shapes: one ticker (symbol or company name),
+    an optional timeframe word and an optional relative or explicit date range, in Spanish or English.
+
+    Relative ranges follow the LLM prompt: "last month" is the previous calendar month, "this year"
+    runs to today, while "último año" / "past year" are the trailing twelve months. Returns None when
+    the query does not fit, so the caller can fall back to the LLM.
+    """
+
+    def parse(self, query: str, today: Optional[date] = None) -> Optional[Dict[str, Optional[str]]]:
+        today = today or date.today()
+        normalized = normalize_query(query)
+
+        ticker = self._ticker(query, normalized)
+        if ticker is None:
+            return None
+
+        timeframe = 'daily'
+        for name, pattern in TIMEFRAME_WORDS.items():
+            match = re.search(rf'\b(?:{pattern})\b', normalized)
+            if match:
+                timeframe = name
+                # Intraday names hold digits, which would otherwise read as a leftover date
+                normalized = normalized[:match.start()] + ' ' * (match.end() - match.start()) + normalized[match.end():]
+                break
+
+        dates, span = self._date_range(normalized, today)
+        leftover = normalized[:span[0]] + ' ' + normalized[span[1]:] if span else normalized
+        if LEFTOVER_DATE_HINTS.search(leftover):
+            logger.debug(f"Local parser cannot resolve the dates in: {query}")
+            return None
+
+        start, end = dates
+        return {
+            "ticker": ticker,
+            "start_date": start.isoformat() if start else None,
+            "end_date": end.isoformat() if end else None,
+            "timeframe": timeframe
+        }
+
+    def _ticker(self, query: str, normalized: str) -> Optional[str]:
+        candidates: Set[str] = {
+            symbol for symbol in re.findall(r'(?<![\w.])[A-Z]{1,5}(?:\.[A-Z])?(?![\w.])', query)
+            if symbol not in NON_TICKERS
+        }
+        for name, symbol in TICKER_ALIASES.items():
+            if re.search(rf'\b{re.escape(name)}\b', normalized):
+                candidates.add(symbol)
+        # Zero or several candidates: leave it to the LLM
+        return candidates.pop() if len(candidates) == 1 else None
+
+    def _date_range(self, text: str, today: date) -> Tuple[Tuple[Optional[date], Optional[date]], Optional[Tuple[int, int]]]:
+        iso = list(re.finditer(r'\b\d{4}-\d{2}-\d{2}\b', text))
+        if iso:
+            dates = sorted(date.fromisoformat(m.group(0)) for m in iso[:2])
+            end = dates[1] if len(dates) > 1 else today
+            return (dates[0], end), (iso[0].start(), iso[min(len(iso), 2) - 1].end())
+
+        match = re.search(rf'\b(?:ultim[oa]s|last|past)\s+(\d+)\s+({UNIT_PATTERN})\b', text)
+        if match:
+            delta = relativedelta(**{UNITS[match.group(2)]: int(match.group(1))})
+            return (today - delta, today), match.span()
+
+        match = re.search(rf'\b(?:ultim[oa]|past)\s+({UNIT_PATTERN})\b', text)
+        if match:
+            return (today - relativedelta(**{UNITS[match.group(1)]: 1}), today), match.span()
+
+        match = re.search(rf'\b(?:({UNIT_PATTERN})\s+pasad[oa]|last\s+({UNIT_PATTERN}))\b', text)
+        if match:
+            unit = UNITS[match.group(1) or match.group(2)]
+            start = self._period_start(today, unit) - relativedelta(**{unit: 1})
+            return (start, self._period_start(today, unit) - timedelta(days=1)), match.span()
+
+        match = re.search(rf'\b(?:este|esta|this)\s+({UNIT_PATTERN})\b|\bytd\b', text)
+        if match:
+            unit = UNITS[match.group(1)] if match.group(1) else 'years'
+            return (self._period_start(today, unit), today), match.span()
+
+        match = re.search(r'\b(19\d{2}|20\d{2})\b', text)
+        if match:
+            year = int(match.group(1))
+            return (date(year, 1, 1), date(year, 12, 31)), match.span()
+
+        return (None, None), None
+
+    @staticmethod
+    def _period_start(today: date, unit: str) -> date:
+        if unit == 'years':
+            return date(today.year, 1, 1)
+        if unit == 'months':
+            return today.replace(day=1)
+        if unit == 'weeks':
+            return today - timedelta(days=today.weekday())
+        return today
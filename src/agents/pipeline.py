@@ -0,0 +1,175 @@
+# src/agents/pipeline.py
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import cachetools
+import numpy as np
+import pandas as pd
+from config.settings import (
+    PIPELINE_CACHE_SIZE, PIPELINE_DATA_TTL, PIPELINE_WORKERS
+)
+from src.backtesting.two_sma import cache_stats as backtest_cache_stats, run_two_sma_backtest
+from src.signals.indicators import sma
+from src.utils.caching import LockedCache
+
+logger = logging.getLogger(__name__)
+
+# In the order they run; each one only starts once the previous one has produced its result
+STAGES = ('parse', 'fetch', 'indicators', 'backtest')
+SMA_WINDOWS = (10, 20)
+
+
+def private_copy(result: Optional[pd.Series]) -> Optional[pd.Series]:
+    """Copy of a shared backtest result, down to its frames (_equity_curve, _trades, _robustness)"""
+    if result is None:
+        return None
+    return type(result)({key: value.copy() if isinstance(value, (pd.DataFrame, pd.Series)) else value
+                         for key, value in result.items()}, dtype=object, name=result.name)
+
+
+class TTLCache(LockedCache):
+    """
+    Thread-safe LRU with a time-to-live per entry (cachetools' TTLCache behind LockedCache).
+    None results are not cached.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        super().__init__(cachetools.TTLCache(maxsize, ttl, timer=clock))
+
+
+class PipelineRun:
+    """
+    One query going through the pipeline. Worker threads fill in the stages; the UI reads them
+    whenever it likes and renders each result as soon as its stage is done.
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self.submitted = time.monotonic()
+        self.stages = {name: {'status': 'pending', 'seconds': None, 'error': None} for name in STAGES}
+        self._results: Dict[str, Any] = {}
+        self._done = {name: threading.Event() for name in STAGES}
+
+    def done(self, stage: str) -> bool:
+        return self._done[stage].is_set()
+
+    def wait(self, stage: str, timeout: Optional[float] = None) -> bool:
+        return self._done[stage].wait(timeout)
+
+    def result(self, stage: str) -> Any:
+        """The stage's result (None if it was skipped); re-raises the stage's error"""
+        error = self.stages[stage]['error']
+        if error is not None:
+            raise error
+        return self._results.get(stage)
+
+    @property
+    def finished(self) -> bool:
+        return all(event.is_set() for event in self._done.values())
+
+    @property
+    def failed(self) -> bool:
+        return any(state['status'] == 'failed' for state in self.stages.values())
+
+    @property
+    def progress(self) -> float:
+        return sum(event.is_set() for event in self._done.values()) / len(STAGES)
+
+    def run_stage(self, stage: str, work: Callable[[], Any]) -> Any:
+        state = self.stages[stage]
+        state['status'] = 'running'
+        started = time.perf_counter()
+        try:
+            self._results[stage] = work()
+            state['status'] = 'done'
+            return self._results[stage]
+        except Exception as e:
+            logger.error(f"Pipeline stage '{stage}' failed for '{self.query}': {str(e)}")
+            state['error'] = e
+            state['status'] = 'failed'
+            raise
+        finally:
+            state['seconds'] = time.perf_counter() - started
+            self._done[stage].set()
+
+    def skip_remaining(self):
+        for stage in STAGES:
+            if not self.done(stage):
+                self.stages[stage]['status'] = 'skipped'
+                self._done[stage].set()
+
+
+class AnalysisPipeline:
+    """
+    Runs parse -> fetch -> indicators -> backtest for a query on a shared thread pool.
+
+    Fetched bars are memoized for every session of the process for PIPELINE_DATA_TTL seconds, keyed
+    by (ticker, start, end, timeframe) with the dates the fetcher resolves (so a query without dates
+    moves on at midnight). Backtest results are memoized by run_two_sma_backtest on the fingerprint
+    of those bars, so new bars under the same query always get a new backtest. Every run gets its
+    own copy of a memoized backtest result, so sessions never see each other's changes. Callers
+    can also pass a per-session TTLCache of runs: an identical query then returns the run already
+    finished or in flight instead of starting another one.
+    """
+
+    def __init__(self, parser, fetcher, db_ops, max_workers: int = PIPELINE_WORKERS,
+                 data_ttl: float = PIPELINE_DATA_TTL, cache_size: int = PIPELINE_CACHE_SIZE):
+        self.parser = parser
+        self.fetcher = fetcher
+        self.db_ops = db_ops
+        self.data_cache = TTLCache(cache_size, data_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pipeline')
+
+    def submit(self, query: str, session_runs: Optional[TTLCache] = None) -> PipelineRun:
+        """Start the query in the background (or reuse the session's run of it) and return its run"""
+        key = query.strip()
+        if session_runs is not None:
+            run = session_runs.get(key)
+            if run is not None and not run.failed:
+                return run
+        run = PipelineRun(key)
+        if session_runs is not None:
+            session_runs.put(key, run)
+        self._executor.submit(self._run, run)
+        return run
+
+    def _run(self, run: PipelineRun):
+        try:
+            parsed = run.run_stage('parse', lambda: self._parse(run.query))
+            data = run.run_stage('fetch', lambda: self._fetch(parsed))
+            if data is None or data.empty:
+                return
+            run.run_stage('indicators', lambda: self._indicators(data))
+            run.run_stage('backtest', lambda: private_copy(self._backtest(data, parsed['ticker'])))
+            logger.info(f"Pipeline finished for '{run.query}' in {time.monotonic() - run.submitted:.2f}s: "
+                        f"{ {stage: state['seconds'] for stage, state in run.stages.items()} }")
+        except Exception as e:
+            # Stage errors are already logged and recorded on the failed stage, where the UI reads them
+            if not any(state['error'] is e for state in run.stages.values()):
+                logger.error(f"Pipeline failed outside its stages for '{run.query}': {str(e)}")
+                raise
+        finally:
+            run.skip_remaining()
+
+    def _parse(self, query: str) -> Dict[str, Optional[str]]:
+        parsed = self.parser.parse_query(query)
+        if not parsed or not parsed.get('ticker'):
+            raise ValueError(f"No ticker found in query: {query}")
+        return parsed
+
+    def _fetch(self, parsed: Dict[str, Optional[str]]) -> Optional[pd.DataFrame]:
+        start, end = self.fetcher.resolve_range(parsed.get('start_date'), parsed.get('end_date'))
+        key = (parsed['ticker'], start, end, parsed.get('timeframe'))
+        return self.data_cache.get_or_compute(key, lambda: self.fetcher.fetch_data(parsed))
+
+    def _indicators(self, data: pd.DataFrame) -> Dict[str, np.ndarray]:
+        close = data['close_price'].to_numpy(dtype=np.float64)
+        return {f'SMA_{window}': sma(close, window) for window in SMA_WINDOWS}
+
+    def _backtest(self, data: pd.DataFrame, ticker: str) -> pd.Series:
+        return run_two_sma_backtest(data, self.db_ops, ticker)
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return {'data': self.data_cache.stats(), 'results': backtest_cache_stats()}
@@ -0,0 +1,42 @@
+# src/agents/query_cache.py
+import re
+import time
+import unicodedata
+from datetime import date
+from typing import Callable, Dict, Optional, Tuple
+from cachetools import TTLCache
+from src.utils.caching import LockedCache
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize('NFKD', query)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = re.sub(r'[^\w\s\-.]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip(' .')
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of parsed queries with a time-to-live.
+
+    Keys include today's date: "del último año" parses to different dates tomorrow, so an entry
+    is never served on a later day even if its TTL has not run out.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, clock: Callable[[], float] = time.monotonic):
+        self._entries = LockedCache(TTLCache(maxsize, ttl, timer=clock))
+
+    @staticmethod
+    def key(query: str, today: Optional[date] = None) -> Tuple[str, date]:
+        return normalize_query(query), today or date.today()
+
+    def get(self, query: str, today: Optional[date] = None) -> Optional[Dict]:
+        result = self._entries.get(self.key(query, today))
+        return dict(result) if result is not None else None
+
+    def put(self, query: str, result: Dict, today: Optional[date] = None):
+        self._entries.put(self.key(query, today), dict(result))
+
+    def __len__(self) -> int:
+        return len(self._entries)
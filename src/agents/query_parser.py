@@ -1,10 +1,13 @@
 # src/agents/query_parser.py
 import logging
+import threading
 from typing import Dict, Optional
 import re
 from dateutil import parser as date_parser
 from openai import OpenAI
-from config.settings import OPENAI_API_KEY
+from config.settings import OPENAI_API_KEY, QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+from src.agents.query_cache import QueryCache
+from src.agents.local_parser import LocalQueryParser
 
 logger = logging.getLogger(__name__)
 
@@ -12,9 +15,36 @@ class QueryParser:
     def __init__(self):
         logger.info("Initializing QueryParser with OpenAI API")
         self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.cache = QueryCache(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+        self.local_parser = LocalQueryParser()
+        self.layer_hits = {"cache": 0, "local": 0, "llm": 0}
+        self._stats_lock = threading.Lock()
 
     def parse_query(self, query: str) -> Dict[str, str]:
+        """Resolve a query from the cache, then the local parser, and only then the LLM"""
         logger.info(f"Parsing query: {query}")
+        parsed_result = self.cache.get(query)
+        layer = "cache"
+        if parsed_result is None:
+            parsed_result = self.local_parser.parse(query)
+            layer = "local"
+            if parsed_result is None:
+                parsed_result = self._parse_with_llm(query)
+                layer = "llm"
+            self.cache.put(query, parsed_result)
+
+        with self._stats_lock:
+            self.layer_hits[layer] += 1
+        logger.info(f"Query resolved by {layer} layer: {parsed_result}. Hit ratios: {self.hit_ratios()}")
+        return parsed_result
+
+    def hit_ratios(self) -> Dict[str, float]:
+        """Share of parsed queries answered by each layer"""
+        with self._stats_lock:
+            total = sum(self.layer_hits.values())
+            return {layer: (hits / total if total else 0.0) for layer, hits in self.layer_hits.items()}
+
+    def _parse_with_llm(self, query: str) -> Dict[str, str]:
         try:
             logger.debug("Invoking OpenAI ChatCompletion API")
             response = self.client.chat.completions.create(
@@ -39,7 +69,7 @@ class QueryParser:
                     - Ticker: [SYMBOL]
                     - Start Date: [YYYY-MM-DD]
                     - End Date: [YYYY-MM-DD]
-                    - Timeframe: [daily/weekly/monthly]
+                    - Timeframe: [daily/weekly/monthly/1min/5min/15min/30min/60min]
                     """},
                     {"role": "user", "content": query}
                 ],
@@ -101,7 +131,7 @@ class QueryParser:
 
     def extract_timeframe(self, response: str) -> Optional[str]:
         logger.debug("Extracting timeframe from response")
-        match = re.search(r'\b(daily|weekly|monthly)\b', response, re.IGNORECASE)
+        match = re.search(r'\b(daily|weekly|monthly|1min|5min|15min|30min|60min)\b', response, re.IGNORECASE)
         timeframe = match.group(0).lower() if match else None
         logger.debug(f"Extracted timeframe: {timeframe}")
         return timeframe
\ No newline at end of file
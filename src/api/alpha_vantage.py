@@ -1,53 +1,287 @@
 # src/api/alpha_vantage.py
+import io
+import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
 import pandas as pd
-from typing import Dict
-import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import logging
+from config.settings import (
+    ALPHA_VANTAGE_API_KEY, ALPHA_VANTAGE_BASE_URL, ALPHA_VANTAGE_REQUESTS_PER_MINUTE,
+    ALPHA_VANTAGE_MAX_WORKERS, ALPHA_VANTAGE_TIMEOUT, ALPHA_VANTAGE_MAX_RETRIES
+)
+from src.database.arrays import OHLCArrays, PRICE_COLUMNS
 
-ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
 logger = logging.getLogger(__name__)
 
-def fetch_alpha_vantage_data(params: Dict[str, str]) -> pd.DataFrame:
-    ticker = params["ticker"]
-    timeframe = params["timeframe"]
-    
-    function_mapping = {
-        "daily": "TIME_SERIES_DAILY",
-        "weekly": "TIME_SERIES_WEEKLY",
-        "monthly": "TIME_SERIES_MONTHLY"
-    }
-    
-    function = function_mapping.get(timeframe.lower())
-    if not function:
-        logger.error(f"Unsupported timeframe: {timeframe}")
-        return pd.DataFrame()
-
-    url = (
-        f'https://www.alphavantage.co/query?function={function}&symbol={ticker}'
-        f'&apikey={ALPHA_VANTAGE_API_KEY}&outputsize=full'
-    )
+FUNCTION_MAPPING = {
+    "daily": "TIME_SERIES_DAILY",
+    "weekly": "TIME_SERIES_WEEKLY",
+    "monthly": "TIME_SERIES_MONTHLY"
+}
+
+# Intraday timeframes are TIME_SERIES_INTRADAY intervals, fetched one calendar month per request
+INTRADAY_FUNCTION = "TIME_SERIES_INTRADAY"
+INTRADAY_TIMEFRAMES = ("1min", "5min", "15min", "30min", "60min")
+
+# Statuses worth retrying; anything else is a permanent failure for this request
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Column names of the datatype=csv output, mapped to the ohlc_data ones
+CSV_COLUMNS = {
+    'timestamp': 'timestamp',
+    'open': 'open_price',
+    'high': 'high_price',
+    'low': 'low_price',
+    'close': 'close_price',
+    'volume': 'volume',
+}
+
+
+class RateLimited(Exception):
+    """Alpha Vantage answered with its quota notice instead of data"""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second refill up to `capacity`.
+
+    `acquire` blocks until a token is available, so any number of worker threads together stay
+    within the quota while still starting requests as soon as the quota allows.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError(f"Token rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
 
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        time_series_key = next((key for key in data.keys() if "Time Series" in key), None)
-        if not time_series_key:
-            logger.error("Time Series key not found in API response")
+
+class AlphaVantageClient:
+    """
+    Alpha Vantage time series client for many tickers at once.
+
+    One `requests.Session` keeps connections alive across requests, a shared token bucket keeps
+    the whole client within `requests_per_minute`, and failed requests (network errors, 429/5xx,
+    quota notices) are retried with exponential backoff. `base_url` can point at a local stub server.
+    """
+
+    def __init__(self, api_key: Optional[str] = ALPHA_VANTAGE_API_KEY, base_url: str = ALPHA_VANTAGE_BASE_URL,
+                 requests_per_minute: float = ALPHA_VANTAGE_REQUESTS_PER_MINUTE,
+                 max_workers: int = ALPHA_VANTAGE_MAX_WORKERS, timeout: float = ALPHA_VANTAGE_TIMEOUT,
+                 max_retries: int = ALPHA_VANTAGE_MAX_RETRIES, backoff: float = 1.0, burst: float = 1.0):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.limiter = TokenBucket(requests_per_minute / 60.0, burst)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def fetch(self, params: Dict[str, str]) -> pd.DataFrame:
+        """One ticker in the ohlc_data layout; an empty frame if the request ultimately fails"""
+        arrays = self.fetch_arrays(params)
+        if arrays is None:
             return pd.DataFrame()
+        logger.info(f"Fetched {arrays.n_bars} records from Alpha Vantage for ticker: {arrays.ticker}")
+        return arrays.to_table_frame()
+
+    def fetch_arrays(self, params: Dict[str, str]) -> Optional[OHLCArrays]:
+        """One ticker as typed, date-ascending column arrays; None if the request ultimately fails"""
+        ticker = params["ticker"]
+        timeframe = params["timeframe"].lower()
+        # 'compact' returns only the latest 100 bars, 'full' the whole history
+        outputsize = params.get("outputsize", "full")
+
+        if timeframe in INTRADAY_TIMEFRAMES:
+            # Regular session, unadjusted (as the daily series); 'month' (YYYY-MM) picks a historical slice
+            query = {"function": INTRADAY_FUNCTION, "interval": timeframe, "extended_hours": "false",
+                     "adjusted": "false"}
+            if params.get("month"):
+                query["month"] = params["month"]
+        elif timeframe in FUNCTION_MAPPING:
+            query = {"function": FUNCTION_MAPPING[timeframe]}
+        else:
+            logger.error(f"Unsupported timeframe: {timeframe}")
+            return None
+
+        query.update({"symbol": ticker, "apikey": self.api_key, "outputsize": outputsize, "datatype": "csv"})
+        try:
+            return self._request(query, ticker, timeframe)
+        except (requests.RequestException, ProtocolError, ReadTimeoutError, RateLimited, ValueError) as e:
+            logger.error(f"Failed to fetch data from Alpha Vantage for {ticker}: {str(e)}")
+            return None
+
+    def fetch_many(self, tickers: Iterable[str], timeframe: str = "daily",
+                   outputsize: str = "full") -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Fetch tickers concurrently, yielding (ticker, DataFrame) in completion order"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.fetch, {"ticker": ticker, "timeframe": timeframe, "outputsize": outputsize}): ticker
+                for ticker in tickers
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
 
-        df = pd.DataFrame.from_dict(data[time_series_key], orient='index').reset_index()
-        df.columns = ['bar_date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
-        df['ticker'] = ticker
-        df['timeframe'] = timeframe.lower()
-        df['bar_date'] = pd.to_datetime(df['bar_date']).dt.date
-        df['bar_time'] = pd.to_datetime('00:00:00').time()  # Default time for daily data
-
-        # Reorder columns to match the database schema
-        df = df[['ticker', 'bar_date', 'bar_time', 'timeframe', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']]
-
-        logger.info(f"Fetched {len(df)} records from Alpha Vantage for ticker: {ticker}")
-        return df
-    else:
-        logger.error(f"Failed to fetch data from Alpha Vantage: HTTP {response.status_code}")
-        return pd.DataFrame()
\ No newline at end of file
+    def fetch_intraday(self, ticker: str, timeframe: str,
+                       months: Iterable[str]) -> Iterator[Tuple[str, Optional[OHLCArrays]]]:
+        """
+        Intraday month slices of one ticker, yielded in month order as (YYYY-MM, arrays or None).
+
+        Up to `max_workers` months are requested ahead, and a new one is only submitted once the
+        caller has taken the oldest, so at most max_workers + 1 months of bars are held in memory
+        however long the history is.
+        """
+        months = iter(months)
+        pending = deque()
+
+        def submit(month: Optional[str]):
+            if month is not None:
+                params = {"ticker": ticker, "timeframe": timeframe, "month": month}
+                pending.append((month, executor.submit(self.fetch_arrays, params)))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for _ in range(self.max_workers):
+                submit(next(months, None))
+            while pending:
+                month, future = pending.popleft()
+                arrays = future.result()
+                submit(next(months, None))
+                yield month, arrays
+
+    def _request(self, query: Dict[str, str], ticker: str, timeframe: str) -> Optional[OHLCArrays]:
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                with self.session.get(self.base_url, params=query, timeout=self.timeout, stream=True) as response:
+                    if response.status_code in RETRY_STATUS_CODES:
+                        raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+                    response.raise_for_status()
+                    return decode_time_series(response, ticker, timeframe)
+            except (requests.ConnectionError, requests.Timeout, ProtocolError, ReadTimeoutError, RateLimited) as e:
+                error = e
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code not in RETRY_STATUS_CODES:
+                    raise
+                error = e
+            if attempt == self.max_retries:
+                raise error
+            delay = self.backoff * 2 ** attempt * (1 + random.random())
+            logger.warning(f"Alpha Vantage request for {ticker} failed ({str(error)}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def decode_time_series(response: requests.Response, ticker: str, timeframe: str) -> Optional[OHLCArrays]:
+    """
+    Decode a streamed TIME_SERIES_* response straight into typed column arrays.
+
+    CSV bodies go through pandas' C parser chunk by chunk from the socket, so no string table or
+    dict-of-dicts is ever materialized. Alpha Vantage answers errors and quota notices with JSON
+    even when CSV was requested; those are told apart by the first byte.
+    """
+    response.raw.decode_content = True
+    response.raw.auto_close = False  # let the buffered reader below drain it past EOF
+    body = io.BufferedReader(response.raw, buffer_size=1 << 16)
+    if body.peek(1)[:1] == b'{':
+        return decode_time_series_json(json.load(body), ticker, timeframe)
+
+    frame = pd.read_csv(
+        body,
+        usecols=list(CSV_COLUMNS),
+        dtype={'timestamp': str, 'open': np.float64, 'high': np.float64, 'low': np.float64,
+               'close': np.float64, 'volume': np.int64},
+        engine='c'
+    )
+    if frame.empty:
+        logger.error(f"Empty time series returned for {ticker}")
+        return None
+    # numpy parses the ISO timestamps in one vectorized pass (much faster than parse_dates)
+    columns = {CSV_COLUMNS[name]: frame[name].to_numpy() for name in CSV_COLUMNS}
+    columns['timestamp'] = columns['timestamp'].astype('datetime64[ns]')
+    return _ascending_arrays(columns, ticker, timeframe)
+
+
+def decode_time_series_json(data: Dict, ticker: str, timeframe: str) -> Optional[OHLCArrays]:
+    """Typed arrays from a decoded JSON TIME_SERIES_* response (or None for an error payload)"""
+    time_series_key = next((key for key in data.keys() if "Time Series" in key), None)
+    if not time_series_key:
+        notice = data.get("Note") or data.get("Information")
+        if notice:
+            raise RateLimited(notice)
+        logger.error(f"Time Series key not found in API response for {ticker}: {data.get('Error Message', '')}")
+        return None
+
+    series = data[time_series_key]
+    if not series:
+        return None
+    # Bars hold "1. open" .. "5. volume" in that order
+    values = np.array([list(bar.values())[:5] for bar in series.values()], dtype=np.float64)
+    columns = {column: values[:, i] for i, column in enumerate(PRICE_COLUMNS)}
+    columns['volume'] = values[:, 4].astype(np.int64)
+    columns['timestamp'] = np.array(list(series.keys()), dtype='datetime64[ns]')
+    return _ascending_arrays(columns, ticker, timeframe)
+
+
+def _ascending_arrays(columns: Dict[str, np.ndarray], ticker: str, timeframe: str) -> OHLCArrays:
+    # Alpha Vantage lists the newest bar first; the fancy indexing also leaves every column contiguous
+    order = np.argsort(columns['timestamp'], kind='stable')
+    return OHLCArrays(ticker=ticker, timeframe=timeframe, **{name: values[order] for name, values in columns.items()})
+
+
+def intraday_months(start: date, end: date) -> List[str]:
+    """YYYY-MM of every month slice overlapping [start, end]"""
+    return [month.strftime("%Y-%m") for month in pd.period_range(start, end, freq="M")]
+
+
+_default_client: Optional[AlphaVantageClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> AlphaVantageClient:
+    """Process-wide client, so every caller shares one connection pool and one quota"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = AlphaVantageClient()
+        return _default_client
+
+
+def fetch_alpha_vantage_data(params: Dict[str, str]) -> pd.DataFrame:
+    return get_client().fetch(params)
@@ -0,0 +1,167 @@
+# src/api/providers.py
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from config.settings import DATA_PROVIDERS, PROVIDER_HEDGE_BUDGET
+from src.api.alpha_vantage import fetch_alpha_vantage_data
+from src.api.yahoo_finance import fetch_yahoo_finance_data
+from src.database.arrays import PRICE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+TABLE_COLUMNS = ['ticker', 'bar_date', 'bar_time', 'timeframe'] + PRICE_COLUMNS + ['volume']
+
+# Provider name -> fetch function taking the query params (ticker, timeframe, outputsize)
+# and returning a frame in the ohlc_data layout, empty on failure
+PROVIDER_FUNCTIONS: Dict[str, Callable[[Dict[str, str]], pd.DataFrame]] = {
+    'alpha_vantage': fetch_alpha_vantage_data,
+    'yahoo': fetch_yahoo_finance_data,
+}
+
+
+class DataProvider:
+    """A named market data source returning frames in the ohlc_data layout"""
+
+    def __init__(self, name: str, fetch: Callable[[Dict[str, str]], pd.DataFrame]):
+        self.name = name
+        self._fetch = fetch
+
+    def fetch(self, params: Dict[str, str]) -> pd.DataFrame:
+        data = self._fetch(params)
+        if data is None or data.empty:
+            return pd.DataFrame()
+        missing = set(TABLE_COLUMNS) - set(data.columns)
+        if missing:
+            raise ValueError(f"Provider {self.name} returned a frame without {sorted(missing)}")
+        return data[TABLE_COLUMNS]
+
+
+class ProviderStats:
+    """Thread-safe request, error, win and latency counters of one provider"""
+
+    def __init__(self, window: int = 500):
+        self.requests = 0
+        self.errors = 0
+        self.wins = 0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.requests += 1
+            self.errors += 0 if ok else 1
+            self.latencies.append(latency)
+
+    def record_win(self):
+        with self._lock:
+            self.wins += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'wins': self.wins,
+                'error_rate': self.errors / self.requests if self.requests else 0.0,
+                'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+            }
+
+
+class HedgedFetcher:
+    """
+    Fetch from an ordered list of providers with hedged requests.
+
+    The first provider is asked alone. If it has not answered within `hedge_after` seconds the next
+    one is fired as well, and whichever returns data first wins; a provider that fails or returns
+    nothing hands over to the next one immediately. Slower requests are left to finish in the
+    background so their latency still counts in the stats.
+    """
+
+    def __init__(self, providers: Sequence[DataProvider], hedge_after: float = PROVIDER_HEDGE_BUDGET,
+                 max_workers: int = 8):
+        if not providers:
+            raise ValueError("At least one data provider is required")
+        self.providers = list(providers)
+        self.hedge_after = hedge_after
+        self.stats = {provider.name: ProviderStats() for provider in self.providers}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='provider')
+
+    def fetch(self, params: Dict[str, str]) -> pd.DataFrame:
+        remaining = iter(self.providers)
+        futures = {}
+
+        def launch() -> bool:
+            provider = next(remaining, None)
+            if provider is None:
+                return False
+            futures[self._executor.submit(self._call, provider, params)] = provider
+            return True
+
+        launch()
+        answered = set()
+        while len(answered) < len(futures):
+            done, _ = wait(set(futures) - answered, timeout=self.hedge_after, return_when=FIRST_COMPLETED)
+            if not done:
+                if launch():
+                    logger.info(f"No answer within {self.hedge_after}s for {params['ticker']}, hedging with "
+                                f"{list(futures.values())[-1].name}")
+                continue
+
+            for future in done:
+                answered.add(future)
+                data = future.result()
+                if not data.empty:
+                    provider = futures[future]
+                    self.stats[provider.name].record_win()
+                    logger.info(f"{provider.name} answered first for {params['ticker']} ({len(data)} rows)")
+                    return data
+            # Failed or empty answer: fail over without waiting for the budget
+            launch()
+
+        logger.warning(f"No provider returned data for {params['ticker']}")
+        return pd.DataFrame()
+
+    def _call(self, provider: DataProvider, params: Dict[str, str]) -> pd.DataFrame:
+        started = time.perf_counter()
+        try:
+            data = provider.fetch(params)
+        except Exception as e:
+            logger.error(f"Provider {provider.name} failed for {params['ticker']}: {str(e)}")
+            data = pd.DataFrame()
+        self.stats[provider.name].record(time.perf_counter() - started, ok=not data.empty)
+        return data
+
+    def provider_stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+
+def build_providers(names: List[str]) -> List[DataProvider]:
+    unknown = [name for name in names if name not in PROVIDER_FUNCTIONS]
+    if unknown:
+        raise ValueError(f"Unknown data providers: {unknown}. Available: {sorted(PROVIDER_FUNCTIONS)}")
+    return [DataProvider(name, PROVIDER_FUNCTIONS[name]) for name in names]
+
+
+_default_fetcher: Optional[HedgedFetcher] = None
+_default_fetcher_lock = threading.Lock()
+
+
+def get_hedged_fetcher() -> HedgedFetcher:
+    """Process-wide fetcher over the providers configured in DATA_PROVIDERS"""
+    global _default_fetcher
+    with _default_fetcher_lock:
+        if _default_fetcher is None:
+            _default_fetcher = HedgedFetcher(build_providers(DATA_PROVIDERS))
+        return _default_fetcher
+
+
+def fetch_market_data(params: Dict[str, str]) -> pd.DataFrame:
+    """Same contract as fetch_alpha_vantage_data, served by the first configured provider to answer"""
+    return get_hedged_fetcher().fetch(params)
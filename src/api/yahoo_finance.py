@@ -1,30 +1,85 @@
 # src/api/yahoo_finance.py
-import yfinance as yf
+import numpy as np
 import pandas as pd
 from typing import Dict
+import logging
+from src.database.arrays import PRICE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+INTERVALS = {
+    "daily": "1d",
+    "weekly": "1wk",
+    "monthly": "1mo"
+}
+
+# Same window as Alpha Vantage's outputsize: 'compact' is the recent bars, 'full' the whole history
+PERIODS = {
+    "compact": "6mo",
+    "full": "max"
+}
+
 
 def fetch_yahoo_finance_data(params: Dict[str, str]) -> pd.DataFrame:
+    """Unadjusted OHLCV from Yahoo Finance in the ohlc_data layout (same contract as fetch_alpha_vantage_data)"""
+    import yfinance as yf  # imported on first use; it is slow to import and only needed when Yahoo is enabled
+
     ticker = params["ticker"]
-    start_date = params["start_date"]
-    end_date = params["end_date"]
-    timeframe = params["timeframe"]
+    timeframe = params["timeframe"].lower()
+    outputsize = params.get("outputsize", "full")
 
-    interval = '1d' if timeframe == 'daily' else '1wk' if timeframe == 'weekly' else '1mo'
-    stock = yf.Ticker(ticker)
-    hist = stock.history(start=start_date, end=end_date, interval=interval)
+    interval = INTERVALS.get(timeframe)
+    if not interval:
+        logger.error(f"Unsupported timeframe: {timeframe}")
+        return pd.DataFrame()
 
+    stock = yf.Ticker(ticker)
+    # Without auto_adjust the prices are not dividend adjusted, but Yahoo still back-adjusts them for
+    # splits; the 'Stock Splits' action column is what normalize_yahoo_history undoes that with
+    hist = stock.history(period=PERIODS.get(outputsize, "max"), interval=interval, auto_adjust=False,
+                         actions=True)
     if hist.empty:
         return pd.DataFrame()
-    
-    hist.reset_index(inplace=True)
-    hist['ticker'] = ticker
-    hist['timeframe'] = timeframe
-    hist = hist.rename(columns={
-        'Date': 'date',
-        'Open': 'open',
-        'High': 'high',
-        'Low': 'low',
-        'Close': 'close',
-        'Volume': 'volume'
+
+    df = normalize_yahoo_history(hist, ticker, timeframe)
+    logger.info(f"Fetched {len(df)} records from Yahoo Finance for ticker: {ticker}")
+    return df
+
+
+def normalize_yahoo_history(hist: pd.DataFrame, ticker: str, timeframe: str) -> pd.DataFrame:
+    """
+    Convert a yfinance history frame to the ohlc_data layout.
+
+    Yahoo labels weekly and monthly bars with the first day of the period while Alpha Vantage uses the
+    period's last trading day; bars are moved to the period's last business day so both providers write
+    the same keys.
+
+    Yahoo divides every bar before a split by the split ratio (and multiplies its volume), while
+    Alpha Vantage's TIME_SERIES_* bars are as traded. With a 'Stock Splits' column the adjustment is
+    undone, so rows from either provider can sit side by side in ohlc_data without a fake jump.
+    """
+    if 'Stock Splits' in hist:
+        # Ratio of every split after each bar (a split row is already in post-split terms)
+        ratios = hist['Stock Splits'].fillna(0).replace(0, 1).to_numpy(dtype='float64')
+        later_splits = np.r_[np.cumprod(ratios[::-1])[::-1][1:], 1.0]
+        hist = hist.assign(**{column: hist[column] * later_splits for column in ['Open', 'High', 'Low', 'Close']},
+                           Volume=(hist['Volume'] / later_splits).round())
+    hist = hist.dropna(subset=['Open', 'High', 'Low', 'Close'])
+    dates = pd.DatetimeIndex(hist.index).tz_localize(None).normalize()
+    if timeframe == "weekly":
+        dates = dates + pd.to_timedelta(4 - dates.weekday, unit='D')
+    elif timeframe == "monthly":
+        dates = dates + pd.offsets.BMonthEnd(0)
+
+    df = pd.DataFrame({
+        'ticker': ticker,
+        'bar_date': dates.date,
+        'bar_time': pd.to_datetime('00:00:00').time(),
+        'timeframe': timeframe,
+        'open_price': hist['Open'].to_numpy(dtype='float64'),
+        'high_price': hist['High'].to_numpy(dtype='float64'),
+        'low_price': hist['Low'].to_numpy(dtype='float64'),
+        'close_price': hist['Close'].to_numpy(dtype='float64'),
+        'volume': hist['Volume'].fillna(0).to_numpy(dtype='int64'),
     })
-    return hist[['ticker', 'date', 'open', 'high', 'low', 'close', 'volume', 'timeframe']]
\ No newline at end of file
+    return df[['ticker', 'bar_date', 'bar_time', 'timeframe'] + PRICE_COLUMNS + ['volume']]
@@ -0,0 +1,109 @@
+# src/backtesting/batch.py
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence
+from src.agents.data_fetcher import DataFetcher
+from src.backtesting.two_sma import TwoSMA, compute_two_sma_backtest
+from src.database.operations import DatabaseOperations
+
+logger = logging.getLogger(__name__)
+
+# Per-process state, created once by the pool initializer so every worker owns its engine
+_worker_fetcher: Optional[DataFetcher] = None
+
+
+def _init_worker():
+    global _worker_fetcher
+    _worker_fetcher = DataFetcher(DatabaseOperations())
+    logger.info(f"Backtest worker {os.getpid()} initialized")
+
+
+def _backtest_ticker(query_params: Dict[str, str], n_fast: int, n_slow: int) -> Dict:
+    """Fetch one ticker and run its backtest inside a worker; persistence is left to the parent"""
+    ticker = query_params["ticker"]
+    try:
+        data = _worker_fetcher.fetch_data(query_params)
+        if data is None or data.empty:
+            return {'ticker': ticker, 'error': 'No data available'}
+        result, summary_data, detail_records = compute_two_sma_backtest(data, ticker, n_fast, n_slow)
+        return {'ticker': ticker, 'summary': summary_data, 'details': detail_records,
+                'equity': result['_equity_curve']['Equity']}
+    except Exception as e:
+        logger.error(f"Backtest failed for {ticker}: {str(e)}")
+        return {'ticker': ticker, 'error': str(e)}
+
+
+def run_universe_backtests(tickers: Sequence[str],
+                           start_date: str,
+                           end_date: str,
+                           timeframe: str = 'daily',
+                           db_ops: Optional[DatabaseOperations] = None,
+                           n_fast: int = TwoSMA.n_fast,
+                           n_slow: int = TwoSMA.n_slow,
+                           max_workers: Optional[int] = None,
+                           batch_size: int = 50) -> Dict[str, Optional[int]]:
+    """
+    Run the TwoSMA backtest for a universe of tickers on a process pool.
+
+    Workers fetch and backtest independently; the calling process is the single writer and
+    persists summaries and trades every `batch_size` results. Returns ticker -> test_id
+    (None for tickers that failed or had no data).
+    """
+    db_ops = db_ops or DatabaseOperations()
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    logger.info(f"Starting batch backtest for {len(tickers)} tickers with {max_workers or os.cpu_count()} workers")
+
+    test_ids: Dict[str, Optional[int]] = {}
+    pending: List[Dict] = []
+
+    def flush():
+        if not pending:
+            return
+        ids = db_ops.save_backtest_results([(r['summary'], r['details']) for r in pending],
+                                           [r['equity'] for r in pending])
+        test_ids.update({r['ticker']: test_id for r, test_id in zip(pending, ids)})
+        pending.clear()
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+        futures = [
+            executor.submit(_backtest_ticker, {
+                "ticker": ticker,
+                "start_date": start_date,
+                "end_date": end_date,
+                "timeframe": timeframe
+            }, n_fast, n_slow)
+            for ticker in tickers
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            if 'error' in result:
+                logger.warning(f"Skipping {result['ticker']}: {result['error']}")
+                test_ids[result['ticker']] = None
+                continue
+            pending.append(result)
+            if len(pending) >= batch_size:
+                flush()
+        flush()
+
+    completed = sum(test_id is not None for test_id in test_ids.values())
+    logger.info(f"Batch backtest finished: {completed}/{len(tickers)} tickers saved")
+    return test_ids
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    arg_parser = argparse.ArgumentParser(description="Run the TwoSMA backtest for a universe of tickers")
+    arg_parser.add_argument("tickers_file", help="Text file with one ticker per line")
+    arg_parser.add_argument("--start-date", required=True)
+    arg_parser.add_argument("--end-date", required=True)
+    arg_parser.add_argument("--timeframe", default="daily")
+    arg_parser.add_argument("--workers", type=int, default=None)
+    arg_parser.add_argument("--batch-size", type=int, default=50)
+    args = arg_parser.parse_args()
+
+    with open(args.tickers_file) as f:
+        universe = [line.strip() for line in f if line.strip()]
+    run_universe_backtests(universe, args.start_date, args.end_date, args.timeframe,
+                           max_workers=args.workers, batch_size=args.batch_size)
@@ -0,0 +1,497 @@
+# src/backtesting/fast_engine.py
+import logging
+import sys
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from src.signals.indicators import crossover_signals, sma
+
+logger = logging.getLogger(__name__)
+
+# Size backtesting.py uses for `Strategy.buy()` / `Strategy.sell()` without an explicit size
+FULL_EQUITY = 1 - sys.float_info.epsilon
+
+
+class _OutOfMoney(Exception):
+    pass
+
+
+class _Stats(pd.Series):
+    """Stats Series whose repr does not expand the `_equity_curve` and `_trades` frames"""
+
+    def __repr__(self):
+        with pd.option_context('max_colwidth', 20):
+            return super().__repr__()
+
+
+# Helpers of backtesting.py's `compute_stats` (0.3.x), ported so no private module of the package is imported
+
+def geometric_mean(returns: pd.Series) -> float:
+    returns = returns.fillna(0) + 1
+    if np.any(returns <= 0):
+        return 0
+    return np.exp(np.log(returns).sum() / (len(returns) or np.nan)) - 1
+
+
+def _data_period(index: pd.Index):
+    """Typical bar spacing of the index (median of the last 100 gaps)"""
+    return pd.Series(index[-100:]).diff().dropna().median()
+
+
+def two_sma_signals(close: np.ndarray, n_fast: int, n_slow: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Vectorized equivalent of `TwoSMA.next()`: boolean buy/sell arrays evaluated at each bar's close,
+    plus the first bar backtesting.py would call `next()` on (after the SMA warm-up).
+    """
+    close = np.asarray(close, dtype=float)
+    # Same memoized kernel as TwoSMA.init so crossovers match bit for bit
+    ma_fast = sma(close, n_fast)
+    ma_slow = sma(close, n_slow)
+    start = 1 + max(np.isnan(ma).argmin() for ma in (ma_fast, ma_slow))
+
+    buy, sell = crossover_signals(ma_fast, ma_slow)
+    buy[:start] = sell[:start] = False
+    return buy, sell, start
+
+
+class _Broker:
+    """
+    Minimal replica of backtesting.py's broker for full-equity market orders
+    (no SL/TP, no hedging, no exclusive orders, fills at the next bar's open).
+    It is only invoked on bars where an order fills; equity between fills is filled in with array slices.
+    """
+
+    def __init__(self, open_: np.ndarray, close: np.ndarray, cash: float, commission: float):
+        self.open = open_
+        self.close = close
+        self.cash = cash
+        self.commission = commission
+        self.trades: List[list] = []   # [size, entry_price, entry_bar]
+        self.closed: List[tuple] = []  # (size, entry_bar, exit_bar, entry_price, exit_price)
+
+    def equity(self, bar: int) -> float:
+        return self.cash + sum(size * (self.close[bar] - entry) for size, entry, _ in self.trades)
+
+    def margin_available(self, bar: int) -> float:
+        margin_used = sum(abs(size) * self.close[bar] for size, _, _ in self.trades)
+        return max(0, self.equity(bar) - margin_used)
+
+    def _close(self, trade: list, size: float, price: float, bar: int):
+        self.closed.append((size, trade[2], bar, trade[1], price))
+        self.cash += size * (price - trade[1])
+
+    def fill(self, direction: int, bar: int):
+        """Process one `buy()` (+1) or `sell()` (-1) order at this bar's open"""
+        price = self.open[bar]
+        adjusted_price = price * (1 + np.copysign(self.commission, direction))
+        size = direction * int((self.margin_available(bar) * FULL_EQUITY) // adjusted_price)
+        if not size:
+            return
+
+        # FIFO close/reduce opposite-facing trades at the unadjusted price
+        need_size = size
+        for trade in list(self.trades):
+            if (trade[0] > 0) == (direction > 0):
+                continue
+            if abs(need_size) >= abs(trade[0]):
+                self.trades.remove(trade)
+                self._close(trade, trade[0], price, bar)
+                need_size += trade[0]
+            else:
+                trade[0] += need_size
+                self._close(trade, -need_size, price, bar)
+                need_size = 0
+            if not need_size:
+                break
+
+        if abs(need_size) * adjusted_price > self.margin_available(bar):
+            return
+        if need_size:
+            self.trades.append([need_size, adjusted_price, bar])
+
+    def close_all(self, bar: int):
+        """`trade.close()` on every open trade: orders are queued in front, so they fill in reverse"""
+        for trade in reversed(self.trades):
+            self._close(trade, trade[0], self.open[bar], bar)
+        self.trades = []
+
+    def mark_to_market(self, equity: np.ndarray, begin: int, end: int):
+        """Fill equity[begin:end] for the current positions and stop the run if it is wiped out"""
+        total_size = sum(size for size, _, _ in self.trades)
+        cost = sum(size * entry for size, entry, _ in self.trades)
+        equity[begin:end] = self.cash + total_size * self.close[begin:end] - cost
+        broke = np.flatnonzero(equity[begin:end] <= 0)
+        if len(broke):
+            bar = begin + broke[0]
+            # backtesting.py removes from the list it iterates, which closes every other trade
+            for trade in self.trades[::2]:
+                self._close(trade, trade[0], self.close[bar], bar)
+            self.cash = 0
+            equity[bar:] = 0
+            raise _OutOfMoney
+
+
+def _slot_sum(values: np.ndarray) -> np.ndarray:
+    """Row sums over trade slots, added left to right like the replica's `sum()` (empty slots hold 0)"""
+    total = np.zeros(len(values))
+    for slot in range(values.shape[1]):
+        total = total + values[:, slot]
+    return total
+
+
+class _BrokerMatrix:
+    """
+    `_Broker` for many signal columns at once: one row of state per column and the FIFO trade list as
+    a (columns x slots) matrix, so every bar is one NumPy step across all columns. Closes are recorded
+    as (column, entry_bar, exit_bar) only, which is what trade counts and exposure need.
+    """
+
+    def __init__(self, open_: np.ndarray, close: np.ndarray, n_columns: int, cash: float, commission: float):
+        self.open = open_
+        self.close = close
+        self.commission = commission
+        self.cash = np.full(n_columns, float(cash))
+        self.count = np.zeros(n_columns, dtype=int)
+        self.size = np.zeros((n_columns, 4))
+        self.entry = np.zeros((n_columns, 4))
+        self.entry_bar = np.zeros((n_columns, 4), dtype=int)
+        self.closed: List[Tuple[np.ndarray, np.ndarray, int]] = []
+        self._rows = np.arange(n_columns)
+        self._update_totals()
+
+    def _update_totals(self):
+        self.total_size = _slot_sum(self.size)
+        self.cost = _slot_sum(self.size * self.entry)
+
+    def margin_available(self, bar: int) -> np.ndarray:
+        equity = self.cash + _slot_sum(self.size * (self.close[bar] - self.entry))
+        return np.maximum(0, equity - _slot_sum(np.abs(self.size) * self.close[bar]))
+
+    def _record(self, closing: np.ndarray, bar: int):
+        rows, slots = np.nonzero(closing)
+        if len(rows):
+            self.closed.append((rows, self.entry_bar[rows, slots], bar))
+
+    def _clear(self, rows: np.ndarray):
+        self.size[rows] = self.entry[rows] = 0
+        self.count[rows] = 0
+
+    def fill(self, direction: np.ndarray, bar: int):
+        """Process the `buy()` (+1) / `sell()` (-1) order of every column with a nonzero direction"""
+        price = self.open[bar]
+        adjusted_price = price * (1 + np.copysign(self.commission, direction))
+        need = np.floor_divide(self.margin_available(bar) * FULL_EQUITY, adjusted_price)
+        active = (direction != 0) & (need > 0)
+        if not active.any():
+            return
+        need = np.where(active, need, 0)
+
+        # FIFO close/reduce opposite-facing trades (all open trades of a column face the same way)
+        opposite = active & (np.sign(self.size[:, 0]) == -direction)
+        if opposite.any():
+            slots = np.arange(self.size.shape[1])
+            cumulative = np.cumsum(np.abs(self.size), axis=1)
+            full = opposite[:, None] & (slots < self.count[:, None]) & (cumulative <= need[:, None])
+            n_full = full.sum(axis=1)
+            remaining = need - np.where(n_full > 0, cumulative[self._rows, np.maximum(n_full - 1, 0)], 0)
+            partial = opposite & (n_full < self.count) & (remaining > 0)
+
+            closed_size = np.where(full, self.size, 0)
+            closed_size[partial, n_full[partial]] = -direction[partial] * remaining[partial]
+            for slot in slots:
+                self.cash = self.cash + closed_size[:, slot] * (price - self.entry[:, slot])
+            self._record(closed_size != 0, bar)
+            self.size[partial, n_full[partial]] += direction[partial] * remaining[partial]
+
+            # Drop the fully closed trades from the front of each queue
+            shifted = slots + n_full[:, None]
+            keep = shifted < len(slots)
+            shifted = np.minimum(shifted, len(slots) - 1)
+            self.size = np.where(keep, np.take_along_axis(self.size, shifted, axis=1), 0)
+            self.entry = np.where(keep, np.take_along_axis(self.entry, shifted, axis=1), 0)
+            self.entry_bar = np.where(keep, np.take_along_axis(self.entry_bar, shifted, axis=1), 0)
+            need = np.where(opposite, np.where(n_full == self.count, remaining, 0), need)
+            self.count = self.count - n_full
+
+        opening = active & (need > 0) & ~(need * adjusted_price > self.margin_available(bar))
+        if opening.any():
+            if self.count[opening].max() == self.size.shape[1]:
+                grow = ((0, 0), (0, self.size.shape[1]))
+                self.size, self.entry, self.entry_bar = (np.pad(a, grow) for a in (self.size, self.entry, self.entry_bar))
+            rows = np.flatnonzero(opening)
+            slot = self.count[rows]
+            self.size[rows, slot] = direction[rows] * need[rows]
+            self.entry[rows, slot] = adjusted_price[rows]
+            self.entry_bar[rows, slot] = bar
+            self.count[rows] += 1
+        self._update_totals()
+
+    def close_all(self, rows: np.ndarray, bar: int):
+        """`_Broker.close_all` for the given columns"""
+        selected = np.zeros(len(self.cash), dtype=bool)
+        selected[rows] = True
+        for slot in reversed(range(self.size.shape[1])):
+            self.cash = self.cash + np.where(selected, self.size[:, slot], 0) * (self.open[bar] - self.entry[:, slot])
+        self._record(selected[:, None] & (self.size != 0), bar)
+        self._clear(rows)
+        self._update_totals()
+
+    def wipe_out(self, rows: np.ndarray, bar: int):
+        """Out-of-money stop of the given columns: every other trade is recorded as closed, cash goes to 0"""
+        slots = np.arange(self.size.shape[1])
+        every_other = np.zeros(self.size.shape, dtype=bool)
+        every_other[rows] = (slots % 2 == 0) & (slots < self.count[rows, None])
+        self._record(every_other, bar)
+        self._clear(rows)
+        self.cash[rows] = 0
+        self._update_totals()
+
+
+def simulate_signal_matrix(open_: np.ndarray, close: np.ndarray, buy: np.ndarray, sell: np.ndarray,
+                           cash: float = 10000, commission: float = 0.001) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    `simulate_signals` for every column of (bars x columns) buy/sell matrices (signals before each column's
+    start already cleared). Returns the (columns x bars) equity matrix and the closed trades as
+    (column, entry_bar, exit_bar) rows.
+    """
+    n_bars, n_columns = buy.shape
+    broker = _BrokerMatrix(open_, close, n_columns, cash, commission)
+    equity = np.empty((n_columns, n_bars))
+    alive = np.ones(n_columns, dtype=bool)
+
+    direction = np.where(buy, 1, np.where(sell, -1, 0))
+    has_fill = np.r_[False, direction[:-1].any(axis=1)]
+    for bar in range(n_bars):
+        # An order placed at bar i's close fills at bar i + 1's open; before the first fill equity is the cash
+        if has_fill[bar]:
+            broker.fill(np.where(alive, direction[bar - 1], 0), bar)
+        equity[:, bar] = broker.cash + broker.total_size * close[bar] - broker.cost
+        broke = alive & (equity[:, bar] <= 0)
+        if broke.any():
+            broker.wipe_out(np.flatnonzero(broke), bar)
+            equity[broke, bar:] = 0
+            alive &= ~broke
+
+    if n_bars:
+        # End of run, for the columns still trading: close open trades and fill the order from the last bar
+        last_bar = n_bars - 1
+        broker.close_all(np.flatnonzero(alive), last_bar)
+        broker.fill(np.where(alive, direction[last_bar], 0), last_bar)
+        final = broker.cash + broker.total_size * close[last_bar] - broker.cost
+        equity[alive, last_bar] = np.where(final[alive] <= 0, 0, final[alive])
+
+    closed = np.zeros((0, 3), dtype=int)
+    if broker.closed:
+        closed = np.concatenate([np.column_stack([rows, entry_bars, np.full(len(rows), bar)])
+                                 for rows, entry_bars, bar in broker.closed])
+    return equity, closed
+
+
+def _drawdown_periods(dd: np.ndarray, index: pd.Index) -> Tuple[pd.Series, np.ndarray]:
+    """Duration series (aligned to `index`) and peak depth of each completed drawdown, as in backtesting.py"""
+    iloc = np.unique(np.r_[np.flatnonzero(dd == 0), len(dd) - 1])
+    prev, cur = iloc[:-1], iloc[1:]
+    keep = cur > prev + 1
+    prev, cur = prev[keep], cur[keep]
+    if not len(cur):
+        # No drawdown since no trade: backtesting.py falls back to the raw drawdown with zeros as NaN
+        no_dd = pd.Series(dd, index=index).replace(0, np.nan)
+        return no_dd, no_dd.to_numpy()
+    durations = pd.Series(pd.NaT, index=index, dtype='timedelta64[ns]') if isinstance(index, pd.DatetimeIndex) \
+        else pd.Series(np.nan, index=index)
+    durations.iloc[cur] = index[cur] - index[prev]
+    peaks = np.array([dd[p:c + 1].max() for p, c in zip(prev, cur)])
+    return durations, peaks
+
+
+def position_mask(entry_bar: np.ndarray, exit_bar: np.ndarray, n_bars: int) -> np.ndarray:
+    """Bars covered by at least one trade (entry and exit bars inclusive)"""
+    coverage = np.zeros(n_bars + 1, dtype=int)
+    np.add.at(coverage, entry_bar, 1)
+    np.add.at(coverage, exit_bar + 1, -1)
+    return np.cumsum(coverage[:-1]) > 0
+
+
+def annualized_returns(equity: np.ndarray, index: pd.Index) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    """
+    Annualized return, annualized volatility [%], daily returns and trading days per year of each
+    row of a (curves x bars) equity matrix, with backtesting.py's formulas. Daily returns skip the
+    first day, where pandas' pct_change would put NaN.
+    """
+    if not isinstance(index, pd.DatetimeIndex):
+        missing = np.full(len(equity), np.nan)
+        return missing, missing, np.array(np.nan), np.nan
+    days = index.normalize()
+    last_of_day = np.r_[days[1:] != days[:-1], True]
+    day_equity = equity[:, last_of_day]
+    day_returns = day_equity[:, 1:] / day_equity[:, :-1] - 1
+    # geometric_mean() over the pct_change Series, leading NaN included, for every row at once
+    growth = np.nan_to_num(day_returns, nan=0.0) + 1
+    wiped_out = np.any(growth <= 0, axis=1)
+    gmean_day_return = np.where(wiped_out, 0, np.exp(np.log(np.where(wiped_out[:, None], 1, growth)).sum(axis=1)
+                                                      / day_equity.shape[1]) - 1)
+    annual_trading_days = float(365 if (index.dayofweek >= 5).mean() > 2 / 7 * .6 else 252)
+
+    # Sample variance skipping NaN (0/0 returns after a wipe-out), NaN below two returns like pandas
+    valid = ~np.isnan(day_returns)
+    n_valid = valid.sum(axis=1)
+    deviation = day_returns - np.where(valid, day_returns, 0).sum(axis=1, keepdims=True) / n_valid[:, None]
+    variance = (np.where(valid, deviation, 0)**2).sum(axis=1) / (n_valid - 1)
+
+    annualized_return = (1 + gmean_day_return)**annual_trading_days - 1
+    volatility_pct = np.sqrt((variance + (1 + gmean_day_return)**2)**annual_trading_days
+                             - (1 + gmean_day_return)**(2 * annual_trading_days)) * 100
+    return annualized_return, volatility_pct, day_returns, annual_trading_days
+
+
+def compute_fast_stats(trades: pd.DataFrame, equity: np.ndarray, ohlc_data: pd.DataFrame,
+                       strategy: Optional[str] = None, risk_free_rate: float = 0) -> pd.Series:
+    """
+    Array-based port of backtesting.py's `compute_stats` (0.3.x): same keys, same formulas,
+    without the per-key Series enlargement and `DataFrame.apply` it spends most of its time in.
+    """
+    index = ohlc_data.index
+    dd = 1 - equity / np.maximum.accumulate(equity)
+    dd_dur, dd_peaks = _drawdown_periods(dd, index)
+    equity_df = pd.DataFrame({'Equity': equity, 'DrawdownPct': dd, 'DrawdownDuration': dd_dur}, index=index)
+
+    pl = trades['PnL']
+    returns = trades['ReturnPct']
+    durations = trades['Duration']
+
+    period = _data_period(index)
+    resolution = getattr(period, 'resolution_string', None) or getattr(period, 'resolution', None)
+
+    def _round_timedelta(value):
+        if not isinstance(value, pd.Timedelta):
+            return value
+        return value.ceil(resolution)
+
+    have_position = position_mask(trades['EntryBar'].to_numpy(dtype=int), trades['ExitBar'].to_numpy(dtype=int),
+                                   len(index))
+    annualized_return, volatility_pct, day_returns, annual_trading_days = annualized_returns(equity[None], index)
+    annualized_return, volatility_pct, day_returns = annualized_return[0], volatility_pct[0], day_returns[0]
+    annual_return_pct = annualized_return * 100
+    max_dd = -np.nan_to_num(dd.max())
+    n_trades = len(trades)
+
+    stats = {
+        'Start': index[0],
+        'End': index[-1],
+        'Duration': index[-1] - index[0],
+        'Exposure Time [%]': have_position.mean() * 100,
+        'Equity Final [$]': equity[-1],
+        'Equity Peak [$]': equity.max(),
+        'Return [%]': (equity[-1] - equity[0]) / equity[0] * 100,
+        'Buy & Hold Return [%]': (ohlc_data.Close.iloc[-1] - ohlc_data.Close.iloc[0]) / ohlc_data.Close.iloc[0] * 100,
+        'Return (Ann.) [%]': annual_return_pct,
+        'Volatility (Ann.) [%]': volatility_pct,
+        'Sharpe Ratio': np.clip((annual_return_pct - risk_free_rate) / (volatility_pct or np.nan), 0, np.inf),
+        'Sortino Ratio': np.clip((annualized_return - risk_free_rate)
+                                 / (np.sqrt(np.nanmean(np.minimum(day_returns, 0)**2)) * np.sqrt(annual_trading_days)),
+                                 0, np.inf),
+        'Calmar Ratio': np.clip(annualized_return / (-max_dd or np.nan), 0, np.inf),
+        'Max. Drawdown [%]': max_dd * 100,
+        'Avg. Drawdown [%]': -np.nanmean(dd_peaks) * 100 if np.any(~np.isnan(dd_peaks)) else np.nan,
+        'Max. Drawdown Duration': _round_timedelta(dd_dur.max()),
+        'Avg. Drawdown Duration': _round_timedelta(dd_dur.mean()),
+        '# Trades': n_trades,
+        'Win Rate [%]': np.nan if not n_trades else (pl > 0).sum() / n_trades * 100,
+        'Best Trade [%]': returns.max() * 100,
+        'Worst Trade [%]': returns.min() * 100,
+        'Avg. Trade [%]': geometric_mean(returns) * 100,
+        'Max. Trade Duration': _round_timedelta(durations.max()),
+        'Avg. Trade Duration': _round_timedelta(durations.mean()),
+        'Profit Factor': returns[returns > 0].sum() / (abs(returns[returns < 0].sum()) or np.nan),
+        'Expectancy [%]': returns.mean() * 100,
+        'SQN': np.sqrt(n_trades) * pl.mean() / (pl.std() or np.nan),
+        '_strategy': strategy,
+        '_equity_curve': equity_df,
+        '_trades': trades,
+    }
+    return _Stats(stats, dtype=object)
+
+
+def simulate_signals(open_: np.ndarray, close: np.ndarray, buy: np.ndarray, sell: np.ndarray, start: int,
+                     cash: float = 10000, commission: float = 0.001) -> Tuple[np.ndarray, List[tuple]]:
+    """
+    Trade buy/sell signals through the broker replica: returns the equity curve and the closed trades
+    as (size, entry_bar, exit_bar, entry_price, exit_price) tuples.
+    """
+    n_bars = len(close)
+    broker = _Broker(open_, close, cash, commission)
+    equity = np.full(n_bars, np.nan)
+
+    direction = np.where(buy, 1, np.where(sell, -1, 0))
+    signal_bars = np.flatnonzero(direction)
+    # An order placed at bar i's close fills at bar i + 1's open
+    fills = [(bar + 1, direction[bar]) for bar in signal_bars if bar + 1 < n_bars]
+    last_order = direction[-1] if n_bars else 0
+
+    try:
+        if start < n_bars:
+            segment_start = start
+            for fill_bar, order_direction in fills:
+                broker.mark_to_market(equity, segment_start, fill_bar)
+                broker.fill(order_direction, fill_bar)
+                segment_start = fill_bar
+            broker.mark_to_market(equity, segment_start, n_bars)
+
+            # End of run: close open trades and fill the order from the last bar, at the last bar
+            last_bar = n_bars - 1
+            broker.close_all(last_bar)
+            if last_order:
+                broker.fill(last_order, last_bar)
+            try:
+                broker.mark_to_market(equity, last_bar, n_bars)
+            except _OutOfMoney:
+                pass
+    except _OutOfMoney:
+        pass
+
+    return pd.Series(equity).bfill().fillna(broker.cash).to_numpy(), broker.closed
+
+
+def run_signal_backtest(bt_data: pd.DataFrame,
+                        buy: np.ndarray,
+                        sell: np.ndarray,
+                        start: int,
+                        cash: float = 10000,
+                        commission: float = 0.001,
+                        strategy: Optional[str] = None) -> pd.Series:
+    """
+    Backtest precomputed buy/sell signals with backtesting.py's order semantics and return
+    the same stats Series `Backtest.run()` produces (including `_equity_curve` and `_trades`).
+    """
+    equity, closed = simulate_signals(bt_data['Open'].to_numpy(dtype=float), bt_data['Close'].to_numpy(dtype=float),
+                                      buy, sell, start, cash, commission)
+
+    index = bt_data.index
+    closed = np.array(closed, dtype=float).reshape(-1, 5)
+    size, entry_bar, exit_bar, entry_price, exit_price = closed.T
+    entry_bar = entry_bar.astype(int)
+    exit_bar = exit_bar.astype(int)
+    trades = pd.DataFrame({
+        'Size': size.astype(int),
+        'EntryBar': entry_bar,
+        'ExitBar': exit_bar,
+        'EntryPrice': entry_price,
+        'ExitPrice': exit_price,
+        'PnL': size * (exit_price - entry_price),
+        'ReturnPct': np.copysign(1, size) * (exit_price / entry_price - 1),
+        'EntryTime': index[entry_bar],
+        'ExitTime': index[exit_bar],
+    })
+    trades['Duration'] = trades['ExitTime'] - trades['EntryTime']
+
+    with np.errstate(invalid='ignore'):
+        return compute_fast_stats(trades, equity, bt_data, strategy)
+
+
+def run_fast_two_sma(bt_data: pd.DataFrame, n_fast: int, n_slow: int,
+                     cash: float = 10000, commission: float = 0.001) -> pd.Series:
+    """Fast-path TwoSMA backtest on backtesting.py-formatted data"""
+    buy, sell, start = two_sma_signals(bt_data['Close'].to_numpy(dtype=float), n_fast, n_slow)
+    logger.info(f"Fast engine: {int(buy.sum())} buy and {int(sell.sum())} sell signals over {len(bt_data)} bars")
+    return run_signal_backtest(bt_data, buy, sell, start, cash, commission,
+                               strategy=f'TwoSMA(n_fast={n_fast},n_slow={n_slow})')
@@ -0,0 +1,87 @@
+# src/backtesting/memo.py
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache
+from src.utils.caching import LockedCache
+
+logger = logging.getLogger(__name__)
+
+# Bump when the engine or the stats it produces change, so stored results are not reused
+MEMO_VERSION = 2
+
+# BacktestSummary column -> backtesting.py stats label, to rebuild a displayable result from stored rows
+SUMMARY_STATS = {
+    'start_date': 'Start',
+    'end_date': 'End',
+    'duration': 'Duration',
+    'exposure_time_pct': 'Exposure Time [%]',
+    'equity_final': 'Equity Final [$]',
+    'equity_peak': 'Equity Peak [$]',
+    'return_pct': 'Return [%]',
+    'buy_hold_return_pct': 'Buy & Hold Return [%]',
+    'annual_return_pct': 'Return (Ann.) [%]',
+    'annual_volatility_pct': 'Volatility (Ann.) [%]',
+    'sharpe_ratio': 'Sharpe Ratio',
+    'sortino_ratio': 'Sortino Ratio',
+    'calmar_ratio': 'Calmar Ratio',
+    'max_drawdown_pct': 'Max. Drawdown [%]',
+    'avg_drawdown_pct': 'Avg. Drawdown [%]',
+    'max_drawdown_duration': 'Max. Drawdown Duration',
+    'avg_drawdown_duration': 'Avg. Drawdown Duration',
+    'total_trades': '# Trades',
+    'win_rate_pct': 'Win Rate [%]',
+    'best_trade_pct': 'Best Trade [%]',
+    'worst_trade_pct': 'Worst Trade [%]',
+    'avg_trade_pct': 'Avg. Trade [%]',
+    'max_trade_duration': 'Max. Trade Duration',
+    'avg_trade_duration': 'Avg. Trade Duration',
+    'profit_factor': 'Profit Factor',
+    'expectancy_pct': 'Expectancy [%]',
+    'sqn': 'SQN',
+}
+
+
+def data_fingerprint(bt_data: pd.DataFrame) -> str:
+    """SHA-256 of the bars a backtest sees: timestamps plus OHLCV as float64"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(bt_data.index.to_numpy(dtype='datetime64[ns]')).tobytes())
+    for column in ['Open', 'High', 'Low', 'Close', 'Volume']:
+        digest.update(np.ascontiguousarray(bt_data[column].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+def backtest_cache_key(fingerprint: str, strategy: str, params: Dict[str, Any]) -> str:
+    """Key of one (data, strategy, parameters) combination; params must be JSON-serializable"""
+    payload = json.dumps({'v': MEMO_VERSION, 'data': fingerprint, 'strategy': strategy, 'params': params},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def stats_from_records(summary: Dict, details: List[Dict], equity: Optional[pd.Series] = None) -> pd.Series:
+    """
+    Rebuild a backtesting.py-style result from stored BacktestSummary/BacktestDetails rows
+    and, when it was stored, the decoded equity curve.
+    """
+    stats = pd.Series({label: summary.get(column) for column, label in SUMMARY_STATS.items()}, dtype=object)
+    stats['_strategy'] = summary.get('strategy_name')
+    stats['_trades'] = pd.DataFrame({
+        'Size': [trade['position_size'] for trade in details],
+        'EntryPrice': [float(trade['buy_price']) for trade in details],
+        'ExitPrice': [float(trade['sell_price']) for trade in details],
+        'EntryTime': [pd.Timestamp.combine(trade['buy_date'], trade['buy_time']) for trade in details],
+        'ExitTime': [pd.Timestamp.combine(trade['sell_date'], trade['sell_time']) for trade in details],
+    })
+    if equity is not None:
+        stats['_equity_curve'] = pd.DataFrame({'Equity': equity, 'DrawdownPct': 1 - equity / equity.cummax()})
+    return stats
+
+
+class BacktestMemo(LockedCache):
+    """Thread-safe in-process LRU of cache_key -> (test_id, result)"""
+
+    def __init__(self, maxsize: int = 256):
+        super().__init__(LRUCache(maxsize))
@@ -0,0 +1,202 @@
+# src/backtesting/portfolio.py
+import argparse
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from src.backtesting.robustness import path_metrics
+from src.backtesting.two_sma import BACKTEST_COMMISSION, TwoSMA
+from src.database.arrays import PriceMatrix
+from src.database.operations import DatabaseOperations
+from src.signals.indicators import crossover_signals, rolling_mean
+
+logger = logging.getLogger(__name__)
+
+PORTFOLIO_CASH = 100000
+# Periodic rebalance back to equal slots, in bars (about monthly on daily bars); 0 trades on signals only
+REBALANCE_EVERY = 21
+
+
+def forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """Carry each column's last price over the bars it has none (NaN stays before its first bar)"""
+    valid = ~np.isnan(matrix)
+    rows = np.where(valid, np.arange(len(matrix))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled = np.take_along_axis(matrix, rows, axis=0)
+    filled[~np.maximum.accumulate(valid, axis=0)] = np.nan
+    return filled
+
+
+def portfolio_signals(close: np.ndarray, n_fast: int, n_slow: int, allow_short: bool = True) -> np.ndarray:
+    """
+    Side (+1 long / -1 short / 0 flat) of every ticker decided at each bar close, for the whole
+    (bars x tickers) matrix at once. Crossovers are the ones TwoSMA trades on, but the portfolio
+    deliberately holds a reversal position: a golden cross goes long and a death cross reverses to
+    short (flat with allow_short=False). The single-ticker engine cannot reverse a full-equity
+    position, so per-ticker results only match `run_two_sma_backtest` up to the first reversal.
+    """
+    buy, sell = crossover_signals(rolling_mean(close, n_fast), rolling_mean(close, n_slow))
+    sides = np.nan_to_num(forward_fill(np.where(buy, 1.0, np.where(sell, -1.0, np.nan))))
+    return np.maximum(sides, 0) if not allow_short else sides
+
+
+def simulate_portfolio(prices: PriceMatrix, sides: np.ndarray, cash: float = PORTFOLIO_CASH,
+                       commission: float = BACKTEST_COMMISSION,
+                       rebalance_every: int = REBALANCE_EVERY) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Trade a shared book on the sides decided at each close, filling at the next bar's open.
+
+    Every ticker owns an equal slot of current equity (equity / n_tickers). A ticker whose side
+    changes is traded to its new side at a full slot; every `rebalance_every` bars all positions
+    are reset to equal slots. Shares are fractional and commission is charged on traded notional.
+    Positions are marked at the last known close. Only bars with orders are visited; equity
+    in between is one matrix-vector product per segment.
+    Returns the equity curve and per-ticker arrays (pnl, commission, trades, exposure bars).
+    """
+    n_bars, n_tickers = prices.close.shape
+    mark = np.nan_to_num(forward_fill(prices.close))
+    tradable = ~np.isnan(prices.open) & (prices.open > 0)
+    fill_price = np.where(tradable, prices.open, 1.0)
+
+    # Side wanted at each bar's open: the one decided at the previous close
+    wanted = np.zeros_like(sides)
+    wanted[1:] = sides[:-1]
+    signal_bars = np.flatnonzero((wanted[1:] != wanted[:-1]).any(axis=1)) + 1
+    periodic = set(range(rebalance_every, n_bars, rebalance_every)) if rebalance_every else set()
+    order_bars = sorted(set(signal_bars) | periodic)
+
+    holdings = np.zeros(n_tickers)
+    side = np.zeros(n_tickers)
+    balance = float(cash)
+    flows = np.zeros(n_tickers)
+    fees = np.zeros(n_tickers)
+    trades = np.zeros(n_tickers, dtype=int)
+    exposure = np.zeros(n_tickers, dtype=int)
+    equity = np.empty(n_bars)
+
+    segment_start = 0
+    for bar in order_bars:
+        equity[segment_start:bar] = balance + mark[segment_start:bar] @ holdings
+        exposure += (holdings != 0) * (bar - segment_start)
+        segment_start = bar
+
+        price = fill_price[bar]
+        value = balance + np.where(tradable[bar], price, mark[bar]) @ holdings
+        if value <= 0:
+            logger.warning(f"Portfolio wiped out at bar {bar}")
+            equity[bar:] = 0
+            return equity, {'pnl': flows, 'commission': fees, 'trades': trades, 'exposure': exposure}
+
+        target = wanted[bar]
+        reverse = (target != side) & tradable[bar]
+        resize = tradable[bar] if bar in periodic else reverse
+        new_holdings = np.where(resize, target * (value / n_tickers) / price, holdings)
+        delta = new_holdings - holdings
+        fee = commission * np.abs(delta) * price
+        balance -= delta @ price + fee.sum()
+        flows -= delta * price + fee
+        fees += fee
+        trades += reverse & (target != 0)
+        side = np.where(reverse, target, side)
+        holdings = new_holdings
+
+    equity[segment_start:] = balance + mark[segment_start:] @ holdings
+    exposure += (holdings != 0) * (n_bars - segment_start)
+    return equity, {'pnl': flows + holdings * mark[-1], 'commission': fees, 'trades': trades, 'exposure': exposure}
+
+
+def compute_portfolio_backtest(prices: PriceMatrix, n_fast: int = TwoSMA.n_fast, n_slow: int = TwoSMA.n_slow,
+                               cash: float = PORTFOLIO_CASH, commission: float = BACKTEST_COMMISSION,
+                               rebalance_every: int = REBALANCE_EVERY,
+                               allow_short: bool = True) -> Tuple[dict, pd.DataFrame, pd.Series]:
+    """
+    TwoSMA on every ticker of an aligned price matrix with shared capital, without touching the database.
+    Signals use forward-filled closes, so a ticker missing a bar keeps its last price for that bar.
+    Returns the portfolio_backtest row, one portfolio_ticker_stats row per ticker and the equity curve.
+    """
+    close = forward_fill(prices.close)
+    sides = portfolio_signals(close, n_fast, n_slow, allow_short)
+    equity, per_ticker = simulate_portfolio(prices, sides, cash, commission, rebalance_every)
+
+    index = pd.DatetimeIndex(prices.timestamp)
+    years = (index[-1] - index[0]) / pd.Timedelta(days=365.25)
+    periods_per_year = (len(index) - 1) / years if years > 0 else 252.0
+    returns = np.divide(equity[1:], equity[:-1], out=np.zeros(len(equity) - 1), where=equity[:-1] > 0) - 1
+    metrics = {name: float(values[0]) for name, values in path_metrics(returns, periods_per_year).items()}
+
+    first_close = np.take_along_axis(close, np.argmax(~np.isnan(close), axis=0)[None], axis=0)[0]
+    buy_hold = (close[-1] / first_close - 1) * 100
+    ticker_stats = pd.DataFrame({
+        'ticker': prices.tickers,
+        'pnl': per_ticker['pnl'],
+        'contribution_pct': per_ticker['pnl'] / cash * 100,
+        'total_trades': per_ticker['trades'],
+        'exposure_time_pct': per_ticker['exposure'] / len(index) * 100,
+        'commission_paid': per_ticker['commission'],
+        'buy_hold_return_pct': buy_hold,
+    })
+
+    summary = {
+        'description': f'TwoSMA portfolio of {len(prices.tickers)} tickers',
+        'strategy_name': f'TwoSMA({n_fast},{n_slow})',
+        'strategy_parameters': f'Fast={n_fast},Slow={n_slow},Rebalance={rebalance_every},Short={allow_short}',
+        'n_tickers': len(prices.tickers),
+        'start_date': index[0],
+        'end_date': index[-1],
+        'initial_cash': float(cash),
+        'commission': float(commission),
+        'equity_final': float(equity[-1]),
+        'equity_peak': float(equity.max()),
+        'return_pct': metrics['return_pct'],
+        'buy_hold_return_pct': float(np.nanmean(buy_hold)),
+        'annual_return_pct': float(((equity[-1] / cash) ** (1 / years) - 1) * 100) if years > 0 and equity[-1] > 0 else None,
+        'annual_volatility_pct': float(returns.std(ddof=1) * np.sqrt(periods_per_year) * 100) if len(returns) > 1 else None,
+        'sharpe_ratio': metrics['sharpe_ratio'] if np.isfinite(metrics['sharpe_ratio']) else None,
+        'max_drawdown_pct': metrics['max_drawdown_pct'],
+        'exposure_time_pct': float((np.abs(sides).sum(axis=1) > 0).mean() * 100),
+        'total_trades': int(per_ticker['trades'].sum()),
+        'commission_paid': float(per_ticker['commission'].sum()),
+    }
+    logger.info(f"Portfolio backtest of {len(prices.tickers)} tickers over {len(index)} bars: "
+                f"return {summary['return_pct']:.2f}%, {summary['total_trades']} trades")
+    return summary, ticker_stats, pd.Series(equity, index=index, name='Equity')
+
+
+def run_portfolio_backtest(db_ops: DatabaseOperations, tickers: List[str], start_date: str, end_date: str,
+                           timeframe: str = 'daily', **kwargs) -> Tuple[Optional[int], Optional[dict]]:
+    """Load the tickers in one query, run `compute_portfolio_backtest` and store it; returns (portfolio_id, result)"""
+    try:
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        prices = db_ops.get_price_matrix(tickers, start_date, end_date, timeframe)
+        if prices is None:
+            logger.warning(f"No stored bars for any of {len(tickers)} tickers")
+            return None, None
+        missing = sorted(set(tickers) - set(prices.tickers))
+        if missing:
+            logger.warning(f"No stored bars for {len(missing)} tickers, left out of the portfolio: {missing[:10]}")
+        summary, ticker_stats, equity = compute_portfolio_backtest(prices, **kwargs)
+        portfolio_id = db_ops.save_portfolio_backtest(summary, ticker_stats, equity)
+        return portfolio_id, {'summary': summary, 'tickers': ticker_stats, 'equity': equity}
+    except Exception as e:
+        logger.error(f"Error during portfolio backtest: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    arg_parser = argparse.ArgumentParser(description="Run the TwoSMA strategy on a portfolio with shared capital")
+    arg_parser.add_argument("tickers_file", help="Text file with one ticker per line")
+    arg_parser.add_argument("--start-date", required=True)
+    arg_parser.add_argument("--end-date", required=True)
+    arg_parser.add_argument("--timeframe", default="daily")
+    arg_parser.add_argument("--cash", type=float, default=PORTFOLIO_CASH)
+    arg_parser.add_argument("--rebalance-every", type=int, default=REBALANCE_EVERY)
+    arg_parser.add_argument("--long-only", action="store_true")
+    args = arg_parser.parse_args()
+
+    with open(args.tickers_file) as f:
+        universe = [line.strip() for line in f if line.strip()]
+    portfolio_id, _ = run_portfolio_backtest(DatabaseOperations(), universe, args.start_date, args.end_date,
+                                             args.timeframe, cash=args.cash, rebalance_every=args.rebalance_every,
+                                             allow_short=not args.long_only)
+    logger.info(f"Portfolio backtest saved as portfolio_id={portfolio_id}")
@@ -0,0 +1,183 @@
+# src/backtesting/robustness.py
+import logging
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from src.database.models import ROBUSTNESS_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+METRICS = ['return_pct', 'max_drawdown_pct', 'sharpe_ratio']
+# Block summaries and simulated paths are evaluated in row chunks of about this many cells (16 MB per float64 matrix)
+CHUNK_CELLS = 1 << 21
+
+
+def path_metrics(returns: np.ndarray, periods_per_year: float) -> Dict[str, np.ndarray]:
+    """
+    Total return, max drawdown (both in %, drawdown negative as in the backtest stats) and annualized
+    Sharpe (per-period mean / std) of every row of a (paths x periods) matrix of simple returns.
+    """
+    returns = np.atleast_2d(returns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_equity = np.cumsum(np.log1p(returns), axis=1)
+        peak = np.maximum(np.maximum.accumulate(log_equity, axis=1), 0.0)
+        drawdown = np.minimum((log_equity - peak).min(axis=1), 0.0)
+        std = returns.std(axis=1, ddof=1)
+        sharpe = np.where(std > 0, returns.mean(axis=1) / std, np.nan) * np.sqrt(periods_per_year)
+    return {
+        'return_pct': np.expm1(log_equity[:, -1]) * 100,
+        'max_drawdown_pct': np.expm1(drawdown) * 100,
+        'sharpe_ratio': sharpe,
+    }
+
+
+def block_summaries(returns: np.ndarray, length: int) -> Dict[str, np.ndarray]:
+    """
+    For every start bar (wrapping around the end), what a path needs to know about the `length`
+    bars from there: log growth, sum and sum of squares of returns, lowest and highest log equity
+    reached relative to the block start, and the deepest drawdown whose peak lies inside the block.
+    Start bars are processed in chunks of about CHUNK_CELLS window cells, so long intraday series
+    never materialize the whole (bars x length) window matrix.
+    """
+    extended = np.concatenate((returns, returns[:length - 1]))
+    windows = sliding_window_view(extended, length)
+    summaries = {key: np.empty(len(windows)) for key in ('log', 'sum', 'sumsq', 'low', 'high', 'drawdown')}
+    step = max(1, CHUNK_CELLS // length)
+    for first in range(0, len(windows), step):
+        chunk = windows[first:first + step]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            levels = np.cumsum(np.log1p(chunk), axis=1)
+        peaks = np.maximum(np.maximum.accumulate(levels, axis=1), 0.0)
+        rows = slice(first, first + len(chunk))
+        summaries['log'][rows] = levels[:, -1]
+        summaries['sum'][rows] = chunk.sum(axis=1)
+        summaries['sumsq'][rows] = np.square(chunk).sum(axis=1)
+        summaries['low'][rows] = levels.min(axis=1)
+        summaries['high'][rows] = levels.max(axis=1)
+        summaries['drawdown'][rows] = np.minimum((levels - peaks).min(axis=1), 0.0)
+    return summaries
+
+
+def _stitched_metrics(full: Dict, tail: Dict, starts: np.ndarray, n_periods: int,
+                      periods_per_year: float) -> Dict[str, np.ndarray]:
+    """
+    Metrics of paths made of the blocks starting at `starts` (paths x blocks), the last block cut to
+    the `tail` length, computed from block summaries only: a path's drawdown is either inside one
+    block or runs from the highest point before a block to that block's lowest point.
+    """
+    def gather(key):
+        values = full[key][starts]
+        values[:, -1] = tail[key][starts[:, -1]]
+        return values
+
+    growth = gather('log')
+    level = np.cumsum(growth, axis=1)
+    start_level = level - growth
+    highs = np.maximum.accumulate(start_level + gather('high'), axis=1)
+    prior_peak = np.zeros_like(highs)
+    prior_peak[:, 1:] = np.maximum(highs[:, :-1], 0.0)
+    drawdown = np.minimum(gather('drawdown'), start_level + gather('low') - prior_peak).min(axis=1)
+
+    mean = gather('sum').sum(axis=1) / n_periods
+    var = (gather('sumsq').sum(axis=1) - n_periods * mean ** 2) / (n_periods - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(var > 0, mean / np.sqrt(var), np.nan) * np.sqrt(periods_per_year)
+    return {
+        'return_pct': np.expm1(level[:, -1]) * 100,
+        'max_drawdown_pct': np.expm1(np.minimum(drawdown, 0.0)) * 100,
+        'sharpe_ratio': sharpe,
+    }
+
+
+def block_bootstrap(returns: np.ndarray, n_paths: int, block_size: int, periods_per_year: float,
+                    rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """
+    Circular block bootstrap: each path is as long as `returns` and stitched from random runs of
+    `block_size` consecutive periods (wrapping at the end), which keeps short-range dependence
+    such as positions held across bars. With block_size=1 it is the plain bootstrap.
+
+    Blocks are summarized once, so each path costs O(n_periods / block_size).
+    """
+    n_periods = len(returns)
+    block_size = min(block_size, n_periods)
+    n_blocks = -(-n_periods // block_size)
+    full = block_summaries(returns, block_size)
+    tail_length = n_periods - (n_blocks - 1) * block_size
+    tail = full if tail_length == block_size else block_summaries(returns, tail_length)
+
+    chunk = max(1, CHUNK_CELLS // n_blocks)
+    parts = []
+    for first in range(0, n_paths, chunk):
+        starts = rng.integers(0, n_periods, size=(min(chunk, n_paths - first), n_blocks))
+        parts.append(_stitched_metrics(full, tail, starts, n_periods, periods_per_year))
+    return {metric: np.concatenate([part[metric] for part in parts]) for metric in METRICS}
+
+
+def trade_returns(result: pd.Series) -> np.ndarray:
+    """
+    Growth of account equity contributed by each closed trade, in exit order.
+
+    Trades are sized with the whole account, so trade i returns PnL_i over the equity it started
+    from (initial cash plus the PnL of the trades closed before it).
+    """
+    trades = result['_trades'].sort_values('ExitBar')
+    pnl = trades['PnL'].to_numpy(dtype=np.float64)
+    cash = float(result['_equity_curve']['Equity'].iloc[0])
+    return pnl / (cash + np.concatenate(([0.0], np.cumsum(pnl)[:-1])))
+
+
+def bar_returns(result: pd.Series) -> np.ndarray:
+    """Bar-to-bar returns of the equity curve (0 once the account is wiped out)"""
+    equity = result['_equity_curve']['Equity'].to_numpy(dtype=np.float64)
+    return np.divide(equity[1:], equity[:-1], out=np.ones(len(equity) - 1), where=equity[:-1] > 0) - 1
+
+
+def analyze_robustness(result: pd.Series, n_paths: int = 10000, confidence: float = 0.95,
+                       block_size: Optional[int] = None, seed: Optional[int] = None) -> pd.DataFrame:
+    """
+    Confidence intervals of return, max drawdown and Sharpe for a backtest result.
+
+    'trade_bootstrap' redraws the closed trades with replacement; 'block_bootstrap' redraws blocks
+    of bar returns (block_size defaults to n_bars^(1/3)). `observed` is each metric computed the
+    same way on the actual sequence, so it is comparable with the interval; the Sharpe here is the
+    annualized per-period mean / std, not backtesting.py's return / volatility ratio.
+    Trade paths only see equity at exits, so their drawdowns are shallower than bar-level ones.
+    Returns one row per (method, metric) in the backtest_robustness layout.
+    """
+    rng = np.random.default_rng(seed)
+    index = result['_equity_curve'].index
+    years = (index[-1] - index[0]) / pd.Timedelta(days=365.25) if isinstance(index, pd.DatetimeIndex) else 0
+    tails = [(1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100]
+
+    samples = {}
+    trades = trade_returns(result) if len(result['_trades']) else np.empty(0)
+    if len(trades) >= 2:
+        per_year = len(trades) / years if years > 0 else 1.0
+        samples['trade_bootstrap'] = (None, path_metrics(trades, per_year),
+                                      block_bootstrap(trades, n_paths, 1, per_year, rng))
+    bars = bar_returns(result)
+    if len(bars) >= 2:
+        block_size = block_size or max(1, round(len(bars) ** (1 / 3)))
+        per_year = len(bars) / years if years > 0 else 252.0
+        samples['block_bootstrap'] = (block_size, path_metrics(bars, per_year),
+                                      block_bootstrap(bars, n_paths, block_size, per_year, rng))
+
+    rows = []
+    for method, (method_block, observed, simulated) in samples.items():
+        for metric in METRICS:
+            values = simulated[metric][np.isfinite(simulated[metric])]
+            low, high = np.percentile(values, tails) if len(values) else (np.nan, np.nan)
+            rows.append({
+                'method': method,
+                'metric': metric,
+                'observed': float(observed[metric][0]),
+                'mean': float(values.mean()) if len(values) else np.nan,
+                'ci_low': float(low),
+                'ci_high': float(high),
+                'confidence_level': confidence,
+                'n_paths': n_paths,
+                'block_size': method_block,
+            })
+    logger.info(f"Robustness analysis: {n_paths} paths per method over {len(trades)} trades and {len(bars)} bars")
+    return pd.DataFrame(rows, columns=ROBUSTNESS_COLUMNS).astype({'block_size': 'Int64', 'n_paths': 'int64'})
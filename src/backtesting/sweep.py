@@ -0,0 +1,106 @@
+# src/backtesting/sweep.py
+import logging
+from typing import Iterable, Optional
+import numpy as np
+import pandas as pd
+from src.backtesting.fast_engine import annualized_returns, simulate_signal_matrix
+from src.backtesting.two_sma import prepare_backtest_data
+from src.signals.indicators import crossover_signals, sma
+
+logger = logging.getLogger(__name__)
+
+# Bars x pairs cells simulated at once (signal and equity matrices of one block)
+SWEEP_BLOCK_CELLS = 4_000_000
+
+
+def sweep_two_sma(bt_data: pd.DataFrame,
+                  fast_windows: Iterable[int] = range(5, 25),
+                  slow_windows: Iterable[int] = range(10, 50),
+                  cash: float = 10000,
+                  commission: float = 0.001,
+                  maximize: str = 'Return [%]',
+                  top: Optional[int] = None) -> pd.DataFrame:
+    """
+    Evaluate TwoSMA for every (n_fast, n_slow) pair of backtesting.py-formatted data.
+
+    SMAs are computed once per distinct window; crossovers, the broker state, equity, exposure and
+    stats are (bars x pairs) matrices for a whole block of pairs, stepped through in one pass over
+    the bars. Return, equity, trades, exposure, drawdown, volatility and Sharpe are the values
+    `run_fast_two_sma` reports for the same pair.
+    """
+    logger.info("Starting TwoSMA parameter sweep")
+    try:
+        open_ = bt_data['Open'].to_numpy(dtype=float)
+        close = bt_data['Close'].to_numpy(dtype=float)
+
+        pairs = np.array([(f, s) for f in fast_windows for s in slow_windows if f < s], dtype=int)
+        if not len(pairs) or len(close) < 2:
+            logger.warning("Nothing to sweep: no valid (fast, slow) pairs or not enough bars")
+            return pd.DataFrame()
+
+        # Every distinct window is computed exactly once and shared by all pairs using it
+        windows, inverse = np.unique(pairs, return_inverse=True)
+        inverse = inverse.reshape(pairs.shape)
+        means = np.column_stack([sma(close, window) for window in windows])
+        # First bar TwoSMA.next() runs on, as in two_sma_signals
+        first_valid = np.isnan(means).argmin(axis=0)
+        starts = 1 + np.maximum(first_valid[inverse[:, 0]], first_valid[inverse[:, 1]])
+
+        n_pairs, n_bars = len(pairs), len(close)
+        equity_final = np.empty(n_pairs)
+        exposure = np.empty(n_pairs)
+        volatility = np.empty(n_pairs)
+        sharpe = np.empty(n_pairs)
+        max_drawdown = np.empty(n_pairs)
+        n_trades = np.empty(n_pairs, dtype=int)
+        # Pairs go through in blocks so the signal and equity matrices stay bounded on intraday data
+        block = max(SWEEP_BLOCK_CELLS // n_bars, 1)
+        for first in range(0, n_pairs, block):
+            rows = slice(first, min(first + block, n_pairs))
+            buy, sell = crossover_signals(means[:, inverse[rows, 0]], means[:, inverse[rows, 1]])
+            before_start = np.arange(n_bars)[:, None] < starts[None, rows]
+            buy[before_start] = sell[before_start] = False
+            equity, closed = simulate_signal_matrix(open_, close, buy, sell, cash, commission)
+
+            pair, entry_bar, exit_bar = closed.T
+            coverage = np.zeros((buy.shape[1], n_bars + 1), dtype=int)
+            np.add.at(coverage, (pair, entry_bar), 1)
+            np.add.at(coverage, (pair, exit_bar + 1), -1)
+            exposure[rows] = (np.cumsum(coverage[:, :-1], axis=1) > 0).mean(axis=1) * 100
+            n_trades[rows] = np.bincount(pair, minlength=buy.shape[1])
+
+            drawdown = 1 - equity / np.maximum.accumulate(equity, axis=1)
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                annualized_return, block_volatility, _, _ = annualized_returns(equity, bt_data.index)
+                # As `volatility_pct or np.nan` in compute_fast_stats
+                sharpe[rows] = np.clip(annualized_return * 100 / np.where(block_volatility == 0, np.nan, block_volatility),
+                                       0, np.inf)
+            volatility[rows] = block_volatility
+            equity_final[rows] = equity[:, -1]
+            max_drawdown[rows] = -np.nan_to_num(drawdown.max(axis=1)) * 100
+
+        results = pd.DataFrame({
+            'n_fast': pairs[:, 0],
+            'n_slow': pairs[:, 1],
+            'Equity Final [$]': equity_final,
+            'Return [%]': (equity_final / cash - 1) * 100,
+            'Buy & Hold Return [%]': (close[-1] / close[0] - 1) * 100,
+            'Exposure Time [%]': exposure,
+            'Volatility (Ann.) [%]': volatility,
+            'Sharpe Ratio': sharpe,
+            'Max. Drawdown [%]': max_drawdown,
+            '# Trades': n_trades,
+        })
+        results = results.sort_values(maximize, ascending=False, na_position='last').reset_index(drop=True)
+
+        logger.info(f"Sweep completed for {len(pairs)} parameter pairs over {len(close)} bars")
+        return results.head(top) if top else results
+
+    except Exception as e:
+        logger.error(f"Error during TwoSMA sweep: {str(e)}")
+        raise
+
+
+def run_two_sma_sweep(data: pd.DataFrame, *args, **kwargs) -> pd.DataFrame:
+    """`sweep_two_sma` on ohlc_data rows (as returned by `get_stock_data`); same arguments"""
+    return sweep_two_sma(prepare_backtest_data(data), *args, **kwargs)
@@ -1,14 +1,25 @@
 #two_sma.py
 import logging
+from typing import Dict, List, Tuple
 from backtesting import Backtest, Strategy
 from backtesting.lib import crossover
-from backtesting.test import SMA
 import pandas as pd
 from src.database.operations import DatabaseOperations
+from src.backtesting.fast_engine import run_fast_two_sma
+from src.backtesting.memo import BacktestMemo, backtest_cache_key, data_fingerprint, stats_from_records
+from src.backtesting.robustness import analyze_robustness
+from src.signals.indicators import sma
+from config.settings import BACKTEST_MEMO_SIZE, ROBUSTNESS_CONFIDENCE, ROBUSTNESS_PATHS
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+BACKTEST_CASH = 10000
+BACKTEST_COMMISSION = 0.001
+
+# Results of this process keyed by data fingerprint, strategy and parameters
+_memo = BacktestMemo(BACKTEST_MEMO_SIZE)
+
 class TwoSMA(Strategy):
     n_slow = 20
     n_fast = 10
@@ -22,8 +33,9 @@ class TwoSMA(Strategy):
             # Calculate moving averages using numpy
             #self.ma_slow = self.I(lambda x: pd.Series(x).rolling(self.n_slow).mean(), close)
             #self.ma_fast = self.I(lambda x: pd.Series(x).rolling(self.n_fast).mean(), close)
-            self.ma_slow = self.I(SMA, close, self.n_slow)
-            self.ma_fast = self.I(SMA, close, self.n_fast)
+            # Shared, memoized kernels: the chart and the fast engine reuse these arrays
+            self.ma_slow = self.I(sma, close, self.n_slow, name=f'SMA({self.n_slow})')
+            self.ma_fast = self.I(sma, close, self.n_fast, name=f'SMA({self.n_fast})')
 
             logger.info("Successfully initialized moving averages")
         except Exception as e:
@@ -36,96 +48,164 @@ class TwoSMA(Strategy):
         elif crossover(self.ma_slow, self.ma_fast):
             self.sell()
 
-def run_two_sma_backtest(data: pd.DataFrame, db_ops: DatabaseOperations, ticker: str):
-    logger.info("Starting two SMA backtest")
-    try:
-        # Prepare data for backtesting.py
-        bt_data = data.rename(columns={
-            'close_price': 'Close',
-            'high_price': 'High',
-            'low_price': 'Low',
-            'open_price': 'Open',
-            'volume': 'Volume'
+def prepare_backtest_data(data: pd.DataFrame) -> pd.DataFrame:
+    """Rename ohlc_data columns to the OHLCV layout expected by backtesting.py"""
+    bt_data = data.rename(columns={
+        'close_price': 'Close',
+        'high_price': 'High',
+        'low_price': 'Low',
+        'open_price': 'Open',
+        'volume': 'Volume'
+    })
+    if 'bar_date' not in bt_data.columns:
+        # Typed frame (get_stock_data(typed=True)): already float64 with a timestamp index
+        return bt_data
+    # Real bar timestamps: consecutive calendar days would misplace weekends, holidays and intraday bars
+    bt_data.index = pd.DatetimeIndex(
+        pd.to_datetime(bt_data['bar_date'].astype(str)) + pd.to_timedelta(bt_data['bar_time'].astype(str)),
+        name='timestamp'
+    )
+    bt_data.drop(['bar_date', 'bar_time', 'timeframe', 'ticker'], axis=1, inplace=True)
+    return bt_data
+
+def build_summary_data(result: pd.Series, ticker: str, n_fast: int, n_slow: int) -> dict:
+    """Map backtesting.py stats into a BacktestSummary row"""
+    return {
+        'description': 'TwoSMA vs BuyHold',
+        'ticker': ticker,
+        'strategy_name': f'TwoSMA({n_fast},{n_slow})',
+        'strategy_parameters': f'Fast={n_fast},Slow={n_slow}',
+        'start_date': result['Start'],
+        'end_date': result['End'],
+        'duration': result['Duration'],
+        #'start_date': data['bar_date'].iloc[0],
+        #'end_date': data['bar_date'].iloc[-1],
+        #'duration': str(result['Duration']),
+        'exposure_time_pct': float(result['Exposure Time [%]']),
+        'equity_final': float(result['Equity Final [$]']),
+        'equity_peak': float(result['Equity Peak [$]']),
+        'return_pct': float(result['Return [%]']),
+        'buy_hold_return_pct': float(result['Buy & Hold Return [%]']),
+        'annual_return_pct': float(result['Return (Ann.) [%]']),
+        'annual_volatility_pct': float(result['Volatility (Ann.) [%]']),
+        'sharpe_ratio': float(result['Sharpe Ratio']),
+        'sortino_ratio': float(result['Sortino Ratio']),
+        'calmar_ratio': float(result['Calmar Ratio']),
+        'max_drawdown_pct': float(result['Max. Drawdown [%]']),
+        'avg_drawdown_pct': float(result['Avg. Drawdown [%]']),
+        'max_drawdown_duration': str(result['Max. Drawdown Duration']),
+        'avg_drawdown_duration': str(result['Avg. Drawdown Duration']),
+        'total_trades': int(result['# Trades']),
+        'win_rate_pct': float(result['Win Rate [%]']),
+        'best_trade_pct': float(result['Best Trade [%]']),
+        'worst_trade_pct': float(result['Worst Trade [%]']),
+        'avg_trade_pct': float(result['Avg. Trade [%]']),
+        'max_trade_duration': str(result['Max. Trade Duration']),
+        'avg_trade_duration': str(result['Avg. Trade Duration']),
+        'profit_factor': float(result['Profit Factor']),
+        'expectancy_pct': float(result['Expectancy [%]']),
+        'sqn': float(result['SQN'])
+    }
+
+def build_detail_records(result: pd.Series) -> List[dict]:
+    """Map the backtesting.py trades frame into BacktestDetails rows"""
+    trades = result['_trades']
+    # Account equity at the close of the bar each trade exited on
+    equity_after = result['_equity_curve']['Equity'].reindex(trades['ExitTime']).to_numpy()
+    detail_records = []
+    for i, trade in trades.iterrows():
+        detail_records.append({
+            'trade_number': i + 1,
+            'buy_date': trade['EntryTime'].date(),
+            'buy_time': trade['EntryTime'].time(),
+            'sell_date': trade['ExitTime'].date(),
+            'sell_time': trade['ExitTime'].time(),
+            'buy_price': float(trade['EntryPrice']),
+            'sell_price': float(trade['ExitPrice']),
+            'position_size': int(np.abs(np.round(trade['Size']))),  # Using absolute value
+            'equity_after_trade': float(equity_after[i])
         })
-        bt_data.index = pd.date_range(
-            start=bt_data['bar_date'].iloc[0],
-            periods=len(bt_data),
-            freq='D'
-        )
-        bt_data.drop(['bar_date', 'bar_time', 'timeframe', 'ticker'], axis=1, inplace=True)
-
-        logger.info(f"Data prepared for backtesting. Rows: {len(bt_data)}")
-        
-        bt = Backtest(bt_data, TwoSMA, cash=10000, commission=0.001)
-        result = bt.run()
+    return detail_records
+
+def compute_two_sma_backtest(data: pd.DataFrame, ticker: str,
+                             n_fast: int = TwoSMA.n_fast, n_slow: int = TwoSMA.n_slow,
+                             engine: str = 'fast') -> Tuple[pd.Series, dict, List[dict]]:
+    """Run the TwoSMA backtest without touching the database ('fast' array engine or 'backtesting' for backtesting.py)"""
+    # Prepare data for backtesting.py
+    bt_data = prepare_backtest_data(data)
+    logger.info(f"Data prepared for backtesting. Rows: {len(bt_data)}")
+
+    if engine == 'fast':
+        result = run_fast_two_sma(bt_data, n_fast, n_slow, cash=BACKTEST_CASH, commission=BACKTEST_COMMISSION)
+    elif engine == 'backtesting':
+        bt = Backtest(bt_data, TwoSMA, cash=BACKTEST_CASH, commission=BACKTEST_COMMISSION)
+        result = bt.run(n_fast=n_fast, n_slow=n_slow)
         #bt.plot()
-        
-        logger.info(f"Backtest completed. Available stats: {result.keys()}")
-        
-        # Calculate buy & hold return
-        #first_close = bt_data['Close'].iloc[0]
-        #last_close = bt_data['Close'].iloc[-1]
-        #buy_hold_return_pct = (last_close - first_close) / first_close * 100
-
-        # Save backtest summary with corrected keys
-        summary_data = {
-            'description': 'TwoSMA vs BuyHold',
-            'ticker': ticker,
-            'strategy_name': 'TwoSMA(10,20)',
-            'strategy_parameters': 'Fast=10,Slow=20',
-            'start_date': result['Start'],
-            'end_date': result['End'],
-            'duration': result['Duration'],
-            #'start_date': data['bar_date'].iloc[0],
-            #'end_date': data['bar_date'].iloc[-1],
-            #'duration': str(result['Duration']),
-            'exposure_time_pct': float(result['Exposure Time [%]']),
-            'equity_final': float(result['Equity Final [$]']),
-            'equity_peak': float(result['Equity Peak [$]']),
-            'return_pct': float(result['Return [%]']),
-            'buy_hold_return_pct': float(result['Buy & Hold Return [%]']),
-            'annual_return_pct': float(result['Return (Ann.) [%]']),
-            'annual_volatility_pct': float(result['Volatility (Ann.) [%]']),
-            'sharpe_ratio': float(result['Sharpe Ratio']),
-            'sortino_ratio': float(result['Sortino Ratio']),
-            'calmar_ratio': float(result['Calmar Ratio']),
-            'max_drawdown_pct': float(result['Max. Drawdown [%]']),
-            'avg_drawdown_pct': float(result['Avg. Drawdown [%]']),
-            'max_drawdown_duration': str(result['Max. Drawdown Duration']),
-            'avg_drawdown_duration': str(result['Avg. Drawdown Duration']),
-            'total_trades': int(result['# Trades']),
-            'win_rate_pct': float(result['Win Rate [%]']),
-            'best_trade_pct': float(result['Best Trade [%]']),
-            'worst_trade_pct': float(result['Worst Trade [%]']),
-            'avg_trade_pct': float(result['Avg. Trade [%]']),
-            'max_trade_duration': str(result['Max. Trade Duration']),
-            'avg_trade_duration': str(result['Avg. Trade Duration']),
-            'profit_factor': float(result['Profit Factor']),
-            'expectancy_pct': float(result['Expectancy [%]']),
-            'sqn': float(result['SQN'])
-        }
-        test_id = db_ops.save_backtest_summary(summary_data)
-        logger.info(f"Backtest summary saved with test_id={test_id}")
-
-        # Save backtest details
-        detail_records = []
-        for i, trade in result['_trades'].iterrows():
-            detail_records.append({
-                'trade_number': i + 1,
-                'buy_date': trade['EntryTime'].date(),
-                'buy_time': trade['EntryTime'].time(),
-                'sell_date': trade['ExitTime'].date(),
-                'sell_time': trade['ExitTime'].time(),
-                'buy_price': float(trade['EntryPrice']),
-                'sell_price': float(trade['ExitPrice']),
-                'position_size': int(np.abs(np.round(trade['Size']))),  # Using absolute value
-                'equity_after_trade': None
-            })
-        db_ops.save_backtest_details(test_id, detail_records)
-        logger.info(f"Backtest details saved for {len(detail_records)} trades")
+    else:
+        raise ValueError(f"Unknown backtest engine: {engine}")
+
+    logger.info(f"Backtest completed. Available stats: {result.keys()}")
+
+    # Calculate buy & hold return
+    #first_close = bt_data['Close'].iloc[0]
+    #last_close = bt_data['Close'].iloc[-1]
+    #buy_hold_return_pct = (last_close - first_close) / first_close * 100
+
+    return result, build_summary_data(result, ticker, n_fast, n_slow), build_detail_records(result)
+
+def run_two_sma_backtest(data: pd.DataFrame, db_ops: DatabaseOperations, ticker: str,
+                         n_fast: int = TwoSMA.n_fast, n_slow: int = TwoSMA.n_slow, engine: str = 'fast'):
+    """
+    Run and store the TwoSMA backtest, unless the same bars, strategy and parameters were already run.
+
+    Repeats are served from the in-process memo or from the backtest_cache table without recomputing
+    or writing a new BacktestSummary. New results also get bootstrap confidence intervals
+    (ROBUSTNESS_PATHS paths, stored in backtest_robustness), available as result['_robustness'].
+    """
+    logger.info(f"Starting two SMA backtest with fast={n_fast}, slow={n_slow}, engine={engine}")
+    try:
+        bt_data = prepare_backtest_data(data)
+        fingerprint = data_fingerprint(bt_data)
+        # The engine is left out: both produce identical results
+        cache_key = backtest_cache_key(fingerprint, TwoSMA.__name__, {
+            'ticker': ticker, 'n_fast': n_fast, 'n_slow': n_slow,
+            'cash': BACKTEST_CASH, 'commission': BACKTEST_COMMISSION
+        })
+
+        memoized = _memo.get(cache_key)
+        if memoized is not None:
+            logger.info(f"Backtest served from memory (test_id={memoized[0]})")
+            return memoized[1]
+
+        stored = db_ops.get_cached_backtest(cache_key)
+        if stored is not None:
+            test_id, summary_data, detail_records, equity_curve = stored
+            logger.info(f"Backtest served from database (test_id={test_id})")
+            result = stats_from_records(summary_data, detail_records, equity_curve)
+            result['_robustness'] = db_ops.get_robustness(test_id)
+            _memo.put(cache_key, (test_id, result))
+            return result
+
+        result, summary_data, detail_records = compute_two_sma_backtest(bt_data, ticker, n_fast, n_slow, engine)
+
+        # Summary, trades, equity curve and cache entry are written together
+        test_id = db_ops.save_cached_backtest(cache_key, fingerprint, summary_data, detail_records,
+                                              result['_equity_curve']['Equity'])
+        logger.info(f"Backtest saved with test_id={test_id} ({len(detail_records)} trades)")
+
+        if ROBUSTNESS_PATHS > 0:
+            # Seeded from the cache key so the same backtest always gets the same intervals
+            result['_robustness'] = analyze_robustness(result, ROBUSTNESS_PATHS, ROBUSTNESS_CONFIDENCE,
+                                                       seed=int(cache_key[:16], 16))
+            db_ops.save_robustness(test_id, result['_robustness'])
+        _memo.put(cache_key, (test_id, result))
 
         return result
     
     except Exception as e:
         logger.error(f"Error during two_SMA_backtest: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+def cache_stats() -> Dict[str, int]:
+    return _memo.stats()
@@ -0,0 +1,174 @@
+# src/backtesting/walk_forward.py
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+import pandas as pd
+from src.backtesting.fast_engine import run_signal_backtest, two_sma_signals
+from src.backtesting.sweep import sweep_two_sma
+from src.backtesting.two_sma import (
+    BACKTEST_CASH, BACKTEST_COMMISSION, TwoSMA, build_detail_records, build_summary_data, prepare_backtest_data
+)
+from src.database.operations import DatabaseOperations
+
+logger = logging.getLogger(__name__)
+
+# Default train window length in test windows, when only the number of folds is given
+TRAIN_TEST_RATIO = 4
+FOLD_COLUMNS = ['fold_number', 'train_start', 'train_end', 'test_start', 'test_end',
+                'n_fast', 'n_slow', 'in_sample_score', 'in_sample_return_pct']
+
+
+class Fold(NamedTuple):
+    """Bar positions of one train/test split; ends are exclusive"""
+    number: int
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+
+def walk_forward_folds(n_bars: int, n_folds: int, train_bars: Optional[int] = None,
+                       test_bars: Optional[int] = None, anchored: bool = False) -> List[Fold]:
+    """
+    Consecutive test windows ending on the last bar, each preceded by its train window.
+
+    Rolling train windows keep `train_bars` bars; anchored ones all start where the first one does.
+    By default the test windows split the series so the first train window is TRAIN_TEST_RATIO
+    test windows long; leftover bars at the start are not used.
+    """
+    if n_folds < 1:
+        raise ValueError(f"Walk-forward needs at least one fold, got {n_folds}")
+    if test_bars is None:
+        test_bars = (n_bars - (train_bars or 0)) // (n_folds + (0 if train_bars else TRAIN_TEST_RATIO))
+    if train_bars is None:
+        train_bars = n_bars - n_folds * test_bars
+    if test_bars < 1 or train_bars < 2 or train_bars + n_folds * test_bars > n_bars:
+        raise ValueError(f"{n_bars} bars cannot hold {n_folds} folds of {test_bars} test bars "
+                         f"after {train_bars} train bars")
+
+    first_train = n_bars - train_bars - n_folds * test_bars
+    folds = []
+    for number in range(1, n_folds + 1):
+        test_start = first_train + train_bars + (number - 1) * test_bars
+        train_start = first_train if anchored else test_start - train_bars
+        folds.append(Fold(number, train_start, test_start, test_start, test_start + test_bars))
+    return folds
+
+
+def _run_fold(fold: Fold, train: pd.DataFrame, evaluation: pd.DataFrame, ticker: str,
+              fast_windows: List[int], slow_windows: List[int], maximize: str) -> Dict:
+    """
+    Pick (n_fast, n_slow) on the train window with the sweep, then backtest it out-of-sample. The sweep
+    trades each pair through the same broker as `compute_two_sma_backtest`, so the in-sample and
+    out-of-sample figures (and the efficiency between them) describe the same strategy.
+
+    `evaluation` is the test window preceded by up to n_slow_max warm-up bars. They only feed the SMAs:
+    the account opens flat on the first test bar, so the out-of-sample equity, trades and stats cover
+    the test window alone.
+    """
+    ranking = sweep_two_sma(train, fast_windows, slow_windows, cash=BACKTEST_CASH, commission=BACKTEST_COMMISSION,
+                            maximize=maximize).dropna(subset=[maximize])
+    if ranking.empty:
+        raise ValueError(f"Fold {fold.number}: no parameter pair could be evaluated on {len(train)} train bars")
+    best = ranking.iloc[0]
+    n_fast, n_slow = int(best['n_fast']), int(best['n_slow'])
+
+    warmup = len(evaluation) - (fold.test_end - fold.test_start)
+    buy, sell, _ = two_sma_signals(evaluation['Close'].to_numpy(dtype=float), n_fast, n_slow)
+    result = run_signal_backtest(evaluation.iloc[warmup:], buy[warmup:], sell[warmup:], 0,
+                                 BACKTEST_CASH, BACKTEST_COMMISSION, strategy=f'TwoSMA(n_fast={n_fast},n_slow={n_slow})')
+    summary = build_summary_data(result, ticker, n_fast, n_slow)
+    details = build_detail_records(result)
+    summary['description'] = f'TwoSMA walk-forward fold {fold.number} (out-of-sample)'
+    return {
+        'fold_number': fold.number,
+        'train_start': train.index[0],
+        'train_end': train.index[-1],
+        'test_start': evaluation.index[warmup],
+        'test_end': evaluation.index[-1],
+        'n_fast': n_fast,
+        'n_slow': n_slow,
+        'in_sample_score': float(best[maximize]),
+        'in_sample_return_pct': float(best['Return [%]']),
+        'summary': summary,
+        'details': details,
+        'equity': result['_equity_curve']['Equity'],
+    }
+
+
+def compute_walk_forward(data: pd.DataFrame, ticker: str, n_folds: int = 10,
+                         train_bars: Optional[int] = None, test_bars: Optional[int] = None,
+                         anchored: bool = False,
+                         fast_windows: Iterable[int] = range(5, 25),
+                         slow_windows: Iterable[int] = range(10, 50),
+                         maximize: str = 'Return [%]',
+                         max_workers: Optional[int] = None) -> Tuple[dict, List[dict]]:
+    """
+    Walk-forward optimization of TwoSMA without touching the database.
+
+    Folds are independent and run on a process pool (`max_workers=1` runs them inline). Each worker
+    only receives the bars of its own fold. Returns the walk_forward_run row and one dict per fold
+    (the walk_forward_fold columns plus the out-of-sample 'summary', 'details' and 'equity').
+    """
+    bt_data = prepare_backtest_data(data)
+    fast_windows, slow_windows = list(fast_windows), list(slow_windows)
+    folds = walk_forward_folds(len(bt_data), n_folds, train_bars, test_bars, anchored)
+    warmup = max(slow_windows)
+    tasks = [(
+        fold,
+        bt_data.iloc[fold.train_start:fold.train_end],
+        bt_data.iloc[max(fold.test_start - warmup, 0):fold.test_end],
+        ticker, fast_windows, slow_windows, maximize
+    ) for fold in folds]
+
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    logger.info(f"Walk-forward for {ticker}: {len(folds)} {'anchored' if anchored else 'rolling'} folds "
+                f"on {workers} workers")
+    if workers == 1:
+        results = [_run_fold(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_run_fold, *zip(*tasks)))
+
+    oos_growth = np.prod([fold['equity'].iloc[-1] / fold['equity'].iloc[0] for fold in results])
+    first_test, last_test = folds[0].test_start, folds[-1].test_end - 1
+    close = bt_data['Close']
+    oos_per_bar = np.mean([fold['summary']['return_pct'] / (f.test_end - f.test_start)
+                           for fold, f in zip(results, folds)])
+    is_per_bar = np.mean([fold['in_sample_return_pct'] / (f.train_end - f.train_start)
+                          for fold, f in zip(results, folds)])
+    run = {
+        'ticker': ticker,
+        'strategy_name': TwoSMA.__name__,
+        'scheme': 'anchored' if anchored else 'rolling',
+        'n_folds': len(folds),
+        'train_bars': folds[0].train_end - folds[0].train_start,
+        'test_bars': folds[0].test_end - folds[0].test_start,
+        'parameter_grid': f"n_fast={min(fast_windows)}..{max(fast_windows)}, "
+                          f"n_slow={min(slow_windows)}..{max(slow_windows)}",
+        'objective': maximize,
+        'start_date': bt_data.index[first_test],
+        'end_date': bt_data.index[last_test],
+        'oos_return_pct': float((oos_growth - 1) * 100),
+        'oos_buy_hold_return_pct': float((close.iloc[last_test] / close.iloc[first_test - 1] - 1) * 100),
+        'efficiency': float(oos_per_bar / is_per_bar) if is_per_bar > 0 else None,
+    }
+    logger.info(f"Walk-forward for {ticker} finished: out-of-sample return {run['oos_return_pct']:.2f}% "
+                f"vs buy & hold {run['oos_buy_hold_return_pct']:.2f}%")
+    return run, results
+
+
+def run_walk_forward(data: pd.DataFrame, db_ops: DatabaseOperations, ticker: str,
+                     **kwargs) -> Tuple[int, pd.DataFrame]:
+    """Run `compute_walk_forward` and store it; returns the run_id and one row per fold"""
+    try:
+        run, folds = compute_walk_forward(data, ticker, **kwargs)
+        run_id = db_ops.save_walk_forward(run, folds)
+        report = pd.DataFrame(folds, columns=FOLD_COLUMNS)
+        report['oos_return_pct'] = [fold['summary']['return_pct'] for fold in folds]
+        return run_id, report
+    except Exception as e:
+        logger.error(f"Error during walk-forward for {ticker}: {str(e)}")
+        raise
@@ -1,7 +1,6 @@
 # src/database/__init__.py
 from src.database.models import Base
-from config.settings import DATABASE_URL
-from sqlalchemy import create_engine
+from src.database.engine import get_engine
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,7 +8,7 @@ logger = logging.getLogger(__name__)
 def initialize_database():
     """Initialize PostgreSQL database with all tables"""
     try:
-        engine = create_engine(DATABASE_URL)
+        engine = get_engine()
         Base.metadata.create_all(engine)
         logger.info("Database initialized successfully")
     except Exception as e:
@@ -0,0 +1,107 @@
+# src/database/arrays.py
+from typing import Callable, Dict, Iterable, List, NamedTuple
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ['open_price', 'high_price', 'low_price', 'close_price']
+OHLC_ARRAY_COLUMNS = ['timestamp'] + PRICE_COLUMNS + ['volume']
+
+
+def column_dtypes(volume_dtype) -> Dict[str, np.dtype]:
+    return {'timestamp': np.dtype('datetime64[ns]'), **{column: np.dtype(np.float64) for column in PRICE_COLUMNS},
+            'volume': np.dtype(volume_dtype)}
+
+
+def fill_columns(allocate: Callable[[str, np.dtype, int], np.ndarray], n_rows: int, volume_dtype,
+                 chunks: Iterable[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """
+    Copy streamed column chunks one after the other into arrays of n_rows obtained from
+    `allocate(name, dtype, n_rows)` (np.empty, or a memory-mapped file), so the series is never
+    held twice. Raises if the chunks do not add up to n_rows.
+    """
+    columns = {name: allocate(name, dtype, n_rows) for name, dtype in column_dtypes(volume_dtype).items()}
+    filled = 0
+    for chunk in chunks:
+        size = len(chunk['timestamp'])
+        if filled + size > n_rows:
+            raise ValueError(f"Stream returned more than the {n_rows} rows expected")
+        for name, values in columns.items():
+            values[filled:filled + size] = chunk[name]
+        filled += size
+    if filled != n_rows:
+        raise ValueError(f"Stream returned {filled} rows, expected {n_rows}")
+    return columns
+
+
+class OHLCArrays(NamedTuple):
+    """Contiguous column arrays of one (ticker, timeframe) series, with the metadata kept as scalars"""
+    ticker: str
+    timeframe: str
+    timestamp: np.ndarray  # datetime64[ns]
+    open_price: np.ndarray  # float64
+    high_price: np.ndarray
+    low_price: np.ndarray
+    close_price: np.ndarray
+    volume: np.ndarray  # int64 (float64 if the source has missing volumes)
+
+    @property
+    def n_bars(self) -> int:
+        return len(self.timestamp)
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, ticker: str, timeframe: str) -> 'OHLCArrays':
+        """Build from the get_stock_data layout (bar_date/bar_time columns)"""
+        timestamp = pd.to_datetime(data['bar_date'].astype(str) + ' ' + data['bar_time'].astype(str))
+        volume = data['volume']
+        return cls(
+            ticker=ticker,
+            timeframe=timeframe,
+            timestamp=timestamp.to_numpy(dtype='datetime64[ns]'),
+            **{column: data[column].to_numpy(dtype=np.float64) for column in PRICE_COLUMNS},
+            volume=volume.to_numpy(dtype=np.int64 if volume.notna().all() else np.float64)
+        )
+
+    def to_table_frame(self) -> pd.DataFrame:
+        """Back to the get_stock_data layout, ready for save_stock_data"""
+        timestamps = pd.DatetimeIndex(self.timestamp)
+        data = pd.DataFrame({
+            'ticker': self.ticker,
+            'bar_date': timestamps.date,
+            'bar_time': timestamps.time,
+            'timeframe': self.timeframe,
+        })
+        for column in PRICE_COLUMNS + ['volume']:
+            data[column] = np.asarray(getattr(self, column))
+        return data
+
+    def to_frame(self) -> pd.DataFrame:
+        """Typed frame: DatetimeIndex, float64 OHLC, int64 volume; ticker/timeframe live in `attrs`"""
+        data = pd.DataFrame(
+            {column: getattr(self, column) for column in PRICE_COLUMNS + ['volume']},
+            index=pd.DatetimeIndex(self.timestamp, name='timestamp'),
+            copy=False
+        )
+        data.attrs.update(ticker=self.ticker, timeframe=self.timeframe)
+        return data
+
+
+class PriceMatrix(NamedTuple):
+    """Open and close prices of several tickers aligned on one timestamp axis (bars x tickers, NaN where a ticker has no bar)"""
+    timestamp: np.ndarray  # datetime64[ns]
+    tickers: List[str]
+    open: np.ndarray  # float64
+    close: np.ndarray
+
+    @classmethod
+    def from_long(cls, data: pd.DataFrame, tickers: List[str]) -> 'PriceMatrix':
+        """Pivot (ticker, timestamp, open_price, close_price) rows; tickers without rows are dropped"""
+        timestamp, rows = np.unique(data['timestamp'].to_numpy(dtype='datetime64[ns]'), return_inverse=True)
+        found = set(data['ticker'])
+        tickers = [ticker for ticker in dict.fromkeys(tickers) if ticker in found]
+        columns = pd.Categorical(data['ticker'], categories=tickers).codes
+        prices = {}
+        for field in ('open_price', 'close_price'):
+            matrix = np.full((len(timestamp), len(tickers)), np.nan)
+            matrix[rows, columns] = data[field].to_numpy(dtype=np.float64)
+            prices[field] = matrix
+        return cls(timestamp, tickers, prices['open_price'], prices['close_price'])
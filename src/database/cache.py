@@ -0,0 +1,159 @@
+# src/database/cache.py
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+import numpy as np
+import pandas as pd
+from src.database.arrays import OHLCArrays, OHLC_ARRAY_COLUMNS, fill_columns
+
+logger = logging.getLogger(__name__)
+
+
+class OHLCCache:
+    """
+    Local read-through cache of full (ticker, timeframe) OHLCV series as memory-mapped .npy columns.
+
+    Each series lives in `<cache_dir>/<timeframe>/<ticker>/gen-<id>/` with one file per column and a
+    `CURRENT` file naming the live generation. Reads map the columns read-only, so the OS page cache
+    shares them between processes, and slice them by date with a binary search. Invalidation only
+    removes `CURRENT`, which is safe even while other processes still have the old generation mapped.
+    It also replaces the series' `VERSION` token, so a store that was streaming rows read before the
+    invalidation discards its generation instead of publishing stale bars.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._mapped: Dict[tuple, Dict[str, np.ndarray]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _series_dir(self, ticker: str, timeframe: str) -> Path:
+        return self.cache_dir / timeframe / ticker.upper()
+
+    def _current_generation(self, ticker: str, timeframe: str) -> Optional[str]:
+        try:
+            return (self._series_dir(ticker, timeframe) / 'CURRENT').read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _version(self, ticker: str, timeframe: str) -> Optional[str]:
+        try:
+            return (self._series_dir(ticker, timeframe) / 'VERSION').read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self, ticker: str, timeframe: str) -> Optional[Dict[str, np.ndarray]]:
+        """Memory-mapped columns of the cached series, or None on a miss"""
+        generation = self._current_generation(ticker, timeframe)
+        if generation is None:
+            self.misses += 1
+            return None
+        key = (ticker.upper(), timeframe, generation)
+        columns = self._mapped.get(key)
+        if columns is None:
+            gen_dir = self._series_dir(ticker, timeframe) / generation
+            try:
+                columns = {path.stem: np.load(path, mmap_mode='r') for path in gen_dir.glob('*.npy')}
+            except (FileNotFoundError, ValueError) as e:
+                logger.warning(f"Discarding unreadable cache entry for {ticker} ({timeframe}): {str(e)}")
+                self.invalidate(ticker, timeframe)
+                self.misses += 1
+                return None
+            self._mapped = {k: v for k, v in self._mapped.items() if k[:2] != key[:2]}
+            self._mapped[key] = columns
+        self.hits += 1
+        return columns
+
+    def store(self, ticker: str, timeframe: str, data: Union[pd.DataFrame, OHLCArrays]) -> bool:
+        """Write a full series (as returned by get_stock_data or get_stock_arrays) as a new generation and make it current"""
+        arrays = data if isinstance(data, OHLCArrays) else OHLCArrays.from_frame(data, ticker, timeframe)
+        return self.store_chunks(ticker, timeframe, arrays.n_bars, arrays.volume.dtype,
+                          [{column: getattr(arrays, column) for column in OHLC_ARRAY_COLUMNS}])
+
+    def store_chunks(self, ticker: str, timeframe: str, n_bars: int, volume_dtype,
+                     chunks: Iterable[Dict[str, np.ndarray]]) -> bool:
+        """
+        Write a full series of n_bars arriving as column chunks straight into the memory-mapped .npy
+        files of a new generation, then make it current. Memory holds one chunk, whatever the series length.
+        Returns False, leaving nothing behind, when the series was invalidated while the chunks were
+        being written: they predate the change that invalidated it.
+        """
+        series_dir = self._series_dir(ticker, timeframe)
+        version = self._version(ticker, timeframe)
+        generation = f"gen-{uuid.uuid4().hex}"
+        gen_dir = series_dir / generation
+        gen_dir.mkdir(parents=True)
+
+        def allocate(column: str, dtype: np.dtype, n_rows: int) -> np.ndarray:
+            return np.lib.format.open_memmap(gen_dir / f'{column}.npy', mode='w+', dtype=dtype, shape=(n_rows,))
+
+        try:
+            columns = fill_columns(allocate, n_bars, volume_dtype, chunks)
+            for values in columns.values():
+                values.flush()
+            del columns
+        except Exception:
+            shutil.rmtree(gen_dir, ignore_errors=True)
+            raise
+
+        if self._version(ticker, timeframe) != version:
+            shutil.rmtree(gen_dir, ignore_errors=True)
+            logger.info(f"Not caching {ticker} ({timeframe}): invalidated while it was being written")
+            return False
+
+        # Publish atomically: readers see either the previous generation or the complete new one
+        self._write_atomic(series_dir, 'CURRENT', generation)
+        if self._version(ticker, timeframe) != version:
+            # Invalidated between the check and the publish: withdraw the generation again
+            if self._current_generation(ticker, timeframe) == generation:
+                self.invalidate(ticker, timeframe)
+            shutil.rmtree(gen_dir, ignore_errors=True)
+            logger.info(f"Not caching {ticker} ({timeframe}): invalidated while it was being published")
+            return False
+        self._remove_stale_generations(series_dir, keep=generation)
+        logger.info(f"Cached {n_bars} bars for {ticker} ({timeframe})")
+        return True
+
+    @staticmethod
+    def _write_atomic(series_dir: Path, name: str, value: str):
+        tmp = series_dir / f'{name}.{uuid.uuid4().hex}'
+        tmp.write_text(value)
+        os.replace(tmp, series_dir / name)
+
+    def invalidate(self, ticker: str, timeframe: str):
+        series_dir = self._series_dir(ticker, timeframe)
+        # New token first, so a store in flight sees the change before CURRENT goes away
+        series_dir.mkdir(parents=True, exist_ok=True)
+        self._write_atomic(series_dir, 'VERSION', uuid.uuid4().hex)
+        try:
+            (series_dir / 'CURRENT').unlink()
+            logger.info(f"Invalidated cache for {ticker} ({timeframe})")
+        except FileNotFoundError:
+            pass
+        self._remove_stale_generations(series_dir, keep=None)
+
+    def _remove_stale_generations(self, series_dir: Path, keep: Optional[str]):
+        # Best effort: a generation still mapped by another process may not be removable on Windows
+        for gen_dir in series_dir.glob('gen-*'):
+            if gen_dir.name != keep:
+                shutil.rmtree(gen_dir, ignore_errors=True)
+        self._mapped = {k: v for k, v in self._mapped.items() if k[2] == keep or
+                        self._series_dir(k[0], k[1]) != series_dir}
+
+    @staticmethod
+    def slice(columns: Dict[str, np.ndarray], start_date, end_date) -> Dict[str, np.ndarray]:
+        """Zero-copy views of the bars whose date falls in [start_date, end_date]"""
+        timestamps = columns['timestamp']
+        lo = np.searchsorted(timestamps, np.datetime64(pd.Timestamp(start_date).normalize()), side='left')
+        hi = np.searchsorted(timestamps, np.datetime64(pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)),
+                             side='left')
+        return {name: values[lo:hi] for name, values in columns.items()}
+
+    @staticmethod
+    def to_frame(columns: Dict[str, np.ndarray], ticker: str, timeframe: str) -> pd.DataFrame:
+        """Rebuild the get_stock_data layout from cached columns"""
+        return OHLCArrays(ticker=ticker, timeframe=timeframe, **columns).to_table_frame()
@@ -0,0 +1,35 @@
+# src/database/codec.py
+import struct
+import zlib
+import numpy as np
+import pandas as pd
+
+# Layout version, point count; then delta-encoded int64 nanosecond timestamps and float64 equity
+_HEADER = struct.Struct('<BI')
+EQUITY_CODEC_VERSION = 1
+
+
+def encode_equity_curve(equity: pd.Series) -> bytes:
+    """
+    Compact lossless encoding of an equity curve (DatetimeIndex -> float64) for a bytea column.
+
+    Timestamps are stored as differences, which for regular bars are nearly constant and compress
+    to almost nothing; values are kept as float64 so decoded curves match the backtest exactly.
+    """
+    timestamps = equity.index.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    deltas = np.diff(timestamps, prepend=np.int64(0))
+    values = equity.to_numpy(dtype=np.float64)
+    payload = _HEADER.pack(EQUITY_CODEC_VERSION, len(values)) + deltas.tobytes() + values.tobytes()
+    return zlib.compress(payload, 6)
+
+
+def decode_equity_curve(blob: bytes) -> pd.Series:
+    payload = zlib.decompress(blob)
+    version, n_points = _HEADER.unpack_from(payload)
+    if version != EQUITY_CODEC_VERSION:
+        raise ValueError(f"Unsupported equity curve encoding version {version}")
+    offset = _HEADER.size
+    deltas = np.frombuffer(payload, dtype=np.int64, count=n_points, offset=offset)
+    values = np.frombuffer(payload, dtype=np.float64, count=n_points, offset=offset + 8 * n_points)
+    index = pd.DatetimeIndex(np.cumsum(deltas).view('datetime64[ns]'))
+    return pd.Series(values.copy(), index=index, name='Equity')
@@ -0,0 +1,58 @@
+# src/database/engine.py
+import logging
+import os
+import threading
+from typing import Dict, Optional
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from config.settings import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
+
+logger = logging.getLogger(__name__)
+
+_engine: Optional[Engine] = None
+_engine_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """
+    Process-wide SQLAlchemy engine with the pool configured in config/settings.py.
+
+    Every DatabaseOperations in the process shares it, so Streamlit sessions reuse pooled
+    connections. A forked child (e.g. a ProcessPoolExecutor worker) gets a fresh engine instead of
+    the parent's sockets.
+    """
+    global _engine, _engine_pid
+    with _lock:
+        if _engine is not None and _engine_pid != os.getpid():
+            # Inherited through fork: drop the parent's connections without closing them under it
+            _engine.dispose(close=False)
+            _engine = None
+        if _engine is None:
+            _engine = create_engine(
+                DATABASE_URL,
+                client_encoding='utf8',
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=DB_POOL_PRE_PING
+            )
+            _engine_pid = os.getpid()
+            logger.info(f"Created shared database engine (pool_size={DB_POOL_SIZE}, max_overflow={DB_MAX_OVERFLOW})")
+        return _engine
+
+
+def pool_stats() -> Dict[str, int]:
+    """Connection counts of the shared pool (empty if no engine was created yet)"""
+    if _engine is None:
+        return {}
+    pool = _engine.pool
+    return {
+        'pool_size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow()
+    }
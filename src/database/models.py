@@ -1,9 +1,10 @@
 # src/database/models.py
 from sqlalchemy import (
     Column, Integer, BigInteger, String, Date, Time, Numeric,
-    ForeignKey, CheckConstraint, UniqueConstraint, Text, DateTime, Interval,
+    ForeignKey, CheckConstraint, UniqueConstraint, Index, Text, DateTime, Interval, LargeBinary,
     func
 )
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from config.settings import DATABASE_URL
@@ -22,7 +23,12 @@ class FundamentalData(Base):
 
     # Relationships
     ohlc_data = relationship('OHLCData', back_populates='fundamental_data', cascade='all, delete-orphan')
+    ohlc_bars = relationship('OHLCBar', back_populates='fundamental_data', cascade='all, delete-orphan')
     backtest_summaries = relationship('BacktestSummary', back_populates='fundamental_data', cascade='all, delete-orphan')
+    data_coverage = relationship('DataCoverage', back_populates='fundamental_data', cascade='all, delete-orphan')
+    ohlc_rollups = relationship('OHLCRollup', back_populates='fundamental_data', cascade='all, delete-orphan')
+    walk_forward_runs = relationship('WalkForwardRun', back_populates='fundamental_data', cascade='all, delete-orphan')
+    portfolio_tickers = relationship('PortfolioTicker', back_populates='fundamental_data', cascade='all, delete-orphan')
 
 class OHLCData(Base):
     __tablename__ = 'ohlc_data'
@@ -46,6 +52,73 @@ class OHLCData(Base):
         UniqueConstraint('ticker', 'bar_date', 'bar_time', 'timeframe', name='uix_ohlc_data'),
     )
 
+class OHLCBar(Base):
+    """
+    Time-series layout of OHLC bars (OHLC_STORAGE=timeseries): one timestamp column, double precision prices,
+    range-partitioned on ts. Partitions are created on demand by src.database.timeseries.ensure_partitions.
+    """
+    __tablename__ = 'ohlc_bars'
+
+    ticker = Column(String(10), ForeignKey('fundamental_data.ticker', ondelete='CASCADE'), primary_key=True)
+    timeframe = Column(String(10), primary_key=True)
+    ts = Column(DateTime, primary_key=True)  # Bar timestamp (bar_date + bar_time of ohlc_data)
+    open_price = Column(DOUBLE_PRECISION, nullable=False)
+    high_price = Column(DOUBLE_PRECISION, nullable=False)
+    low_price = Column(DOUBLE_PRECISION, nullable=False)
+    close_price = Column(DOUBLE_PRECISION, nullable=False)
+    volume = Column(BigInteger, CheckConstraint('volume >= 0'))
+
+    # Relationships
+    fundamental_data = relationship('FundamentalData', back_populates='ohlc_bars')
+
+    # Per-ticker range reads use the primary key; the BRIN index serves time-only scans across tickers
+    __table_args__ = (
+        Index('ix_ohlc_bars_ts_brin', 'ts', postgresql_using='brin'),
+        {'postgresql_partition_by': 'RANGE (ts)'},
+    )
+
+class OHLCRollup(Base):
+    __tablename__ = 'ohlc_rollup'
+
+    rollup_id = Column(Integer, primary_key=True, autoincrement=True)
+    ticker = Column(String(10), ForeignKey('fundamental_data.ticker', ondelete='CASCADE'), nullable=False)
+    timeframe = Column(String(10), nullable=False)  # 'weekly', 'monthly'
+    period_start = Column(Date, nullable=False)  # First calendar day of the week/month
+    bar_date = Column(Date, nullable=False)  # Last trading day in the period, as Alpha Vantage labels it
+    open_price = Column(Numeric(15, 6), nullable=False)
+    high_price = Column(Numeric(15, 6), nullable=False)
+    low_price = Column(Numeric(15, 6), nullable=False)
+    close_price = Column(Numeric(15, 6), nullable=False)
+    volume = Column(BigInteger, CheckConstraint('volume >= 0'))
+    n_bars = Column(Integer, nullable=False)  # Daily bars aggregated
+    updated_at = Column(DateTime, server_default=func.now())
+
+    # Relationships
+    fundamental_data = relationship('FundamentalData', back_populates='ohlc_rollups')
+
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint('ticker', 'timeframe', 'period_start', name='uix_ohlc_rollup'),
+    )
+
+class DataCoverage(Base):
+    __tablename__ = 'data_coverage'
+
+    coverage_id = Column(Integer, primary_key=True, autoincrement=True)
+    ticker = Column(String(10), ForeignKey('fundamental_data.ticker', ondelete='CASCADE'), nullable=False)
+    timeframe = Column(String(10), nullable=False)
+    start_date = Column(Date, nullable=False)  # Date range already fetched from a provider,
+    end_date = Column(Date, nullable=False)    # including days without bars (weekends, holidays)
+    fetched_at = Column(DateTime, server_default=func.now())
+
+    # Relationships
+    fundamental_data = relationship('FundamentalData', back_populates='data_coverage')
+
+    # Constraints
+    __table_args__ = (
+        CheckConstraint('start_date <= end_date', name='chk_data_coverage_range'),
+    )
+
 class BacktestSummary(Base):
     __tablename__ = 'backtest_summary'
 
@@ -86,6 +159,13 @@ class BacktestSummary(Base):
     # Relationships
     fundamental_data = relationship('FundamentalData', back_populates='backtest_summaries')
     backtest_details = relationship('BacktestDetails', back_populates='backtest_summary', cascade='all, delete-orphan')
+    backtest_cache = relationship('BacktestCache', back_populates='backtest_summary', cascade='all, delete-orphan')
+    backtest_equity = relationship('BacktestEquity', back_populates='backtest_summary', uselist=False,
+                                   cascade='all, delete-orphan')
+    walk_forward_folds = relationship('WalkForwardFold', back_populates='backtest_summary',
+                                      cascade='all, delete-orphan')
+    backtest_robustness = relationship('BacktestRobustness', back_populates='backtest_summary',
+                                       cascade='all, delete-orphan')
 
 class BacktestDetails(Base):
     __tablename__ = 'backtest_details'
@@ -111,4 +191,138 @@ class BacktestDetails(Base):
     # Constraints
     __table_args__ = (
         UniqueConstraint('test_id', 'trade_number', name='uix_backtest_details'),
-    )
\ No newline at end of file
+    )
+
+class BacktestEquity(Base):
+    __tablename__ = 'backtest_equity'
+
+    test_id = Column(Integer, ForeignKey('backtest_summary.test_id', ondelete='CASCADE'), primary_key=True)
+    n_points = Column(Integer, CheckConstraint('n_points >= 0'), nullable=False)
+    equity_curve = Column(LargeBinary, nullable=False)  # src.database.codec.encode_equity_curve
+
+    # Relationships
+    backtest_summary = relationship('BacktestSummary', back_populates='backtest_equity')
+
+class BacktestRobustness(Base):
+    __tablename__ = 'backtest_robustness'
+
+    test_id = Column(Integer, ForeignKey('backtest_summary.test_id', ondelete='CASCADE'), primary_key=True)
+    method = Column(String(20), CheckConstraint(
+        "method IN ('trade_bootstrap', 'block_bootstrap')"), primary_key=True)
+    metric = Column(String(30), primary_key=True)  # BacktestSummary column: return_pct, max_drawdown_pct, sharpe_ratio
+    observed = Column(Numeric(15, 4))
+    mean = Column(Numeric(15, 4))
+    ci_low = Column(Numeric(15, 4))
+    ci_high = Column(Numeric(15, 4))
+    confidence_level = Column(Numeric(4, 3), nullable=False)
+    n_paths = Column(Integer, CheckConstraint('n_paths > 0'), nullable=False)
+    block_size = Column(Integer)  # Bars per block; NULL for the trade bootstrap
+    created_at = Column(DateTime, server_default=func.now())
+
+    # Relationships
+    backtest_summary = relationship('BacktestSummary', back_populates='backtest_robustness')
+
+# Columns of a robustness interval frame (analyze_robustness), as stored in backtest_robustness per test_id
+ROBUSTNESS_COLUMNS = ['method', 'metric', 'observed', 'mean', 'ci_low', 'ci_high',
+                      'confidence_level', 'n_paths', 'block_size']
+
+class BacktestCache(Base):
+    __tablename__ = 'backtest_cache'
+
+    cache_key = Column(String(64), primary_key=True)  # SHA-256 of data fingerprint, strategy and parameters
+    test_id = Column(Integer, ForeignKey('backtest_summary.test_id', ondelete='CASCADE'), nullable=False)
+    data_fingerprint = Column(String(64), nullable=False)  # SHA-256 of the input bars
+    created_at = Column(DateTime, server_default=func.now())
+
+    # Relationships
+    backtest_summary = relationship('BacktestSummary', back_populates='backtest_cache')
+
+class WalkForwardRun(Base):
+    __tablename__ = 'walk_forward_run'
+
+    run_id = Column(Integer, primary_key=True, autoincrement=True)
+    ticker = Column(String(10), ForeignKey('fundamental_data.ticker', ondelete='CASCADE'), nullable=False)
+    strategy_name = Column(String(100), nullable=False)
+    scheme = Column(String(10), CheckConstraint("scheme IN ('rolling', 'anchored')"), nullable=False)
+    n_folds = Column(Integer, CheckConstraint('n_folds > 0'), nullable=False)
+    train_bars = Column(Integer, nullable=False)  # Bars per train window (the first one, if anchored)
+    test_bars = Column(Integer, nullable=False)
+    parameter_grid = Column(Text)  # e.g., "n_fast=5..24, n_slow=10..49"
+    objective = Column(String(50), nullable=False)  # Sweep statistic maximized on each train window
+    start_date = Column(DateTime, nullable=False)  # Out-of-sample span
+    end_date = Column(DateTime, nullable=False)
+    oos_return_pct = Column(Numeric(10, 2))  # Compounded over the test windows
+    oos_buy_hold_return_pct = Column(Numeric(10, 2))
+    efficiency = Column(Numeric(10, 2))  # Out-of-sample / in-sample return per bar
+    created_at = Column(DateTime, server_default=func.now())
+
+    # Relationships
+    fundamental_data = relationship('FundamentalData', back_populates='walk_forward_runs')
+    walk_forward_folds = relationship('WalkForwardFold', back_populates='walk_forward_run',
+                                      cascade='all, delete-orphan')
+
+class WalkForwardFold(Base):
+    __tablename__ = 'walk_forward_fold'
+
+    run_id = Column(Integer, ForeignKey('walk_forward_run.run_id', ondelete='CASCADE'), primary_key=True)
+    fold_number = Column(Integer, CheckConstraint('fold_number > 0'), primary_key=True)
+    test_id = Column(Integer, ForeignKey('backtest_summary.test_id', ondelete='CASCADE'), nullable=False)  # Out-of-sample backtest
+    train_start = Column(DateTime, nullable=False)
+    train_end = Column(DateTime, nullable=False)
+    test_start = Column(DateTime, nullable=False)
+    test_end = Column(DateTime, nullable=False)
+    n_fast = Column(Integer, nullable=False)  # Parameters chosen on the train window
+    n_slow = Column(Integer, nullable=False)
+    in_sample_score = Column(Numeric(15, 4))
+    in_sample_return_pct = Column(Numeric(10, 2))
+
+    # Relationships
+    walk_forward_run = relationship('WalkForwardRun', back_populates='walk_forward_folds')
+    backtest_summary = relationship('BacktestSummary', back_populates='walk_forward_folds')
+
+class PortfolioBacktest(Base):
+    __tablename__ = 'portfolio_backtest'
+
+    portfolio_id = Column(Integer, primary_key=True, autoincrement=True)
+    description = Column(Text)
+    strategy_name = Column(String(100), nullable=False)
+    strategy_parameters = Column(Text)  # e.g., "Fast=10,Slow=20,Rebalance=21,Short=True"
+    n_tickers = Column(Integer, CheckConstraint('n_tickers > 0'), nullable=False)
+    start_date = Column(DateTime, nullable=False)
+    end_date = Column(DateTime, nullable=False)
+    initial_cash = Column(Numeric(20, 2), nullable=False)
+    commission = Column(Numeric(10, 6), nullable=False)
+    equity_final = Column(Numeric(20, 2))
+    equity_peak = Column(Numeric(20, 2))
+    return_pct = Column(Numeric(10, 2))
+    buy_hold_return_pct = Column(Numeric(10, 2))  # Mean over tickers (equal weight, never rebalanced)
+    annual_return_pct = Column(Numeric(10, 2))
+    annual_volatility_pct = Column(Numeric(10, 2))
+    sharpe_ratio = Column(Numeric(10, 2))
+    max_drawdown_pct = Column(Numeric(10, 2))
+    exposure_time_pct = Column(Numeric(10, 2))
+    total_trades = Column(Integer)
+    commission_paid = Column(Numeric(20, 2))
+    n_points = Column(Integer, CheckConstraint('n_points >= 0'), nullable=False)
+    equity_curve = Column(LargeBinary, nullable=False)  # src.database.codec.encode_equity_curve
+    created_at = Column(DateTime, server_default=func.now())
+
+    # Relationships
+    portfolio_tickers = relationship('PortfolioTicker', back_populates='portfolio_backtest',
+                                     cascade='all, delete-orphan')
+
+class PortfolioTicker(Base):
+    __tablename__ = 'portfolio_ticker'
+
+    portfolio_id = Column(Integer, ForeignKey('portfolio_backtest.portfolio_id', ondelete='CASCADE'), primary_key=True)
+    ticker = Column(String(10), ForeignKey('fundamental_data.ticker', ondelete='CASCADE'), primary_key=True)
+    pnl = Column(Numeric(20, 2))  # Realized and open, after commission
+    contribution_pct = Column(Numeric(10, 2))  # PnL as % of the portfolio's initial cash
+    total_trades = Column(Integer)
+    exposure_time_pct = Column(Numeric(10, 2))
+    commission_paid = Column(Numeric(20, 2))
+    buy_hold_return_pct = Column(Numeric(10, 2))
+
+    # Relationships
+    portfolio_backtest = relationship('PortfolioBacktest', back_populates='portfolio_tickers')
+    fundamental_data = relationship('FundamentalData', back_populates='portfolio_tickers')
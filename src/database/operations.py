@@ -1,46 +1,244 @@
 # src/database/operations.py
-from typing import Optional, Dict, List
+from contextlib import contextmanager
+from typing import Optional, Dict, Iterator, List, Tuple
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text, or_, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import sessionmaker
-from src.database.models import FundamentalData, OHLCData, BacktestSummary, BacktestDetails
-from config.settings import DATABASE_URL
+from src.database.models import (
+    Base, FundamentalData, DataCoverage, BacktestSummary, BacktestDetails, BacktestCache, ROBUSTNESS_COLUMNS
+)
+from src.utils.data_helpers import merge_intervals
+from src.database.cache import OHLCCache
+from src.database.engine import get_engine
+from src.database.arrays import OHLCArrays, OHLC_ARRAY_COLUMNS, PriceMatrix, PRICE_COLUMNS, fill_columns
+from src.database.codec import encode_equity_curve, decode_equity_curve
+from src.database.timeseries import (
+    StorageLayout, LEGACY_LAYOUT, RANGE_FILTER, get_layout, to_layout_rows, ensure_partitions
+)
+from config.settings import OHLC_CACHE_DIR, OHLC_CACHE_ENABLED, OHLC_STORAGE
 import logging
-from datetime import datetime
+import io
+from datetime import date, datetime
 
 logger = logging.getLogger(__name__)
 
+OHLC_KEY_COLUMNS = ['ticker', 'bar_date', 'bar_time', 'timeframe']
+OHLC_VALUE_COLUMNS = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
+OHLC_COLUMNS = OHLC_KEY_COLUMNS + OHLC_VALUE_COLUMNS
+
+# Frames at least this large (e.g. a full Alpha Vantage history) go through COPY instead of the ORM
+BULK_LOAD_MIN_ROWS = 1000
+UPSERT_CHUNK_SIZE = 1000
+# Typed reads stream rows from a server-side cursor in chunks of this size (years of 1-minute bars
+# would otherwise be materialized as Python tuples by the driver first)
+READ_CHUNK_ROWS = 100000
+
+# Timeframes derived in the database from daily bars -> date_trunc unit of their periods
+ROLLUP_SOURCE_TIMEFRAME = 'daily'
+ROLLUP_PERIODS = {'weekly': 'week', 'monthly': 'month'}
+# Units accepted by get_custom_bars besides explicit intervals such as '2 weeks'
+CUSTOM_PERIOD_UNITS = {'week', 'month', 'quarter', 'year'}
+# Read rollups through the ohlc_data column layout
+ROLLUP_SOURCE = """(
+    SELECT ticker, bar_date, TIME '00:00' AS bar_time, timeframe,
+           open_price, high_price, low_price, close_price, volume
+    FROM ohlc_rollup
+) AS ohlc_rollup"""
+ROLLUP_LAYOUT = LEGACY_LAYOUT._replace(name='rollup', table=ROLLUP_SOURCE)
+
+BACKTEST_DETAIL_COLUMNS = ['test_id', 'trade_number', 'buy_date', 'buy_time', 'sell_date', 'sell_time',
+                           'buy_price', 'sell_price', 'position_size', 'equity_after_trade']
+WALK_FORWARD_RUN_COLUMNS = ['ticker', 'strategy_name', 'scheme', 'n_folds', 'train_bars', 'test_bars',
+                            'parameter_grid', 'objective', 'start_date', 'end_date', 'oos_return_pct',
+                            'oos_buy_hold_return_pct', 'efficiency']
+PORTFOLIO_TICKER_COLUMNS = ['portfolio_id', 'ticker', 'pnl', 'contribution_pct', 'total_trades',
+                            'exposure_time_pct', 'commission_paid', 'buy_hold_return_pct']
+WALK_FORWARD_FOLD_COLUMNS = ['run_id', 'fold_number', 'test_id', 'train_start', 'train_end', 'test_start', 'test_end',
+                             'n_fast', 'n_slow', 'in_sample_score', 'in_sample_return_pct']
+
+
+class _BacktestAlreadyStored(Exception):
+    """Another writer stored the same backtest cache key first"""
+
+
+def _copy_frame(cursor, table: str, frame: pd.DataFrame):
+    """COPY a frame into `table` (columns named after the frame's); NaN, NaT and infinities become NULL"""
+    frame = frame.replace([np.inf, -np.inf, 'NaT'], np.nan)
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
 class DatabaseOperations:
-    def __init__(self):
+    def __init__(self, storage: Optional[str] = None):
         try:
-            # Create PostgreSQL engine with psycopg2 driver
-            self.engine = create_engine(DATABASE_URL, client_encoding='utf8')
+            # Shared, pooled PostgreSQL engine (psycopg2 driver) for the whole process
+            self.engine = get_engine()
             self.Session = sessionmaker(bind=self.engine)
+            self.cache = OHLCCache(OHLC_CACHE_DIR) if OHLC_CACHE_ENABLED else None
+            # Table layout OHLC bars are read from and written to (OHLC_STORAGE unless overridden)
+            self.layout = get_layout(storage or OHLC_STORAGE)
             logger.info("PostgreSQL database connection initialized")
         except Exception as e:
             logger.error(f"Failed to initialize database connection: {str(e)}")
             raise
 
-    def get_stock_data(self, ticker: str, start_date: str, end_date: str, timeframe: str) -> Optional[pd.DataFrame]:
+    def get_stock_data(self, ticker: str, start_date: str, end_date: str, timeframe: str,
+                       typed: bool = False) -> Optional[pd.DataFrame]:
+        """
+        Retrieve OHLCV data, served from the local column cache when enabled.
+        With typed=True the frame is indexed by timestamp with float64/int64 columns only (see OHLCArrays.to_frame).
+        """
+        if typed:
+            arrays = self.get_stock_arrays(ticker, start_date, end_date, timeframe)
+            return arrays.to_frame() if arrays is not None else None
+        if self.cache is None:
+            return self._query_stock_data(ticker, start_date, end_date, timeframe)
+        try:
+            window = self._cached_window(ticker, start_date, end_date, timeframe)
+            return self.cache.to_frame(window, ticker, timeframe) if window else None
+        except OSError as e:
+            logger.warning(f"OHLC cache unavailable, reading from database: {str(e)}")
+            return self._query_stock_data(ticker, start_date, end_date, timeframe)
+
+    def get_stock_arrays(self, ticker: str, start_date: str, end_date: str, timeframe: str) -> Optional[OHLCArrays]:
+        """Retrieve OHLCV data as contiguous typed arrays (zero-copy views when served from the cache)"""
+        if self.cache is not None:
+            try:
+                window = self._cached_window(ticker, start_date, end_date, timeframe)
+                return OHLCArrays(ticker, timeframe, **window) if window else None
+            except OSError as e:
+                logger.warning(f"OHLC cache unavailable, reading from database: {str(e)}")
+        return self._query_stock_arrays(ticker, start_date, end_date, timeframe)
+
+    def _cached_window(self, ticker: str, start_date: str, end_date: str, timeframe: str) -> Optional[Dict]:
+        """Cached columns for the date range, streaming the full series into the cache on a miss"""
+        columns = self.cache.load(ticker, timeframe)
+        if columns is None:
+            # Cache the whole series once; later ranges are sliced locally. Chunks go straight into the
+            # cache files, so years of intraday bars never sit in memory at once
+            with self._stock_stream(ticker, '0001-01-01', '9999-12-31', timeframe) as (n_rows, volume_dtype, chunks):
+                if not n_rows:
+                    return None
+                published = self.cache.store_chunks(ticker, timeframe, n_rows, volume_dtype, chunks)
+            if not published:
+                # The series changed while it was being cached: answer this read from the database
+                arrays = self._query_stock_arrays(ticker, start_date, end_date, timeframe)
+                return {column: getattr(arrays, column) for column in OHLC_ARRAY_COLUMNS} if arrays else None
+            columns = self.cache.load(ticker, timeframe)
+        window = self.cache.slice(columns, start_date, end_date)
+        return window if len(window['timestamp']) else None
+
+    def _query_stock_arrays(self, ticker: str, start_date: str, end_date: str, timeframe: str) -> Optional[OHLCArrays]:
+        """Retrieve OHLCV data from PostgreSQL already cast to timestamp/double precision"""
+        try:
+            with self._stock_stream(ticker, start_date, end_date, timeframe) as (n_rows, volume_dtype, chunks):
+                if not n_rows:
+                    return None
+                columns = fill_columns(lambda name, dtype, size: np.empty(size, dtype=dtype), n_rows, volume_dtype,
+                                       chunks)
+            return OHLCArrays(ticker=ticker, timeframe=timeframe, **columns)
+        except Exception as e:
+            logger.error(f"Error retrieving stock arrays: {str(e)}")
+            raise
+
+    @contextmanager
+    def _stock_stream(self, ticker: str, start_date: str, end_date: str,
+                      timeframe: str) -> Iterator[Tuple[int, type, Iterator[Dict[str, np.ndarray]]]]:
+        """
+        (row count, volume dtype, column chunks of READ_CHUNK_ROWS bars) for the range, read from a
+        server-side cursor. The count and the rows come from one REPEATABLE READ snapshot, so callers
+        can allocate the full arrays up front and copy each chunk into place.
+        """
+        layout = self._layout_for(timeframe)
+        where = f"""
+                FROM {layout.table}
+                WHERE ticker = :ticker
+                AND timeframe = :timeframe
+                AND {RANGE_FILTER.format(column=layout.range_column)}"""
+        query = text(f"""
+                SELECT
+                    {layout.timestamp} AS timestamp,
+                    open_price::double precision AS open_price,
+                    high_price::double precision AS high_price,
+                    low_price::double precision AS low_price,
+                    close_price::double precision AS close_price,
+                    volume
+                {where}
+                ORDER BY {layout.order_by}
+            """)
+        params = {"ticker": ticker, "timeframe": timeframe, "start_date": start_date, "end_date": end_date}
+        with self.engine.connect() as conn:
+            snapshot = conn.execution_options(isolation_level='REPEATABLE READ', stream_results=True)
+            with snapshot.begin():
+                n_rows, n_volumes = snapshot.execute(text(f"SELECT count(*), count(volume) {where}"), params).one()
+                chunks = (
+                    {
+                        'timestamp': df['timestamp'].to_numpy(dtype='datetime64[ns]'),
+                        **{column: df[column].to_numpy(dtype=np.float64) for column in PRICE_COLUMNS + ['volume']}
+                    }
+                    for df in pd.read_sql_query(query, snapshot, params=params, parse_dates=['timestamp'],
+                                                chunksize=READ_CHUNK_ROWS)
+                )
+                yield n_rows, np.int64 if n_volumes == n_rows else np.float64, chunks
+
+    def get_price_matrix(self, tickers: List[str], start_date: str, end_date: str,
+                         timeframe: str) -> Optional[PriceMatrix]:
+        """Open/close prices of many tickers in one query, aligned into (bars x tickers) float64 matrices"""
+        layout = self._layout_for(timeframe)
+        try:
+            query = text(f"""
+                SELECT
+                    ticker,
+                    {layout.timestamp} AS timestamp,
+                    open_price::double precision AS open_price,
+                    close_price::double precision AS close_price
+                FROM {layout.table}
+                WHERE ticker = ANY(:tickers)
+                AND timeframe = :timeframe
+                AND {RANGE_FILTER.format(column=layout.range_column)}
+            """)
+            df = pd.read_sql_query(
+                query,
+                self.engine,
+                params={
+                    "tickers": list(tickers),
+                    "timeframe": timeframe,
+                    "start_date": start_date,
+                    "end_date": end_date
+                },
+                parse_dates=['timestamp']
+            )
+            if df.empty:
+                return None
+            return PriceMatrix.from_long(df, list(tickers))
+        except Exception as e:
+            logger.error(f"Error retrieving price matrix: {str(e)}")
+            raise
+
+    def _query_stock_data(self, ticker: str, start_date: str, end_date: str, timeframe: str) -> Optional[pd.DataFrame]:
         """Retrieve OHLCV data from PostgreSQL database"""
+        layout = self._layout_for(timeframe)
         try:
             with self.Session() as session:
-                query = text("""
+                query = text(f"""
                     SELECT 
                         ticker,
-                        bar_date,
-                        bar_time,
+                        {layout.bar_date} AS bar_date,
+                        {layout.bar_time} AS bar_time,
                         timeframe,
                         open_price,
                         high_price,
                         low_price,
                         close_price,
                         volume
-                    FROM ohlc_data
+                    FROM {layout.table}
                     WHERE ticker = :ticker 
                     AND timeframe = :timeframe 
-                    AND bar_date BETWEEN :start_date AND :end_date
-                    ORDER BY bar_date ASC, bar_time ASC
+                    AND {RANGE_FILTER.format(column=layout.range_column)}
+                    ORDER BY {layout.order_by}
                 """)
                 
                 # Use pd.read_sql_query with SQLAlchemy engine
@@ -59,74 +257,320 @@ class DatabaseOperations:
             logger.error(f"Error retrieving stock data: {str(e)}")
             raise
 
-    def save_stock_data(self, data: pd.DataFrame):
-        """Save OHLCV data to PostgreSQL database, skipping existing records"""
+    def _layout_for(self, timeframe: str) -> StorageLayout:
+        """Weekly and monthly bars are read from the rollups maintained from daily bars"""
+        return ROLLUP_LAYOUT if timeframe in ROLLUP_PERIODS else self.layout
+
+    def _ensure_partitions(self, conn, data: pd.DataFrame):
+        """Create the time partitions the rows of `data` fall in (time-series layout only)"""
+        if self.layout is not LEGACY_LAYOUT:
+            ensure_partitions(conn, data['bar_date'].min(), data['bar_date'].max())
+
+    def _invalidate_cache(self, ticker: str, timeframe: str):
+        if self.cache is not None:
+            self.cache.invalidate(ticker, timeframe)
+
+    def _ensure_fundamental(self, session, ticker: str):
+        """Create the FundamentalData row a ticker's OHLC rows reference, if missing"""
+        fundamental = session.query(FundamentalData).filter_by(ticker=ticker).first()
+        if not fundamental:
+            fundamental = FundamentalData(
+                ticker=ticker,
+                asset_name=ticker,
+                asset_type='stock'
+            )
+            session.add(fundamental)
+            session.commit()
+            logger.info(f"Added new fundamental data for ticker: {ticker}")
+
+    def bulk_load_stock_data(self, data: pd.DataFrame) -> Dict[str, int]:
+        """Stream OHLCV rows into the OHLC table with COPY FROM STDIN through a staging table, skipping existing records"""
+        try:
+            ticker = data['ticker'].iloc[0]
+            with self.Session() as session:
+                self._ensure_fundamental(session, ticker)
+
+            layout = self.layout
+            buffer = io.StringIO()
+            to_layout_rows(data, layout).to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+
+            columns = ', '.join(layout.columns)
+            with self.engine.begin() as conn:
+                self._ensure_partitions(conn, data)
+                cursor = conn.connection.cursor()
+                try:
+                    cursor.execute(f"""
+                        CREATE TEMP TABLE ohlc_staging ON COMMIT DROP AS
+                        SELECT {columns} FROM {layout.table} WITH NO DATA
+                    """)
+                    cursor.copy_expert(f"COPY ohlc_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+                    cursor.execute(f"""
+                        INSERT INTO {layout.table} ({columns})
+                        SELECT {columns} FROM ohlc_staging
+                        ON CONFLICT ({', '.join(layout.key_columns)}) DO NOTHING
+                    """)
+                    inserted = cursor.rowcount
+                finally:
+                    cursor.close()
+
+            stats = {'inserted': inserted, 'updated': 0, 'skipped': len(data) - inserted}
+            if inserted:
+                self._invalidate_cache(ticker, data['timeframe'].iloc[0])
+            logger.info(f"Bulk loaded {stats['inserted']} new OHLC records for ticker: {ticker} "
+                        f"(skipped {stats['skipped']} existing)")
+            return stats
+        except Exception as e:
+            logger.error(f"Error bulk loading stock data: {str(e)}")
+            raise
+
+    def upsert_stock_data(self, data: pd.DataFrame, update_existing: bool = False,
+                          chunk_size: int = UPSERT_CHUNK_SIZE) -> List[Dict[str, int]]:
+        """
+        Insert OHLCV rows in chunks, letting the table's unique key resolve duplicates server-side.
+        With update_existing, rows whose prices or volume changed are overwritten (provider corrections).
+        Returns one stats dict per chunk.
+        """
         try:
+            ticker = data['ticker'].iloc[0]
             with self.Session() as session:
-                # Ensure FundamentalData exists
-                fundamental_ticker = data['ticker'].iloc[0]
-                fundamental = session.query(FundamentalData).filter_by(ticker=fundamental_ticker).first()
-                if not fundamental:
-                    fundamental = FundamentalData(
-                        ticker=fundamental_ticker,
-                        asset_name=fundamental_ticker,
-                        asset_type='stock'
-                    )
-                    session.add(fundamental)
-                    session.commit()
-                    logger.info(f"Added new fundamental data for ticker: {fundamental_ticker}")
-
-                # Get existing records for this ticker and timeframe
-                existing_records = session.query(
-                    OHLCData.ticker,
-                    OHLCData.bar_date,
-                    OHLCData.bar_time,
-                    OHLCData.timeframe
-                ).filter(
-                    OHLCData.ticker == fundamental_ticker,
-                    OHLCData.timeframe == data['timeframe'].iloc[0]
-                ).all()
+                self._ensure_fundamental(session, ticker)
 
-                # Create set of existing keys for fast lookup
-                existing_keys = {
-                    (r.ticker, r.bar_date, r.bar_time, r.timeframe) 
-                    for r in existing_records
-                }
-
-                # Filter new records
-                new_records = [
-                    OHLCData(
-                        ticker=row['ticker'],
-                        bar_date=row['bar_date'],
-                        bar_time=row['bar_time'],
-                        timeframe=row['timeframe'],
-                        open_price=row['open_price'],
-                        high_price=row['high_price'],
-                        low_price=row['low_price'],
-                        close_price=row['close_price'],
-                        volume=row['volume']
-                    )
-                    for _, row in data.iterrows()
-                    if (row['ticker'], row['bar_date'], row['bar_time'], row['timeframe']) 
-                    not in existing_keys
-                ]
+            # A single INSERT ... ON CONFLICT DO UPDATE cannot touch the same key twice
+            data = data.drop_duplicates(subset=OHLC_KEY_COLUMNS, keep='last')
+            rows = to_layout_rows(data, self.layout)
+            rows = rows.astype(object).where(rows.notna(), None)
+
+            table = Base.metadata.tables[self.layout.table]
+            conflict_key = self.layout.key_columns
+            chunk_stats = []
+            with self.engine.begin() as conn:
+                self._ensure_partitions(conn, data)
+                for chunk_number, start in enumerate(range(0, len(rows), chunk_size), start=1):
+                    records = rows.iloc[start:start + chunk_size].to_dict('records')
+                    stmt = insert(table).values(records)
+                    if update_existing:
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=conflict_key,
+                            set_={column: stmt.excluded[column] for column in OHLC_VALUE_COLUMNS},
+                            where=or_(*[table.c[column].is_distinct_from(stmt.excluded[column])
+                                        for column in OHLC_VALUE_COLUMNS])
+                        )
+                    else:
+                        stmt = stmt.on_conflict_do_nothing(index_elements=conflict_key)
+                    # xmax is 0 only for freshly inserted tuples, so it tells inserts from updates
+                    written = conn.execute(stmt.returning(literal_column('xmax = 0').label('inserted'))).scalars().all()
+                    inserted = sum(written)
+                    updated = len(written) - inserted
+                    chunk_stats.append({
+                        'chunk': chunk_number,
+                        'rows': len(records),
+                        'inserted': inserted,
+                        'updated': updated,
+                        'skipped': len(records) - inserted - updated
+                    })
+
+            inserted = sum(c['inserted'] for c in chunk_stats)
+            updated = sum(c['updated'] for c in chunk_stats)
+            if inserted or updated:
+                self._invalidate_cache(ticker, data['timeframe'].iloc[0])
+            logger.info(f"Upserted OHLC records for ticker: {ticker} in {len(chunk_stats)} chunks "
+                        f"({inserted} inserted, {updated} updated, {len(data) - inserted - updated} skipped)")
+            return chunk_stats
+        except Exception as e:
+            logger.error(f"Error upserting stock data: {str(e)}")
+            raise
+
+    def save_stock_data(self, data: pd.DataFrame, update_existing: bool = False) -> Dict[str, int]:
+        """
+        Save OHLCV data to PostgreSQL database, skipping (or, with update_existing, correcting) existing records.
+        New or changed daily bars also refresh the weekly/monthly rollups of the periods they fall in.
+        """
+        if len(data) >= BULK_LOAD_MIN_ROWS and not update_existing:
+            stats = self.bulk_load_stock_data(data)
+        else:
+            chunk_stats = self.upsert_stock_data(data, update_existing)
+            stats = {
+                'inserted': sum(c['inserted'] for c in chunk_stats),
+                'updated': sum(c['updated'] for c in chunk_stats),
+                'skipped': sum(c['skipped'] for c in chunk_stats)
+            }
+        if (stats['inserted'] or stats['updated']) and data['timeframe'].iloc[0] == ROLLUP_SOURCE_TIMEFRAME:
+            self.refresh_rollups(data['ticker'].iloc[0], data['bar_date'].min(), data['bar_date'].max())
+        return stats
+
+    def refresh_rollups(self, ticker: str, start_date, end_date,
+                        timeframes: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Recompute the weekly/monthly bars of every period touching [start_date, end_date] from daily bars.
+
+        Only those periods are aggregated, and rows whose values did not change are left untouched.
+        Returns timeframe -> rollup rows written.
+        """
+        layout = self.layout
+        written = {}
+        try:
+            with self.engine.begin() as conn:
+                for timeframe in timeframes or list(ROLLUP_PERIODS):
+                    result = conn.execute(text(f"""
+                        INSERT INTO ohlc_rollup (
+                            ticker, timeframe, period_start, bar_date,
+                            open_price, high_price, low_price, close_price, volume, n_bars
+                        )
+                        SELECT
+                            ticker,
+                            :timeframe,
+                            date_trunc(:unit, {layout.timestamp})::date,
+                            max({layout.bar_date}),
+                            (array_agg(open_price ORDER BY {layout.timestamp}))[1],
+                            max(high_price),
+                            min(low_price),
+                            (array_agg(close_price ORDER BY {layout.timestamp} DESC))[1],
+                            sum(volume),
+                            count(*)
+                        FROM {layout.table}
+                        WHERE ticker = :ticker
+                        AND timeframe = :source
+                        AND {layout.range_column} >= date_trunc(:unit, CAST(:start_date AS timestamp))
+                        AND {layout.range_column} < date_trunc(:unit, CAST(:end_date AS timestamp))
+                            + CAST('1 ' || :unit AS interval)
+                        GROUP BY ticker, 3
+                        ON CONFLICT ON CONSTRAINT uix_ohlc_rollup DO UPDATE SET
+                            bar_date = EXCLUDED.bar_date,
+                            open_price = EXCLUDED.open_price,
+                            high_price = EXCLUDED.high_price,
+                            low_price = EXCLUDED.low_price,
+                            close_price = EXCLUDED.close_price,
+                            volume = EXCLUDED.volume,
+                            n_bars = EXCLUDED.n_bars,
+                            updated_at = now()
+                        WHERE (ohlc_rollup.bar_date, ohlc_rollup.open_price, ohlc_rollup.high_price,
+                               ohlc_rollup.low_price, ohlc_rollup.close_price, ohlc_rollup.volume, ohlc_rollup.n_bars)
+                        IS DISTINCT FROM (EXCLUDED.bar_date, EXCLUDED.open_price, EXCLUDED.high_price,
+                               EXCLUDED.low_price, EXCLUDED.close_price, EXCLUDED.volume, EXCLUDED.n_bars)
+                    """), {
+                        "ticker": ticker,
+                        "timeframe": timeframe,
+                        "unit": ROLLUP_PERIODS[timeframe],
+                        "source": ROLLUP_SOURCE_TIMEFRAME,
+                        "start_date": str(start_date),
+                        "end_date": str(end_date)
+                    })
+                    written[timeframe] = result.rowcount
+            for timeframe, rows in written.items():
+                if rows:
+                    self._invalidate_cache(ticker, timeframe)
+            logger.info(f"Refreshed rollups for {ticker} from {start_date} to {end_date}: {written}")
+            return written
+        except Exception as e:
+            logger.error(f"Error refreshing rollups: {str(e)}")
+            raise
+
+    def rebuild_rollups(self, ticker: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Build the rollups of every stored daily history (one-off migration for data saved before rollups)"""
+        layout = self.layout
+        with self.engine.connect() as conn:
+            spans = conn.execute(text(f"""
+                SELECT ticker, min({layout.bar_date}), max({layout.bar_date})
+                FROM {layout.table}
+                WHERE timeframe = :source
+                AND (CAST(:ticker AS varchar) IS NULL OR ticker = :ticker)
+                GROUP BY ticker
+            """), {"source": ROLLUP_SOURCE_TIMEFRAME, "ticker": ticker}).all()
+        return {t: self.refresh_rollups(t, first_bar, last_bar) for t, first_bar, last_bar in spans}
+
+    def get_custom_bars(self, ticker: str, start_date: str, end_date: str, period: str) -> Optional[pd.DataFrame]:
+        """
+        Aggregate daily bars into arbitrary periods on the fly, in the get_stock_data layout.
+
+        `period` is a calendar unit ('week', 'month', 'quarter', 'year') or an interval such as '2 weeks'
+        or '10 days', binned from Monday 2000-01-03. Bars are labelled with their last trading day.
+        """
+        layout = self.layout
+        if period in CUSTOM_PERIOD_UNITS:
+            bucket = f"date_trunc(:period, {layout.timestamp})"
+        else:
+            bucket = f"date_bin(CAST(:period AS interval), {layout.timestamp}, TIMESTAMP '2000-01-03')"
+        try:
+            query = text(f"""
+                SELECT
+                    ticker,
+                    max({layout.bar_date}) AS bar_date,
+                    TIME '00:00' AS bar_time,
+                    :period AS timeframe,
+                    (array_agg(open_price ORDER BY {layout.timestamp}))[1] AS open_price,
+                    max(high_price) AS high_price,
+                    min(low_price) AS low_price,
+                    (array_agg(close_price ORDER BY {layout.timestamp} DESC))[1] AS close_price,
+                    sum(volume) AS volume
+                FROM {layout.table}
+                WHERE ticker = :ticker
+                AND timeframe = :source
+                AND {RANGE_FILTER.format(column=layout.range_column)}
+                GROUP BY ticker, {bucket}
+                ORDER BY 2
+            """)
+            df = pd.read_sql_query(query, self.engine, params={
+                "ticker": ticker,
+                "period": period,
+                "source": ROLLUP_SOURCE_TIMEFRAME,
+                "start_date": start_date,
+                "end_date": end_date
+            })
+            return df if not df.empty else None
+        except Exception as e:
+            logger.error(f"Error aggregating {period} bars: {str(e)}")
+            raise
 
-                if new_records:
-                    session.bulk_save_objects(new_records)
-                    session.commit()
-                    logger.info(f"Saved {len(new_records)} new OHLC records for ticker: {fundamental_ticker}")
-                else:
-                    logger.info(f"No new records to save for ticker: {fundamental_ticker}")
+    def get_coverage(self, ticker: str, timeframe: str) -> List[Tuple[date, date]]:
+        """Date intervals already fetched for (ticker, timeframe), merged and sorted"""
+        try:
+            with self.Session() as session:
+                intervals = session.query(DataCoverage.start_date, DataCoverage.end_date).filter(
+                    DataCoverage.ticker == ticker,
+                    DataCoverage.timeframe == timeframe
+                ).all()
+                if intervals:
+                    return merge_intervals([(r.start_date, r.end_date) for r in intervals])
 
-                skipped = len(data) - len(new_records)
-                if skipped > 0:
-                    logger.info(f"Skipped {skipped} existing records for ticker: {fundamental_ticker}")
+                # Rows stored before coverage tracking existed: assume their span is complete
+                layout = self.layout
+                first_bar, last_bar = session.execute(text(f"""
+                    SELECT min({layout.bar_date}), max({layout.bar_date})
+                    FROM {layout.table}
+                    WHERE ticker = :ticker AND timeframe = :timeframe
+                """), {"ticker": ticker, "timeframe": timeframe}).one()
+            if first_bar is None:
+                return []
+            logger.info(f"Seeding coverage for {ticker} ({timeframe}) from stored bars: {first_bar} to {last_bar}")
+            return self.record_coverage(ticker, timeframe, first_bar, last_bar)
+        except Exception as e:
+            logger.error(f"Error retrieving data coverage: {str(e)}")
+            raise
 
+    def record_coverage(self, ticker: str, timeframe: str, start_date: date, end_date: date) -> List[Tuple[date, date]]:
+        """Mark [start_date, end_date] as fetched for (ticker, timeframe) and return the merged coverage"""
+        try:
+            with self.Session() as session:
+                self._ensure_fundamental(session, ticker)
+                existing = session.query(DataCoverage).filter(
+                    DataCoverage.ticker == ticker,
+                    DataCoverage.timeframe == timeframe
+                ).all()
+                merged = merge_intervals([(c.start_date, c.end_date) for c in existing] + [(start_date, end_date)])
+                for coverage in existing:
+                    session.delete(coverage)
+                session.add_all([
+                    DataCoverage(ticker=ticker, timeframe=timeframe, start_date=start, end_date=end)
+                    for start, end in merged
+                ])
+                session.commit()
+                logger.info(f"Recorded coverage for {ticker} ({timeframe}): {start_date} to {end_date}")
+                return merged
         except Exception as e:
-            logger.error(f"Error saving stock data: {str(e)}")
+            logger.error(f"Error recording data coverage: {str(e)}")
             raise
 
-    
     def save_backtest_summary(self, backtest_data: dict) -> int:
         """Save backtest summary results and return the test_id"""
         try:
@@ -163,4 +607,205 @@ class DatabaseOperations:
                 logger.info(f"Saved {len(trade_records)} backtest detail records for test_id {test_id}")
         except Exception as e:
             logger.error(f"Error saving backtest details: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def save_backtest_results(self, results: List[Tuple[dict, List[dict]]],
+                              equity_curves: Optional[List[Optional[pd.Series]]] = None) -> List[int]:
+        """
+        Save many backtests' summaries, trades and equity curves in one transaction and return their test_ids.
+
+        The test_ids are reserved from the sequence up front, so each table is then written with a single
+        COPY: four round trips per batch however many backtests and trades it holds.
+        """
+        if not results:
+            return []
+        try:
+            with self.engine.begin() as conn:
+                cursor = conn.connection.cursor()
+                try:
+                    test_ids = self._copy_backtests(cursor, results, equity_curves)
+                finally:
+                    cursor.close()
+            logger.info(f"Saved {len(test_ids)} backtest summaries with "
+                        f"{sum(len(trades) for _, trades in results)} detail records")
+            return test_ids
+        except Exception as e:
+            logger.error(f"Error saving backtest results: {str(e)}")
+            raise
+
+    @staticmethod
+    def _copy_backtests(cursor, results: List[Tuple[dict, List[dict]]],
+                        equity_curves: Optional[List[Optional[pd.Series]]]) -> List[int]:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence('backtest_summary', 'test_id')) FROM generate_series(1, %s)",
+            (len(results),)
+        )
+        test_ids = [row[0] for row in cursor.fetchall()]
+
+        summaries = pd.DataFrame([summary for summary, _ in results])
+        summaries.insert(0, 'test_id', test_ids)
+        _copy_frame(cursor, 'backtest_summary', summaries)
+
+        trades = [dict(trade, test_id=test_id) for test_id, (_, trades_data) in zip(test_ids, results)
+                  for trade in trades_data]
+        if trades:
+            _copy_frame(cursor, 'backtest_details', pd.DataFrame(trades, columns=BACKTEST_DETAIL_COLUMNS))
+
+        curves = [(test_id, len(equity), '\\x' + encode_equity_curve(equity).hex())
+                  for test_id, equity in zip(test_ids, equity_curves or []) if equity is not None]
+        if curves:
+            _copy_frame(cursor, 'backtest_equity', pd.DataFrame(curves, columns=['test_id', 'n_points', 'equity_curve']))
+        return test_ids
+
+    def save_walk_forward(self, run: dict, folds: List[dict]) -> int:
+        """
+        Save a walk-forward run in one transaction and return its run_id.
+
+        Each fold's out-of-sample backtest ('summary', 'details', 'equity') is stored as a regular
+        BacktestSummary with its trades and equity curve; walk_forward_fold rows link them to the run
+        together with the window bounds and the parameters chosen in-sample.
+        """
+        try:
+            with self.engine.begin() as conn:
+                cursor = conn.connection.cursor()
+                try:
+                    run_id = self._copy_walk_forward(cursor, run, folds)
+                finally:
+                    cursor.close()
+            logger.info(f"Saved walk-forward run {run_id} for {run['ticker']} with {len(folds)} folds")
+            return run_id
+        except Exception as e:
+            logger.error(f"Error saving walk-forward run: {str(e)}")
+            raise
+
+    @staticmethod
+    def _copy_walk_forward(cursor, run: dict, folds: List[dict]) -> int:
+        test_ids = DatabaseOperations._copy_backtests(
+            cursor, [(fold['summary'], fold['details']) for fold in folds], [fold['equity'] for fold in folds]
+        )
+        cursor.execute(
+            f"INSERT INTO walk_forward_run ({', '.join(WALK_FORWARD_RUN_COLUMNS)}) "
+            f"VALUES ({', '.join(['%s'] * len(WALK_FORWARD_RUN_COLUMNS))}) RETURNING run_id",
+            [run[column] for column in WALK_FORWARD_RUN_COLUMNS]
+        )
+        run_id = cursor.fetchone()[0]
+        rows = pd.DataFrame([dict(fold, run_id=run_id, test_id=test_id) for fold, test_id in zip(folds, test_ids)],
+                            columns=WALK_FORWARD_FOLD_COLUMNS)
+        _copy_frame(cursor, 'walk_forward_fold', rows)
+        return run_id
+
+    def save_portfolio_backtest(self, summary: dict, ticker_stats: pd.DataFrame, equity: pd.Series) -> int:
+        """Save a portfolio backtest, its equity curve and one row per ticker in one transaction; returns its id"""
+        try:
+            with self.engine.begin() as conn:
+                cursor = conn.connection.cursor()
+                try:
+                    portfolio_id = self._copy_portfolio(cursor, summary, ticker_stats, equity)
+                finally:
+                    cursor.close()
+            logger.info(f"Saved portfolio backtest {portfolio_id} with {len(ticker_stats)} tickers")
+            return portfolio_id
+        except Exception as e:
+            logger.error(f"Error saving portfolio backtest: {str(e)}")
+            raise
+
+    @staticmethod
+    def _copy_portfolio(cursor, summary: dict, ticker_stats: pd.DataFrame, equity: pd.Series) -> int:
+        row = dict(summary, n_points=len(equity), equity_curve=encode_equity_curve(equity))
+        cursor.execute(
+            f"INSERT INTO portfolio_backtest ({', '.join(row)}) "
+            f"VALUES ({', '.join(['%s'] * len(row))}) RETURNING portfolio_id",
+            list(row.values())
+        )
+        portfolio_id = cursor.fetchone()[0]
+        _copy_frame(cursor, 'portfolio_ticker',
+                    ticker_stats.assign(portfolio_id=portfolio_id)[PORTFOLIO_TICKER_COLUMNS])
+        return portfolio_id
+
+    def save_robustness(self, test_id: int, intervals: pd.DataFrame):
+        """Store a backtest's robustness intervals (analyze_robustness output), replacing earlier ones"""
+        if intervals.empty:
+            return
+        try:
+            with self.engine.begin() as conn:
+                cursor = conn.connection.cursor()
+                try:
+                    cursor.execute("DELETE FROM backtest_robustness WHERE test_id = %s", (test_id,))
+                    _copy_frame(cursor, 'backtest_robustness', intervals.assign(test_id=test_id))
+                finally:
+                    cursor.close()
+            logger.info(f"Saved {len(intervals)} robustness intervals for test_id {test_id}")
+        except Exception as e:
+            logger.error(f"Error saving robustness intervals: {str(e)}")
+            raise
+
+    def get_robustness(self, test_id: int) -> Optional[pd.DataFrame]:
+        """Stored robustness intervals of a backtest, in the analyze_robustness layout"""
+        try:
+            df = pd.read_sql_query(text(f"""
+                SELECT {', '.join(ROBUSTNESS_COLUMNS)}
+                FROM backtest_robustness
+                WHERE test_id = :test_id
+                ORDER BY method DESC, metric
+            """), self.engine, params={"test_id": test_id})
+            return df if not df.empty else None
+        except Exception as e:
+            logger.error(f"Error retrieving robustness intervals: {str(e)}")
+            raise
+
+    def get_cached_backtest(self, cache_key: str) -> Optional[Tuple[int, dict, List[dict], Optional[pd.Series]]]:
+        """Stored (test_id, summary, trades, equity curve) of a memoized backtest, or None"""
+        try:
+            with self.Session() as session:
+                entry = session.get(BacktestCache, cache_key)
+                if entry is None:
+                    return None
+                summary = entry.backtest_summary
+                trades = session.query(BacktestDetails).filter(
+                    BacktestDetails.test_id == entry.test_id
+                ).order_by(BacktestDetails.trade_number).all()
+                equity = summary.backtest_equity
+                return (
+                    entry.test_id,
+                    {column.name: getattr(summary, column.name) for column in BacktestSummary.__table__.columns},
+                    [{column.name: getattr(trade, column.name) for column in BacktestDetails.__table__.columns}
+                     for trade in trades],
+                    decode_equity_curve(equity.equity_curve) if equity is not None else None
+                )
+        except Exception as e:
+            logger.error(f"Error retrieving cached backtest: {str(e)}")
+            raise
+
+    def save_cached_backtest(self, cache_key: str, data_fingerprint: str, summary_data: dict,
+                             trades_data: List[dict], equity_curve: Optional[pd.Series] = None) -> int:
+        """
+        Save a backtest's summary, trades and equity curve under its cache key in one transaction and
+        return the test_id.
+
+        If another process stored the same key first, nothing is written and its test_id is returned.
+        """
+        try:
+            with self.engine.begin() as conn:
+                cursor = conn.connection.cursor()
+                try:
+                    [test_id] = self._copy_backtests(cursor, [(summary_data, trades_data)], [equity_curve])
+                    cursor.execute("""
+                        INSERT INTO backtest_cache (cache_key, test_id, data_fingerprint) VALUES (%s, %s, %s)
+                        ON CONFLICT (cache_key) DO NOTHING
+                        RETURNING test_id
+                    """, (cache_key, test_id, data_fingerprint))
+                    if cursor.fetchone() is None:
+                        raise _BacktestAlreadyStored()
+                finally:
+                    cursor.close()
+            logger.info(f"Saved backtest test_id={test_id} with {len(trades_data)} trades "
+                        f"under cache key {cache_key[:12]}")
+            return test_id
+        except _BacktestAlreadyStored:
+            with self.Session() as session:
+                test_id = session.get(BacktestCache, cache_key).test_id
+            logger.info(f"Backtest {cache_key[:12]} already stored as test_id={test_id}")
+            return test_id
+        except Exception as e:
+            logger.error(f"Error saving cached backtest: {str(e)}")
+            raise
@@ -0,0 +1,228 @@
+# src/database/timeseries.py
+import argparse
+import logging
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional
+import numpy as np
+import pandas as pd
+from sqlalchemy import event, text
+from config.settings import OHLC_PARTITION_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+OHLC_VALUE_COLUMNS = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
+
+
+class StorageLayout(NamedTuple):
+    """
+    Where OHLC bars live and the SQL expressions that expose them in the ohlc_data layout.
+
+    `range_column` is what date range filters compare against, so they can use the table's index
+    (and, for ohlc_bars, partition pruning).
+    """
+    name: str
+    table: str
+    key_columns: List[str]
+    range_column: str
+    bar_date: str
+    bar_time: str
+    timestamp: str
+    order_by: str
+
+    @property
+    def columns(self) -> List[str]:
+        return self.key_columns + OHLC_VALUE_COLUMNS
+
+
+# Original schema: surrogate id, separate date and time columns, numeric prices
+LEGACY_LAYOUT = StorageLayout(
+    name='legacy',
+    table='ohlc_data',
+    key_columns=['ticker', 'bar_date', 'bar_time', 'timeframe'],
+    range_column='bar_date',
+    bar_date='bar_date',
+    bar_time='bar_time',
+    timestamp='bar_date + bar_time',
+    order_by='bar_date, bar_time',
+)
+
+# Single timestamp column, double precision prices, range-partitioned on ts (see OHLCBar)
+TIMESERIES_LAYOUT = StorageLayout(
+    name='timeseries',
+    table='ohlc_bars',
+    key_columns=['ticker', 'timeframe', 'ts'],
+    range_column='ts',
+    bar_date='ts::date',
+    bar_time='ts::time',
+    timestamp='ts',
+    order_by='ts',
+)
+
+LAYOUTS = {layout.name: layout for layout in (LEGACY_LAYOUT, TIMESERIES_LAYOUT)}
+
+# Inclusive [start_date, end_date] day range on a layout's range column
+RANGE_FILTER = "{column} >= CAST(:start_date AS date) AND {column} < CAST(:end_date AS date) + 1"
+
+
+def get_layout(name: str) -> StorageLayout:
+    try:
+        return LAYOUTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown OHLC storage layout '{name}', expected one of {sorted(LAYOUTS)}")
+
+
+def to_layout_rows(data: pd.DataFrame, layout: StorageLayout) -> pd.DataFrame:
+    """Rows of an ohlc_data-layout frame in the columns `layout` stores"""
+    if layout is LEGACY_LAYOUT:
+        return data[layout.columns]
+    ts = pd.to_datetime(data['bar_date'].astype(str)) + pd.to_timedelta(data['bar_time'].astype(str))
+    rows = data[['ticker', 'timeframe']].assign(ts=ts.to_numpy())
+    for column in OHLC_VALUE_COLUMNS[:-1]:
+        rows[column] = data[column].to_numpy(dtype=np.float64)
+    rows['volume'] = data['volume'].to_numpy()
+    return rows[layout.columns]
+
+
+def partition_bounds(first: date, last: date, interval: str = OHLC_PARTITION_INTERVAL) -> List[Dict]:
+    """Name and [start, end) of every ohlc_bars partition needed to hold bars from `first` to `last`"""
+    if interval not in ('year', 'month'):
+        raise ValueError(f"Unsupported partition interval '{interval}', expected 'year' or 'month'")
+    freq = 'YS' if interval == 'year' else 'MS'
+    starts = pd.date_range(pd.Timestamp(first).to_period(freq[0]).to_timestamp(), pd.Timestamp(last), freq=freq)
+    return [{
+        'name': f"ohlc_bars_{start:%Y}" if interval == 'year' else f"ohlc_bars_{start:%Y_%m}",
+        'start': start.date(),
+        'end': (start + pd.offsets.DateOffset(**{f"{interval}s": 1})).date(),
+    } for start in starts]
+
+
+_known_partitions = set()
+_partitions_lock = threading.Lock()
+
+
+def ensure_partitions(conn, first: date, last: date, interval: str = OHLC_PARTITION_INTERVAL):
+    """
+    Create the ohlc_bars partitions covering [first, last] that do not exist yet.
+
+    Runs inside the caller's transaction; an advisory lock serializes concurrent writers so two of them
+    never race on the same CREATE TABLE. Partitions are remembered for the process only once that
+    transaction commits: after a rollback they do not exist, and the next writer creates them again.
+    """
+    missing = [p for p in partition_bounds(first, last, interval) if p['name'] not in _known_partitions]
+    if not missing:
+        return
+    names = [p['name'] for p in missing]
+
+    def remember(_):
+        with _partitions_lock:
+            _known_partitions.update(names)
+
+    def forget(_):
+        if event.contains(conn, 'commit', remember):
+            event.remove(conn, 'commit', remember)
+
+    with _partitions_lock:
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('ohlc_bars_partitions'))"))
+        for partition in missing:
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {partition['name']} PARTITION OF ohlc_bars
+                FOR VALUES FROM ('{partition['start']}') TO ('{partition['end']}')
+            """))
+    event.listen(conn, 'commit', remember, once=True)
+    event.listen(conn, 'rollback', forget, once=True)
+    logger.info(f"Ensured ohlc_bars partitions: {', '.join(p['name'] for p in missing)}")
+
+
+def migrate_to_timeseries(engine, tickers: Optional[Iterable[str]] = None,
+                          interval: str = OHLC_PARTITION_INTERVAL) -> Dict[str, int]:
+    """
+    Copy ohlc_data into ohlc_bars, one transaction per ticker so the migration can be resumed.
+
+    Rows are inserted in (timeframe, ts) order so each partition stays physically clustered on time,
+    which is what keeps its BRIN index selective. Existing ohlc_bars rows are left as they are, and
+    ohlc_data is not modified: switch OHLC_STORAGE to 'timeseries' once this returns, and drop the
+    old table when the new layout has been verified. Returns ticker -> rows copied.
+    """
+    from src.database.models import OHLCBar
+    OHLCBar.__table__.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        if tickers is None:
+            tickers = conn.execute(text("SELECT DISTINCT ticker FROM ohlc_data ORDER BY 1")).scalars().all()
+        first, last = conn.execute(text("SELECT min(bar_date), max(bar_date) FROM ohlc_data")).one()
+    if first is None:
+        return {}
+
+    copied = {}
+    for ticker in tickers:
+        with engine.begin() as conn:
+            ensure_partitions(conn, first, last, interval)
+            result = conn.execute(text("""
+                INSERT INTO ohlc_bars (ticker, timeframe, ts, open_price, high_price, low_price, close_price, volume)
+                SELECT ticker, timeframe, bar_date + bar_time,
+                       open_price::double precision, high_price::double precision,
+                       low_price::double precision, close_price::double precision, volume
+                FROM ohlc_data
+                WHERE ticker = :ticker
+                ORDER BY timeframe, bar_date, bar_time
+                ON CONFLICT (ticker, timeframe, ts) DO NOTHING
+            """), {"ticker": ticker})
+            copied[ticker] = result.rowcount
+        logger.info(f"Migrated {copied[ticker]} OHLC rows of {ticker} to ohlc_bars")
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE ohlc_bars"))
+    return copied
+
+
+def benchmark_range_reads(tickers: List[str], timeframe: str = 'daily', days: int = 365,
+                          repeats: int = 20, seed: int = 0) -> pd.DataFrame:
+    """
+    Time uncached per-ticker range reads (get_stock_arrays) against both layouts on the same random
+    windows. Both tables must hold the same bars, e.g. right after migrate_to_timeseries.
+    Returns one row per layout with median/p95 latency in milliseconds and rows per read.
+    """
+    from src.database.operations import DatabaseOperations
+    rng = np.random.default_rng(seed)
+    windows = []
+    for _ in range(repeats):
+        start = pd.Timestamp('2000-01-01') + pd.Timedelta(days=int(rng.integers(0, 365 * 24)))
+        windows.append((str(rng.choice(tickers)), start.date(), (start + pd.Timedelta(days=days)).date()))
+
+    rows = []
+    for name in LAYOUTS:
+        db_ops = DatabaseOperations(storage=name)
+        db_ops.cache = None
+        timings, sizes = [], []
+        for ticker, start, end in windows:
+            started = time.perf_counter()
+            arrays = db_ops.get_stock_arrays(ticker, str(start), str(end), timeframe)
+            timings.append((time.perf_counter() - started) * 1000)
+            sizes.append(arrays.n_bars if arrays is not None else 0)
+        rows.append({
+            'layout': name,
+            'p50_ms': float(np.percentile(timings, 50)),
+            'p95_ms': float(np.percentile(timings, 95)),
+            'rows_per_read': float(np.mean(sizes)),
+        })
+    return pd.DataFrame(rows).set_index('layout')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate OHLC bars to the time-series layout and benchmark it")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate = subparsers.add_parser('migrate', help="copy ohlc_data into the partitioned ohlc_bars table")
+    migrate.add_argument('tickers', nargs='*')
+    bench = subparsers.add_parser('benchmark', help="time range reads by ticker on both layouts")
+    bench.add_argument('tickers', nargs='+')
+    bench.add_argument('--timeframe', default='daily')
+    bench.add_argument('--days', type=int, default=365)
+    bench.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'migrate':
+        from src.database.engine import get_engine
+        print(migrate_to_timeseries(get_engine(), args.tickers or None))
+    else:
+        print(benchmark_range_reads(args.tickers, args.timeframe, args.days, args.repeats).round(2))
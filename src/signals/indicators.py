@@ -0,0 +1,237 @@
+# src/signals/indicators.py
+import functools
+import hashlib
+import inspect
+import logging
+from typing import Callable, Dict, Tuple, Union
+import numpy as np
+from cachetools import LRUCache
+from config.settings import INDICATOR_CACHE_SIZE
+from src.utils.caching import LockedCache
+
+try:
+    from scipy.signal import lfilter
+except ImportError:  # scipy is in requirements.txt; the Python recursion below is the fallback
+    lfilter = None
+
+logger = logging.getLogger(__name__)
+
+Indicator = Union[np.ndarray, Dict[str, np.ndarray]]
+
+
+# Rolling primitives: float64 in, float64 out, NaN while warming up or when a window holds a NaN
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Mean of each trailing window from one prefix sum, O(n) whatever the window.
+    A (bars x series) matrix is averaged down each column.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    _check_window(window)
+    out = np.full(values.shape, np.nan)
+    if window > len(values):
+        return out
+    missing = np.isnan(values)
+    # Centering on each series' first value keeps the prefix sums small, so window differences stay precise
+    first = np.expand_dims(np.argmax(~missing, axis=0), 0)
+    offset = np.nan_to_num(np.take_along_axis(values, first, axis=0)[0])
+    zeros = np.zeros((1,) + values.shape[1:])
+    csum = np.concatenate((zeros, np.cumsum(np.where(missing, 0.0, values - offset), axis=0)))
+    out[window - 1:] = (csum[window:] - csum[:-window]) / window + offset
+    if missing.any():
+        nan_count = np.concatenate((zeros, np.cumsum(missing, axis=0)))
+        out[window - 1:][(nan_count[window:] - nan_count[:-window]) > 0] = np.nan
+    return out
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Maximum of each trailing window in O(n) (van Herk / Gil-Werman).
+
+    The array is cut into blocks of `window`; every window then spans the tail of one block and the
+    head of the next, so its maximum is a block suffix-max combined with a block prefix-max. This is
+    the vectorized counterpart of a monotonic deque scan.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    _check_window(window)
+    n = len(values)
+    out = np.full(n, np.nan)
+    if window > n:
+        return out
+    blocks = np.concatenate((values, np.full(-n % window, -np.inf))).reshape(-1, window)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    out[window - 1:] = np.maximum(suffix[:n - window + 1], prefix[window - 1:n])
+    return out
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    return -rolling_max(-np.asarray(values, dtype=np.float64), window)
+
+
+def crossover_signals(fast: np.ndarray, slow: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Boolean arrays of the bars where `fast` crosses above `slow` (buy) and below it (sell), with the
+    rule `backtesting.lib.crossover` applies at each close: strictly on one side on the previous bar
+    and strictly on the other now. NaN never crosses. A (bars x series) matrix is scanned down each column.
+    """
+    fast = np.asarray(fast, dtype=np.float64)
+    slow = np.asarray(slow, dtype=np.float64)
+    buy = np.zeros(np.broadcast(fast, slow).shape, dtype=bool)
+    sell = np.zeros_like(buy)
+    with np.errstate(invalid='ignore'):
+        buy[1:] = (fast[:-1] < slow[:-1]) & (fast[1:] > slow[1:])
+        sell[1:] = (slow[:-1] < fast[:-1]) & (slow[1:] > fast[1:])
+    return buy, sell
+
+
+def ewma(values: np.ndarray, alpha: float, seed: float, start: int) -> np.ndarray:
+    """
+    y[start] = seed, y[t] = alpha * x[t] + (1 - alpha) * y[t-1] afterwards; NaN before `start`.
+
+    Runs as a first-order IIR filter (scipy.signal.lfilter) when scipy is available.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if start >= len(values):
+        return out
+    out[start] = seed
+    tail = values[start + 1:]
+    if lfilter is not None:
+        out[start + 1:], _ = lfilter([alpha], [1.0, alpha - 1.0], tail, zi=[(1.0 - alpha) * seed])
+    else:
+        previous = seed
+        for i, value in enumerate(tail.tolist(), start=start + 1):
+            previous = alpha * value + (1.0 - alpha) * previous
+            out[i] = previous
+    return out
+
+
+def _check_window(window: int):
+    if window < 1:
+        raise ValueError(f"Indicator window must be positive, got {window}")
+
+
+def _first_valid(values: np.ndarray) -> int:
+    finite = np.flatnonzero(~np.isnan(values))
+    return int(finite[0]) if len(finite) else len(values)
+
+
+def series_fingerprint(values: np.ndarray) -> str:
+    """Digest of a series' float64 values, so equal data computed anywhere shares one cache entry"""
+    data = np.ascontiguousarray(values, dtype=np.float64)
+    return hashlib.blake2b(data.tobytes(), digest_size=16).hexdigest()
+
+
+class IndicatorCache(LockedCache):
+    """Thread-safe LRU of (series fingerprints, indicator, params) -> read-only result arrays"""
+
+    def __init__(self, maxsize: int = 512):
+        super().__init__(LRUCache(maxsize))
+
+
+_cache = IndicatorCache(INDICATOR_CACHE_SIZE)
+
+
+def _read_only(result: Indicator) -> Indicator:
+    arrays = result.values() if isinstance(result, dict) else [result]
+    for array in arrays:
+        array.setflags(write=False)
+    return result
+
+
+def _memoized(inputs: int = 1) -> Callable:
+    """
+    Serve an indicator from the shared cache. Its first `inputs` arguments are the price series;
+    results are returned read-only because every caller of the same key receives the same arrays.
+    """
+    def decorator(kernel: Callable) -> Callable:
+        signature = inspect.signature(kernel)
+
+        @functools.wraps(kernel)
+        def wrapper(*args, **kwargs) -> Indicator:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = list(bound.arguments.items())
+            series = [np.asarray(values, dtype=np.float64) for _, values in arguments[:inputs]]
+            params = tuple(arguments[inputs:])
+            key = (tuple(series_fingerprint(values) for values in series), kernel.__name__, params)
+            result = _cache.get(key)
+            if result is None:
+                result = _read_only(kernel(*series, **dict(params)))
+                _cache.put(key, result)
+            return result
+
+        wrapper.uncached = kernel
+        return wrapper
+    return decorator
+
+
+@_memoized()
+def sma(close: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average"""
+    return rolling_mean(close, window)
+
+
+@_memoized()
+def ema(close: np.ndarray, window: int) -> np.ndarray:
+    """Exponential moving average (alpha = 2 / (window + 1)), seeded with the SMA of its first window"""
+    return _ema(close, window)
+
+
+def _ema(values: np.ndarray, window: int) -> np.ndarray:
+    _check_window(window)
+    start = _first_valid(values) + window - 1
+    if start >= len(values):
+        return np.full(len(values), np.nan)
+    return ewma(values, 2.0 / (window + 1), values[start - window + 1:start + 1].mean(), start)
+
+
+@_memoized()
+def rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    """Wilder's relative strength index (0-100); NaN for the first `window` bars"""
+    _check_window(window)
+    out = np.full(len(close), np.nan)
+    if window >= len(close):
+        return out
+    change = np.diff(close)
+    gains = np.maximum(change, 0.0)
+    losses = np.maximum(-change, 0.0)
+    alpha = 1.0 / window
+    avg_gain = ewma(gains, alpha, gains[:window].mean(), window - 1)
+    avg_loss = ewma(losses, alpha, losses[:window].mean(), window - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    # No losses in the window: 100, or 50 when price did not move at all
+    value = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), value)
+    out[1:] = np.where(np.isnan(avg_gain), np.nan, value)
+    return out
+
+
+@_memoized()
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD line (fast EMA - slow EMA), its signal EMA and the histogram between them"""
+    if fast >= slow:
+        raise ValueError(f"MACD fast window ({fast}) must be shorter than slow window ({slow})")
+    line = _ema(close, fast) - _ema(close, slow)
+    signal_line = _ema(line, signal)
+    return {'macd': line, 'signal': signal_line, 'histogram': line - signal_line}
+
+
+@_memoized(inputs=2)
+def support_resistance(high: np.ndarray, low: np.ndarray, window: int = 20) -> Dict[str, np.ndarray]:
+    """Rolling support (lowest low) and resistance (highest high) over the trailing `window` bars"""
+    return {'support': rolling_min(low, window), 'resistance': rolling_max(high, window)}
+
+
+INDICATORS = {
+    'sma': sma,
+    'ema': ema,
+    'rsi': rsi,
+    'macd': macd,
+    'support_resistance': support_resistance,
+}
+
+
+def cache_stats() -> Dict[str, int]:
+    return _cache.stats()
@@ -0,0 +1,134 @@
+# src/signals/sma_crossover.py
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+GOLDEN_CROSS = 'golden_cross'
+DEATH_CROSS = 'death_cross'
+
+
+class RunningSMA:
+    """Simple moving average updated in O(1) per value from a running sum"""
+
+    def __init__(self, window: int, values: Iterable[float] = ()):
+        if window < 1:
+            raise ValueError(f"SMA window must be positive, got {window}")
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self._updates = 0
+        for value in values:
+            self.update(value)
+
+    def update(self, value: float) -> Optional[float]:
+        value = float(value)
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        self._updates += 1
+        # Re-sum once per window so floating point drift stays bounded; still O(1) amortized
+        if self._updates % self.window == 0:
+            self.total = sum(self.values)
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        if len(self.values) < self.window:
+            return None
+        return self.total / self.window
+
+
+class SMACrossoverStream:
+    """
+    Stateful fast/slow SMA crossover detector fed one bar at a time.
+
+    Emits an event as soon as a bar completes a cross, using the same rule as
+    `backtesting.lib.crossover` (strictly below on the previous bar, strictly above now).
+    Bars at or before the last seen timestamp are ignored, so a refresh job can replay an
+    overlapping window after `from_snapshot` without double counting.
+    """
+
+    def __init__(self, ticker: str, n_fast: int = 10, n_slow: int = 20):
+        if n_fast >= n_slow:
+            raise ValueError(f"Fast window ({n_fast}) must be shorter than slow window ({n_slow})")
+        self.ticker = ticker
+        self.n_fast = n_fast
+        self.n_slow = n_slow
+        self.fast = RunningSMA(n_fast)
+        self.slow = RunningSMA(n_slow)
+        self.last_timestamp: Optional[pd.Timestamp] = None
+        self.prev_fast: Optional[float] = None
+        self.prev_slow: Optional[float] = None
+
+    def update(self, close: float, timestamp=None) -> Optional[Dict]:
+        """Feed one closing price; returns a crossover event dict or None"""
+        if timestamp is not None:
+            timestamp = pd.Timestamp(timestamp)
+            if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+                logger.debug(f"Ignoring stale bar {timestamp} for {self.ticker}")
+                return None
+            self.last_timestamp = timestamp
+
+        fast = self.fast.update(close)
+        slow = self.slow.update(close)
+
+        event = None
+        if None not in (fast, slow, self.prev_fast, self.prev_slow):
+            if self.prev_fast < self.prev_slow and fast > slow:
+                event = GOLDEN_CROSS
+            elif self.prev_slow < self.prev_fast and slow > fast:
+                event = DEATH_CROSS
+        self.prev_fast, self.prev_slow = fast, slow
+
+        if event is None:
+            return None
+        logger.info(f"{event} for {self.ticker} at {timestamp}: fast={fast:.4f}, slow={slow:.4f}")
+        return {
+            'ticker': self.ticker,
+            'signal': event,
+            'timestamp': timestamp,
+            'close': float(close),
+            'sma_fast': fast,
+            'sma_slow': slow,
+        }
+
+    def update_many(self, data: pd.DataFrame) -> List[Dict]:
+        """Feed ohlc_data rows in order and return every event they produce"""
+        # bar_date + bar_time, so intraday bars of the same day are not taken for replays of the first
+        timestamps = pd.to_datetime(data['bar_date'].astype(str))
+        if 'bar_time' in data:
+            timestamps = timestamps + pd.to_timedelta(data['bar_time'].astype(str))
+        events = []
+        for timestamp, close in zip(timestamps, data['close_price']):
+            event = self.update(close, timestamp)
+            if event:
+                events.append(event)
+        return events
+
+    def snapshot(self) -> Dict:
+        """JSON-serializable state: the last n_slow closes plus the previous SMA pair"""
+        return {
+            'ticker': self.ticker,
+            'n_fast': self.n_fast,
+            'n_slow': self.n_slow,
+            'closes': list(self.slow.values),
+            'last_timestamp': self.last_timestamp.isoformat() if self.last_timestamp is not None else None,
+            'prev_fast': self.prev_fast,
+            'prev_slow': self.prev_slow,
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: Dict) -> 'SMACrossoverStream':
+        stream = cls(state['ticker'], state['n_fast'], state['n_slow'])
+        closes = state['closes']
+        stream.slow = RunningSMA(stream.n_slow, closes)
+        stream.fast = RunningSMA(stream.n_fast, closes[-stream.n_fast:])
+        if state['last_timestamp'] is not None:
+            stream.last_timestamp = pd.Timestamp(state['last_timestamp'])
+        stream.prev_fast = state['prev_fast']
+        stream.prev_slow = state['prev_slow']
+        return stream
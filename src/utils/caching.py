@@ -0,0 +1,78 @@
+# src/utils/caching.py
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+from cachetools import Cache
+
+
+class LockedCache:
+    """
+    Thread-safe front for a cachetools cache (LRUCache, TTLCache, ...) with hit/miss counters.
+
+    None is never stored, so a None from `get` is always a miss. `get_or_compute` lets concurrent
+    callers of the same missing key wait for the first one instead of computing it again.
+    """
+
+    def __init__(self, cache: Cache):
+        self._cache = cache
+        self._pending: Dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._cache.maxsize
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._cache)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        if value is None:
+            return
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self), 'hits': self.hits, 'misses': self.misses}
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        while True:
+            with self._lock:
+                value = self._cache.get(key)
+                if value is not None:
+                    self.hits += 1
+                    return value
+                pending = self._pending.get(key)
+                owner = pending is None
+                if owner:
+                    self.misses += 1
+                    pending = self._pending[key] = threading.Event()
+            if owner:
+                break
+            # Someone else is computing it: wait, then read their result (or take over if they failed)
+            pending.wait()
+
+        try:
+            value = compute()
+            self.put(key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+
@@ -1,5 +1,8 @@
 # src/utils/date_helpers.py
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from config.settings import MARKET_SETTLED_TIME, MARKET_TIMEZONE
 
 def parse_date(date_str: str) -> datetime:
     return datetime.strptime(date_str, "%Y-%m-%d")
@@ -14,4 +17,45 @@ def validate_date_format(date_str: str) -> bool:
         datetime.strptime(date_str, "%Y-%m-%d")
         return True
     except ValueError:
-        return False
\ No newline at end of file
+        return False
+
+def merge_intervals(intervals: List[Tuple[date, date]]) -> List[Tuple[date, date]]:
+    """Merge overlapping or adjacent (next-day) closed date intervals"""
+    merged: List[Tuple[date, date]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def missing_intervals(start: date, end: date, covered: List[Tuple[date, date]]) -> List[Tuple[date, date]]:
+    """Closed date intervals inside [start, end] not covered by any of the `covered` intervals"""
+    gaps: List[Tuple[date, date]] = []
+    cursor = start
+    for cov_start, cov_end in merge_intervals(covered):
+        if cov_end < cursor:
+            continue
+        if cov_start > end:
+            break
+        if cov_start > cursor:
+            gaps.append((cursor, cov_start - timedelta(days=1)))
+        cursor = max(cursor, cov_end + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+def last_completed_session(now: Optional[datetime] = None) -> date:
+    """
+    Latest weekday whose session has settled on the exchange at `now` (default: the current time).
+    Exchange holidays are not known, so a holiday can be returned; fetching it once records it as covered.
+    """
+    market_now = (now or datetime.now(ZoneInfo(MARKET_TIMEZONE))).astimezone(ZoneInfo(MARKET_TIMEZONE))
+    day = market_now.date()
+    if market_now.time() < time.fromisoformat(MARKET_SETTLED_TIME):
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
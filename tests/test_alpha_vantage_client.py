@@ -0,0 +1,176 @@
+# tests/test_alpha_vantage_client.py
+import datetime as dt
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import pytest
+from src.api.alpha_vantage import AlphaVantageClient, TokenBucket, intraday_months
+
+
+def daily_payload(symbol: str) -> dict:
+    return {
+        "Meta Data": {"2. Symbol": symbol},
+        "Time Series (Daily)": {
+            "2024-01-03": {"1. open": "10.0", "2. high": "11.0", "3. low": "9.5", "4. close": "10.5", "5. volume": "1000"},
+            "2024-01-02": {"1. open": "9.0", "2. high": "10.0", "3. low": "8.5", "4. close": "9.5", "5. volume": "900"},
+        }
+    }
+
+
+def daily_csv() -> bytes:
+    return (b"timestamp,open,high,low,close,volume\r\n"
+            b"2024-01-03,10.0,11.0,9.5,10.5,1000\r\n"
+            b"2024-01-02,9.0,10.0,8.5,9.5,900\r\n")
+
+
+def intraday_csv(month: str) -> bytes:
+    return (f"timestamp,open,high,low,close,volume\r\n"
+            f"{month}-02 09:31:00,10.1,10.2,10.0,10.15,300\r\n"
+            f"{month}-02 09:30:00,10.0,10.1,9.9,10.05,500\r\n").encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Local Alpha Vantage stand-in: FAIL* symbols error once, SLOW answers late, NOTE* hits the quota once,
+    JSON* ignore datatype=csv; intraday requests get two bars of their month
+    """
+    calls = {}
+    months = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        symbol = query["symbol"][0]
+        with self.lock:
+            self.calls[symbol] = self.calls.get(symbol, 0) + 1
+            attempt = self.calls[symbol]
+        if query["function"] == ["TIME_SERIES_INTRADAY"]:
+            month = query["month"][0]
+            with self.lock:
+                self.months.append((query["interval"][0], month))
+            if month.endswith("-13"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            payload = intraday_csv(month)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        if symbol == "SLOW":
+            time.sleep(0.3)
+        if symbol.startswith("FAIL") and attempt == 1:
+            self.send_response(503)
+            self.end_headers()
+            return
+        if symbol.startswith("NOTE") and attempt == 1:
+            body = {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute."}
+        elif symbol == "BAD":
+            body = {"Error Message": "Invalid API call."}
+        elif query.get("datatype") == ["csv"] and not symbol.startswith("JSON"):
+            body = None
+        else:
+            body = daily_payload(symbol)
+        payload = daily_csv() if body is None else json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json" if body is not None else "application/x-download")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StubHandler.calls = {}
+    StubHandler.months = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/query"
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(url: str, **kwargs) -> AlphaVantageClient:
+    options = dict(api_key="demo", base_url=url, requests_per_minute=6000, max_workers=4,
+                   timeout=5, max_retries=2, backoff=0.01, burst=10)
+    options.update(kwargs)
+    return AlphaVantageClient(**options)
+
+
+@pytest.mark.parametrize("symbol", ["AAPL", "JSONONLY"])
+def test_fetch_parses_ohlc_layout(stub_url, symbol):
+    with make_client(stub_url) as client:
+        df = client.fetch({"ticker": symbol, "timeframe": "daily"})
+    assert list(df.columns) == ['ticker', 'bar_date', 'bar_time', 'timeframe', 'open_price', 'high_price',
+                                'low_price', 'close_price', 'volume']
+    assert df['bar_date'].tolist() == [dt.date(2024, 1, 2), dt.date(2024, 1, 3)]
+    assert df['close_price'].tolist() == [9.5, 10.5]
+    assert df['volume'].dtype == np.int64
+    assert set(df['ticker']) == {symbol}
+
+
+@pytest.mark.parametrize("symbol", ["AAPL", "JSONONLY"])
+def test_fetch_arrays_are_typed_and_ascending(stub_url, symbol):
+    with make_client(stub_url) as client:
+        arrays = client.fetch_arrays({"ticker": symbol, "timeframe": "daily"})
+    assert arrays.timestamp.dtype == np.dtype('datetime64[ns]')
+    assert np.all(np.diff(arrays.timestamp) > np.timedelta64(0))
+    assert arrays.open_price.dtype == np.float64
+    assert arrays.volume.dtype == np.int64
+    assert arrays.open_price.tolist() == [9.0, 10.0]
+
+
+def test_fetch_many_yields_every_ticker_in_completion_order(stub_url):
+    tickers = ["SLOW", "AAPL", "MSFT", "FAIL1", "NOTE1", "BAD"]
+    with make_client(stub_url) as client:
+        results = list(client.fetch_many(tickers))
+    order = [ticker for ticker, _ in results]
+    frames = dict(results)
+    assert sorted(order) == sorted(tickers)
+    assert order[-1] == "SLOW"
+    assert frames["BAD"].empty
+    for ticker in ["AAPL", "MSFT", "FAIL1", "NOTE1", "SLOW"]:
+        assert len(frames[ticker]) == 2
+    # Transient failures and quota notices were retried exactly once
+    assert StubHandler.calls["FAIL1"] == 2
+    assert StubHandler.calls["NOTE1"] == 2
+    assert StubHandler.calls["BAD"] == 1
+
+
+def test_intraday_months_are_yielded_in_order_with_bar_times(stub_url):
+    months = ["2023-11", "2023-12", "2023-13", "2024-01", "2024-02"]
+    with make_client(stub_url, max_workers=2) as client:
+        slices = list(client.fetch_intraday("AAPL", "1min", months))
+    assert [month for month, _ in slices] == months
+    assert slices[2][1] is None
+    arrays = slices[3][1]
+    assert arrays.timeframe == "1min"
+    assert np.array_equal(arrays.timestamp, np.array(["2024-01-02T09:30", "2024-01-02T09:31"], dtype="datetime64[ns]"))
+    assert sorted(StubHandler.months) == [("1min", month) for month in months]
+
+
+def test_intraday_month_slices_cover_the_range():
+    assert intraday_months(dt.date(2023, 11, 15), dt.date(2024, 2, 1)) == ["2023-11", "2023-12", "2024-01", "2024-02"]
+
+
+def test_rate_limit_bounds_throughput(stub_url):
+    # 1200/min = one request per 50 ms after the first; 6 requests need at least ~250 ms
+    with make_client(stub_url, requests_per_minute=1200, burst=1) as client:
+        started = time.monotonic()
+        results = list(client.fetch_many([f"T{i}" for i in range(6)]))
+        elapsed = time.monotonic() - started
+    assert len(results) == 6
+    assert elapsed >= 0.24
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
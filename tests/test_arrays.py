@@ -0,0 +1,89 @@
+# tests/test_arrays.py
+import numpy as np
+import pandas as pd
+import pytest
+from src.database.arrays import OHLC_ARRAY_COLUMNS, OHLCArrays, PriceMatrix, fill_columns
+from tests.test_fast_engine import random_walk
+from tests.test_ohlc_cache import minute_chunks
+
+
+class Allocations:
+    """np.empty allocator that remembers what it was asked for"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, name, dtype, n_rows):
+        self.calls.append((name, dtype, n_rows))
+        return np.empty(n_rows, dtype=dtype)
+
+
+def test_fill_columns_allocates_each_column_once_with_its_dtype():
+    allocate = Allocations()
+    columns = fill_columns(allocate, 10, np.int64, minute_chunks(10, 4))
+
+    assert [name for name, _, _ in allocate.calls] == OHLC_ARRAY_COLUMNS
+    assert all(n_rows == 10 for _, _, n_rows in allocate.calls)
+    assert columns['timestamp'].dtype == np.dtype('datetime64[ns]')
+    assert columns['close_price'].dtype == np.float64 and columns['volume'].dtype == np.int64
+    expected = np.concatenate([chunk['timestamp'] for chunk in minute_chunks(10, 4)])
+    np.testing.assert_array_equal(columns['timestamp'], expected)
+    np.testing.assert_array_equal(columns['volume'], np.arange(10) * 10)
+
+
+def test_fill_columns_keeps_missing_volumes_as_nan():
+    chunks = list(minute_chunks(6, 3))
+    chunks[1]['volume'] = np.array([1.0, np.nan, 3.0])
+    columns = fill_columns(Allocations(), 6, np.float64, chunks)
+    assert np.isnan(columns['volume'][4])
+
+
+def test_fill_columns_skips_empty_chunks_and_accepts_an_empty_stream():
+    chunks = list(minute_chunks(6, 3))
+    empty = {name: values[:0] for name, values in chunks[0].items()}
+    columns = fill_columns(Allocations(), 6, np.int64, [empty, chunks[0], empty, chunks[1]])
+    np.testing.assert_array_equal(columns['open_price'], np.arange(6))
+    assert all(len(values) == 0 for values in fill_columns(Allocations(), 0, np.int64, []).values())
+
+
+def test_fill_columns_stops_before_writing_past_the_allocation():
+    written = []
+
+    def chunks():
+        for chunk in minute_chunks(12, 4):
+            written.append(len(chunk['timestamp']))
+            yield chunk
+
+    with pytest.raises(ValueError, match="more than the 6 rows"):
+        fill_columns(Allocations(), 6, np.int64, chunks())
+    assert written == [4, 4]
+
+
+def test_price_matrix_aligns_tickers_on_the_union_of_timestamps():
+    long = pd.DataFrame({
+        'ticker': ['MSFT', 'AAPL', 'AAPL', 'MSFT', 'AAPL'],
+        'timestamp': pd.to_datetime(['2024-01-03', '2024-01-03', '2024-01-02', '2024-01-04', '2024-01-04']),
+        'open_price': [10.0, 1.0, 0.5, 11.0, 1.5],
+        'close_price': [10.5, 1.2, 0.7, 11.5, 1.7],
+    })
+    matrix = PriceMatrix.from_long(long, ['AAPL', 'GOOG', 'MSFT', 'AAPL'])
+
+    # Requested order, duplicates collapsed, tickers without rows dropped
+    assert matrix.tickers == ['AAPL', 'MSFT']
+    np.testing.assert_array_equal(matrix.timestamp, pd.to_datetime(['2024-01-02', '2024-01-03', '2024-01-04']))
+    np.testing.assert_array_equal(matrix.open, [[0.5, np.nan], [1.0, 10.0], [1.5, 11.0]])
+    np.testing.assert_array_equal(matrix.close, [[0.7, np.nan], [1.2, 10.5], [1.7, 11.5]])
+
+
+def test_ohlc_arrays_round_trip_through_the_table_layout():
+    data = random_walk(50, 0)
+    arrays = OHLCArrays.from_frame(data, 'TEST', 'daily')
+    assert arrays.n_bars == 50 and arrays.volume.dtype == np.int64
+
+    table = arrays.to_table_frame()
+    pd.testing.assert_frame_equal(table[data.columns], data, check_dtype=False)
+
+    typed = arrays.to_frame()
+    assert typed.attrs == {'ticker': 'TEST', 'timeframe': 'daily'}
+    assert typed.index[0] == pd.Timestamp(data['bar_date'].iloc[0])
+    assert np.shares_memory(typed['close_price'].to_numpy(), arrays.close_price)
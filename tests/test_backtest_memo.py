@@ -0,0 +1,83 @@
+# tests/test_backtest_memo.py
+import numpy as np
+import pytest
+from src.backtesting import two_sma
+from src.backtesting.memo import BacktestMemo, data_fingerprint
+from src.backtesting.two_sma import prepare_backtest_data, run_two_sma_backtest
+from tests.test_fast_engine import make_ohlc
+
+
+class RecordingDatabase:
+    """In-memory stand-in for the DatabaseOperations methods the memoized path uses"""
+
+    def __init__(self):
+        self.saved = {}
+        self.robustness = {}
+
+    def get_cached_backtest(self, cache_key):
+        return self.saved.get(cache_key)
+
+    def save_cached_backtest(self, cache_key, fingerprint, summary_data, trades_data, equity_curve=None):
+        test_id = len(self.saved) + 1
+        self.saved[cache_key] = (test_id, summary_data, trades_data, equity_curve)
+        return test_id
+
+    def save_robustness(self, test_id, intervals):
+        self.robustness[test_id] = intervals
+
+    def get_robustness(self, test_id):
+        return self.robustness.get(test_id)
+
+
+@pytest.fixture(autouse=True)
+def fresh_memo(monkeypatch):
+    monkeypatch.setattr(two_sma, '_memo', BacktestMemo())
+
+
+def prices(seed=0, n=300):
+    rng = np.random.default_rng(seed)
+    return make_ohlc(100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))), seed)
+
+
+def test_repeat_run_is_served_from_memory_without_writing():
+    db = RecordingDatabase()
+    first = run_two_sma_backtest(prices(), db, 'TEST')
+    second = run_two_sma_backtest(prices(), db, 'TEST')
+    assert len(db.saved) == 1
+    assert second is first
+    assert two_sma._memo.hits == 1
+
+
+def test_new_process_reuses_stored_result(monkeypatch):
+    db = RecordingDatabase()
+    computed = run_two_sma_backtest(prices(), db, 'TEST')
+    monkeypatch.setattr(two_sma, '_memo', BacktestMemo())
+
+    restored = run_two_sma_backtest(prices(), db, 'TEST')
+    assert len(db.saved) == 1
+    assert restored['Return [%]'] == computed['Return [%]']
+    assert restored['# Trades'] == computed['# Trades']
+    assert len(restored['_trades']) == len(computed['_trades'])
+    assert restored['_equity_curve']['Equity'].equals(computed['_equity_curve']['Equity'])
+    assert restored['_robustness'].equals(computed['_robustness'])
+
+
+@pytest.mark.parametrize("change", [
+    dict(data_seed=1),
+    dict(n_fast=5),
+    dict(ticker='OTHER'),
+])
+def test_different_inputs_are_recomputed(change):
+    db = RecordingDatabase()
+    run_two_sma_backtest(prices(), db, 'TEST')
+    run_two_sma_backtest(prices(change.get('data_seed', 0)), db, change.get('ticker', 'TEST'),
+                         n_fast=change.get('n_fast', 10))
+    assert len(db.saved) == 2
+
+
+def test_fingerprint_depends_on_values_not_identity():
+    data = prices()
+    assert data_fingerprint(prepare_backtest_data(data)) == data_fingerprint(prepare_backtest_data(data.copy()))
+    bumped = data.copy()
+    bumped.loc[150, 'close_price'] += 0.01
+    assert data_fingerprint(prepare_backtest_data(data)) != data_fingerprint(prepare_backtest_data(bumped))
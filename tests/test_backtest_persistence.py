@@ -0,0 +1,67 @@
+# tests/test_backtest_persistence.py
+import csv
+import io
+import numpy as np
+import pandas as pd
+from src.backtesting.two_sma import compute_two_sma_backtest
+from src.database.codec import decode_equity_curve, encode_equity_curve
+from src.database.operations import DatabaseOperations
+from tests.test_fast_engine import random_walk
+
+
+class CopyCursor:
+    """Records the statements and COPY payloads the batch writer sends"""
+
+    def __init__(self, first_id=100):
+        self.first_id = first_id
+        self.copies = {}
+        self.round_trips = 0
+
+    def execute(self, sql, params=None):
+        self.round_trips += 1
+        self.n_ids = params[0]
+
+    def fetchall(self):
+        return [(self.first_id + i,) for i in range(self.n_ids)]
+
+    def copy_expert(self, sql, buffer):
+        self.round_trips += 1
+        table = sql.split()[1]
+        columns = sql[sql.index('(') + 1:sql.index(')')].split(', ')
+        self.copies[table] = [dict(zip(columns, row)) for row in csv.reader(io.StringIO(buffer.read()))]
+
+
+def test_equity_curve_round_trip_is_exact_and_compact():
+    equity = pd.Series(10000 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, 2500))),
+                       index=pd.bdate_range('2015-01-01', periods=2500))
+    blob = encode_equity_curve(equity)
+    decoded = decode_equity_curve(blob)
+    assert decoded.index.equals(equity.index)
+    assert np.array_equal(decoded.to_numpy(), equity.to_numpy())
+    assert len(blob) < 2500 * 16 * 0.6
+
+
+def test_batch_writer_copies_every_table_in_few_round_trips():
+    results, curves = [], []
+    for seed in range(3):
+        result, summary, details = compute_two_sma_backtest(random_walk(500, seed), f'T{seed}')
+        results.append((summary, details))
+        curves.append(result['_equity_curve']['Equity'])
+
+    cursor = CopyCursor()
+    test_ids = DatabaseOperations._copy_backtests(cursor, results, curves)
+
+    assert test_ids == [100, 101, 102]
+    assert cursor.round_trips == 4  # reserve ids + one COPY per table
+    summaries = cursor.copies['backtest_summary']
+    assert [row['test_id'] for row in summaries] == ['100', '101', '102']
+    assert all('NaT' not in row.values() and 'inf' not in row.values() for row in summaries)
+
+    details = cursor.copies['backtest_details']
+    assert len(details) == sum(len(trades) for _, trades in results)
+    assert all(row['equity_after_trade'] for row in details)
+
+    equity_rows = cursor.copies['backtest_equity']
+    blob = bytes.fromhex(equity_rows[1]['equity_curve'][2:])
+    assert decode_equity_curve(blob).equals(curves[1].rename('Equity'))
+    assert int(equity_rows[1]['n_points']) == len(curves[1])
@@ -0,0 +1,93 @@
+# tests/test_batch.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from src.backtesting import batch
+from tests.test_fast_engine import random_walk
+
+
+class WorkerDatabase:
+    """What each worker builds its fetcher on: it must never be written to"""
+
+    def save_backtest_results(self, *args, **kwargs):
+        raise AssertionError("workers must leave persistence to the parent process")
+
+
+class FakeFetcher:
+    """Serves a random walk per ticker, nothing for EMPTY and an error for BOOM"""
+    queries = []
+    workers = []
+
+    def __init__(self, db_ops):
+        assert isinstance(db_ops, WorkerDatabase)
+        FakeFetcher.workers.append(threading.get_ident())
+
+    def fetch_data(self, query_params):
+        FakeFetcher.queries.append(query_params)
+        ticker = query_params['ticker']
+        if ticker == 'BOOM':
+            raise ConnectionError("provider unreachable")
+        if ticker == 'EMPTY':
+            return pd.DataFrame()
+        return random_walk(300, sum(map(ord, ticker)))
+
+
+class ParentDatabase:
+    """Single writer: records every batch it is asked to save and hands out test_ids in order"""
+
+    def __init__(self):
+        self.batches = []
+        self.next_id = 1
+
+    def save_backtest_results(self, results, equity_curves):
+        assert len(results) == len(equity_curves)
+        assert all(isinstance(curve, pd.Series) for curve in equity_curves)
+        self.batches.append([summary['ticker'] for summary, _ in results])
+        ids = list(range(self.next_id, self.next_id + len(results)))
+        self.next_id += len(results)
+        return ids
+
+
+def run(monkeypatch, tickers, batch_size):
+    FakeFetcher.queries, FakeFetcher.workers = [], []
+    monkeypatch.setattr(batch, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(batch, 'DataFetcher', FakeFetcher)
+    monkeypatch.setattr(batch, 'DatabaseOperations', WorkerDatabase)
+    db_ops = ParentDatabase()
+    test_ids = batch.run_universe_backtests(tickers, '2020-01-01', '2021-03-01', db_ops=db_ops,
+                                            max_workers=2, batch_size=batch_size)
+    return test_ids, db_ops
+
+
+def test_every_ticker_is_fetched_once_with_the_shared_query(monkeypatch):
+    run(monkeypatch, ['aapl', 'MSFT', 'AAPL', 'goog'], batch_size=10)
+
+    assert sorted(query['ticker'] for query in FakeFetcher.queries) == ['AAPL', 'GOOG', 'MSFT']
+    assert all(query['start_date'] == '2020-01-01' and query['end_date'] == '2021-03-01'
+               and query['timeframe'] == 'daily' for query in FakeFetcher.queries)
+    # The initializer builds one fetcher per worker, not one per ticker
+    assert 1 <= len(FakeFetcher.workers) <= 2
+
+
+def test_parent_saves_successful_results_in_batches(monkeypatch):
+    tickers = ['AAPL', 'MSFT', 'EMPTY', 'GOOG', 'BOOM', 'AMZN', 'META']
+    test_ids, db_ops = run(monkeypatch, tickers, batch_size=2)
+
+    assert [len(saved) for saved in db_ops.batches] == [2, 2, 1]
+    saved = [ticker for saved_batch in db_ops.batches for ticker in saved_batch]
+    assert sorted(saved) == ['AAPL', 'AMZN', 'GOOG', 'META', 'MSFT']
+    # test_ids follow the order the parent saved the results in
+    assert {ticker: test_ids[ticker] for ticker in saved} == {ticker: i + 1 for i, ticker in enumerate(saved)}
+    assert test_ids['EMPTY'] is None and test_ids['BOOM'] is None
+    assert set(test_ids) == set(tickers)
+
+
+def test_worker_reports_errors_instead_of_raising(monkeypatch):
+    monkeypatch.setattr(batch, '_worker_fetcher', FakeFetcher(WorkerDatabase()))
+    failed = batch._backtest_ticker({'ticker': 'BOOM'}, 10, 20)
+    assert failed == {'ticker': 'BOOM', 'error': 'provider unreachable'}
+
+    result = batch._backtest_ticker({'ticker': 'AAPL'}, 10, 20)
+    assert result['summary']['ticker'] == 'AAPL'
+    assert result['summary']['strategy_name'] == 'TwoSMA(10,20)'
+    assert len(result['equity']) == 300
@@ -0,0 +1,24 @@
+# tests/test_caching.py
+from cachetools import LRUCache
+from src.utils.caching import LockedCache
+
+
+def test_lru_front_counts_hits_and_evicts_the_least_recent():
+    cache = LockedCache(LRUCache(2))
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.stats() == {'entries': 2, 'hits': 1, 'misses': 1}
+    cache.clear()
+    assert cache.stats() == {'entries': 0, 'hits': 0, 'misses': 0}
+
+
+def test_none_is_never_stored_so_failed_computations_are_retried():
+    cache = LockedCache(LRUCache(4))
+    calls = []
+    assert cache.get_or_compute('key', lambda: calls.append(1)) is None
+    assert cache.get_or_compute('key', lambda: 'value') == 'value'
+    assert cache.get_or_compute('key', lambda: calls.append(1)) == 'value'
+    assert len(calls) == 1 and len(cache) == 1
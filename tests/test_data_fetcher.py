@@ -0,0 +1,83 @@
+# tests/test_data_fetcher.py
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+import pandas as pd
+import pytest
+from src.agents import data_fetcher
+from src.agents.data_fetcher import DataFetcher
+from src.utils.data_helpers import last_completed_session, merge_intervals, missing_intervals
+
+NEW_YORK = ZoneInfo('America/New_York')
+
+
+def test_adjacent_and_overlapping_intervals_merge():
+    assert merge_intervals([(date(2024, 3, 1), date(2024, 3, 10)), (date(2024, 1, 1), date(2024, 1, 31)),
+                            (date(2024, 2, 1), date(2024, 2, 5)), (date(2024, 3, 5), date(2024, 3, 20))]) == [
+        (date(2024, 1, 1), date(2024, 2, 5)), (date(2024, 3, 1), date(2024, 3, 20))
+    ]
+
+
+def test_missing_intervals_are_the_holes_inside_the_range():
+    covered = [(date(2024, 1, 10), date(2024, 1, 20)), (date(2024, 2, 1), date(2024, 2, 10))]
+    assert missing_intervals(date(2024, 1, 1), date(2024, 2, 15), covered) == [
+        (date(2024, 1, 1), date(2024, 1, 9)), (date(2024, 1, 21), date(2024, 1, 31)),
+        (date(2024, 2, 11), date(2024, 2, 15))
+    ]
+    assert missing_intervals(date(2024, 1, 12), date(2024, 1, 18), covered) == []
+    assert missing_intervals(date(2024, 1, 5), date(2024, 1, 4), []) == []
+
+
+@pytest.mark.parametrize("now, expected", [
+    (datetime(2024, 6, 5, 19, 0, tzinfo=NEW_YORK), date(2024, 6, 5)),   # Wednesday evening
+    (datetime(2024, 6, 5, 11, 0, tzinfo=NEW_YORK), date(2024, 6, 4)),   # Wednesday before the close
+    (datetime(2024, 6, 8, 12, 0, tzinfo=NEW_YORK), date(2024, 6, 7)),   # Saturday
+    (datetime(2024, 6, 10, 9, 0, tzinfo=NEW_YORK), date(2024, 6, 7)),   # Monday morning
+    (datetime(2024, 6, 6, 0, 30, tzinfo=ZoneInfo('UTC')), date(2024, 6, 5)),  # Wednesday 20:30 in New York
+])
+def test_last_completed_session(now, expected):
+    assert last_completed_session(now) == expected
+
+
+class CoverageDatabase:
+    """Only the coverage bookkeeping DataFetcher relies on"""
+
+    def __init__(self):
+        self.coverage = []
+
+    def get_coverage(self, ticker, timeframe):
+        return merge_intervals(self.coverage)
+
+    def record_coverage(self, ticker, timeframe, start_date, end_date):
+        self.coverage = merge_intervals(self.coverage + [(start_date, end_date)])
+        return self.coverage
+
+    def save_stock_data(self, data):
+        pass
+
+    def get_stock_data(self, ticker, start_date, end_date, timeframe):
+        return pd.DataFrame({'bar_date': [date(2024, 6, 7)], 'close_price': [100.0]})
+
+
+class FakeHedge:
+    def provider_stats(self):
+        return {}
+
+
+def test_weekend_repeat_query_is_served_from_the_database(monkeypatch):
+    calls = []
+
+    def fetch_market_data(params):
+        calls.append(params)
+        return pd.DataFrame({'bar_date': pd.bdate_range('2023-06-01', '2024-06-07').date, 'close_price': 100.0})
+
+    monkeypatch.setattr(data_fetcher, 'fetch_market_data', fetch_market_data)
+    monkeypatch.setattr(data_fetcher, 'get_hedged_fetcher', FakeHedge)
+    # Saturday: Friday's session is the last one with final bars
+    monkeypatch.setattr(data_fetcher, 'last_completed_session', lambda: date(2024, 6, 7))
+    fetcher = DataFetcher(CoverageDatabase())
+    query = {'ticker': 'AAPL', 'start_date': '2023-06-08', 'end_date': '2024-06-08', 'timeframe': 'daily'}
+
+    assert fetcher.fetch_data(query) is not None
+    assert fetcher.fetch_data(query) is not None
+    assert len(calls) == 1
+    assert fetcher.db_ops.coverage == [(date(2023, 6, 1), date(2024, 6, 7))]
@@ -0,0 +1,57 @@
+# tests/test_downsampling.py
+import numpy as np
+import pytest
+from frontend.components.downsampling import METHODS, downsample_indices, lttb_indices, minmax_indices
+
+
+def reference_lttb(x, y, n_out):
+    """Textbook LTTB, one point at a time"""
+    n = len(x)
+    every = (n - 2) / (n_out - 2)
+    selected, a = [0], 0
+    for i in range(n_out - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((i + 2) * every) + 1, n)
+        if i == n_out - 3:
+            next_lo, next_hi = n - 1, n
+        avg_x, avg_y = np.mean(x[next_lo:next_hi]), np.mean(y[next_lo:next_hi])
+        areas = [abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a])) for j in range(lo, hi)]
+        a = lo + int(np.argmax(areas))
+        selected.append(a)
+    return np.array(selected + [n - 1])
+
+
+def random_series(n, seed=0):
+    return np.arange(n, dtype=np.float64) * 60, np.cumsum(np.random.default_rng(seed).normal(size=n))
+
+
+def test_lttb_matches_reference():
+    x, y = random_series(997, 1)
+    np.testing.assert_array_equal(lttb_indices(x, y, 50), reference_lttb(x, y, 50))
+
+
+def test_minmax_keeps_every_extreme_and_both_ends():
+    x, y = random_series(100_003, 2)
+    y[77_777] = 1e6
+    keep = minmax_indices(y, 400)
+    assert keep[0] == 0 and keep[-1] == len(y) - 1
+    assert 77_777 in keep and np.argmin(y) in keep
+    assert len(keep) <= 402
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_payload_does_not_grow_with_the_series(method):
+    sizes = []
+    for n in (10_000, 100_000, 1_000_000):
+        x, y = random_series(n, 3)
+        keep = downsample_indices(x, y, 800, method)
+        assert np.all(np.diff(keep) > 0)
+        sizes.append(len(keep))
+    assert max(sizes) <= 2 * 800 + 2
+
+
+def test_short_series_are_left_alone():
+    x, y = random_series(500)
+    np.testing.assert_array_equal(downsample_indices(x, y, 800), np.arange(500))
+    with pytest.raises(ValueError):
+        downsample_indices(x, y, 100, method='every_nth')
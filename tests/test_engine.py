@@ -0,0 +1,75 @@
+# tests/test_engine.py
+import threading
+import pytest
+import sqlalchemy
+from sqlalchemy.pool import QueuePool
+from config import settings
+from src.database import engine
+
+
+@pytest.fixture
+def created(monkeypatch):
+    """Replaces the PostgreSQL engine with pooled SQLite ones and records how each was configured"""
+    engines = []
+
+    def create_engine(url, **kwargs):
+        pooled = sqlalchemy.create_engine('sqlite://', poolclass=QueuePool, pool_size=kwargs['pool_size'],
+                                          max_overflow=kwargs['max_overflow'])
+        engines.append((url, kwargs, pooled))
+        return pooled
+
+    monkeypatch.setattr(engine, 'create_engine', create_engine)
+    monkeypatch.setattr(engine, '_engine', None)
+    monkeypatch.setattr(engine, '_engine_pid', None)
+    return engines
+
+
+def test_engine_is_created_once_with_the_configured_pool(created):
+    first = engine.get_engine()
+    assert engine.get_engine() is first
+    assert len(created) == 1
+    url, kwargs, _ = created[0]
+    assert url == settings.DATABASE_URL
+    assert kwargs == {
+        'client_encoding': 'utf8',
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+    }
+
+
+def test_concurrent_first_use_shares_one_engine(created):
+    engines = []
+    threads = [threading.Thread(target=lambda: engines.append(engine.get_engine())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert all(shared is engines[0] for shared in engines)
+
+
+def test_forked_child_gets_its_own_engine_without_closing_the_parents(created, monkeypatch):
+    parent = engine.get_engine()
+    disposed = []
+    monkeypatch.setattr(parent, 'dispose', lambda close=True: disposed.append(close))
+    monkeypatch.setattr(engine.os, 'getpid', lambda: -1)
+
+    child = engine.get_engine()
+
+    assert child is not parent
+    assert disposed == [False]
+    assert engine.get_engine() is child
+
+
+def test_pool_stats_count_checked_out_connections(created):
+    assert engine.pool_stats() == {}
+    shared = engine.get_engine()
+    with shared.connect():
+        stats = engine.pool_stats()
+    assert stats['pool_size'] == settings.DB_POOL_SIZE
+    assert stats['checked_out'] == 1
+    assert engine.pool_stats()['checked_out'] == 0
+    assert engine.pool_stats()['checked_in'] == 1
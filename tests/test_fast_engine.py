@@ -0,0 +1,107 @@
+# tests/test_fast_engine.py
+import datetime as dt
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from backtesting import Backtest
+from src.backtesting.fast_engine import run_fast_two_sma
+from src.backtesting.two_sma import (
+    TwoSMA, BACKTEST_CASH, BACKTEST_COMMISSION, prepare_backtest_data,
+    build_summary_data, build_detail_records
+)
+
+
+def make_ohlc(close: np.ndarray, seed: int = 0) -> pd.DataFrame:
+    """Synthetic rows in the ohlc_data layout returned by DatabaseOperations.get_stock_data"""
+    rng = np.random.default_rng(seed)
+    open_ = close * np.exp(rng.normal(0, 0.004, len(close)))
+    return pd.DataFrame({
+        'ticker': 'TEST',
+        'bar_date': pd.bdate_range('2020-01-01', periods=len(close)).date,
+        'bar_time': dt.time(0, 0),
+        'timeframe': 'daily',
+        'open_price': open_,
+        'high_price': np.maximum(open_, close) * 1.005,
+        'low_price': np.minimum(open_, close) * 0.995,
+        'close_price': close,
+        'volume': rng.integers(100_000, 1_000_000, len(close)),
+    })
+
+
+def random_walk(n_bars: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return make_ohlc(100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, n_bars))), seed)
+
+
+def run_both(data: pd.DataFrame, n_fast: int, n_slow: int):
+    bt_data = prepare_backtest_data(data)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = Backtest(bt_data, TwoSMA, cash=BACKTEST_CASH, commission=BACKTEST_COMMISSION).run(
+            n_fast=n_fast, n_slow=n_slow)
+    actual = run_fast_two_sma(bt_data, n_fast, n_slow, cash=BACKTEST_CASH, commission=BACKTEST_COMMISSION)
+    return expected, actual
+
+
+def assert_same_stats(expected: pd.Series, actual: pd.Series):
+    assert list(expected.index) == list(actual.index)
+    for key in expected.index:
+        if key.startswith('_'):
+            continue
+        a, b = expected[key], actual[key]
+        if isinstance(a, float) and not pd.isna(a):
+            assert b == pytest.approx(a, rel=1e-9), key
+        else:
+            assert (pd.isna(a) and pd.isna(b)) or a == b, key
+
+    pd.testing.assert_frame_equal(expected['_trades'].reset_index(drop=True), actual['_trades'], check_dtype=False)
+    pd.testing.assert_frame_equal(expected['_equity_curve'], actual['_equity_curve'], check_dtype=False)
+
+
+@pytest.mark.parametrize('seed', range(12))
+@pytest.mark.parametrize('n_fast,n_slow', [(10, 20), (3, 7), (5, 50), (2, 3)])
+def test_matches_backtesting_py_on_random_walks(seed, n_fast, n_slow):
+    expected, actual = run_both(random_walk(250 + 80 * seed, seed), n_fast, n_slow)
+    assert_same_stats(expected, actual)
+
+
+def test_matches_backtesting_py_without_trades():
+    expected, actual = run_both(random_walk(15, 1), 10, 20)
+    assert actual['# Trades'] == 0
+    assert_same_stats(expected, actual)
+
+
+def test_matches_backtesting_py_when_short_is_wiped_out():
+    # A slide into a death cross opens a full-size short, then a squeeze exhausts the equity
+    close = np.r_[np.linspace(100, 110, 40), np.linspace(110, 80, 20), np.linspace(80, 400, 15), np.full(20, 400.0)]
+    expected, actual = run_both(make_ohlc(close), 5, 10)
+    assert actual['Equity Final [$]'] == 0
+    assert_same_stats(expected, actual)
+
+
+def test_summary_and_details_match_backtesting_py():
+    expected, actual = run_both(random_walk(1258, 7), 10, 20)
+    expected_summary = build_summary_data(expected, 'TEST', 10, 20)
+    actual_summary = build_summary_data(actual, 'TEST', 10, 20)
+    for key, value in expected_summary.items():
+        if isinstance(value, float):
+            assert actual_summary[key] == pytest.approx(value, rel=1e-9, nan_ok=True), key
+        else:
+            assert actual_summary[key] == value, key
+    actual_details, expected_details = build_detail_records(actual), build_detail_records(expected)
+    # Equity is accumulated in a different order by the two engines: equal up to rounding
+    assert [d.pop('equity_after_trade') for d in actual_details] == pytest.approx(
+        [d.pop('equity_after_trade') for d in expected_details], rel=1e-12)
+    assert actual_details == expected_details
+
+
+def test_intraday_bars_keep_their_timestamps():
+    data = random_walk(780, 3)
+    minutes = pd.Timestamp('2024-03-04 09:30') + pd.to_timedelta(np.arange(780) % 390, unit='min') \
+        + pd.to_timedelta(np.arange(780) // 390, unit='D')
+    data['bar_date'], data['bar_time'], data['timeframe'] = minutes.date, minutes.time, '1min'
+    assert prepare_backtest_data(data).index.equals(pd.DatetimeIndex(minutes, name='timestamp'))
+    expected, actual = run_both(data, 10, 30)
+    assert actual['Duration'] == pd.Timedelta(days=1, hours=6, minutes=29)
+    assert_same_stats(expected, actual)
@@ -0,0 +1,72 @@
+# tests/test_indicators.py
+import numpy as np
+import pandas as pd
+import pytest
+from src.signals import indicators
+from src.signals.indicators import ema, macd, rolling_max, rolling_mean, rolling_min, rsi, sma, support_resistance
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(indicators, '_cache', indicators.IndicatorCache())
+
+
+def closes(n=2000, seed=0):
+    return 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, n)))
+
+
+@pytest.mark.parametrize("window", [1, 7, 50])
+def test_rolling_primitives_match_pandas(window):
+    values = closes()
+    values[300] = np.nan
+    series = pd.Series(values)
+    np.testing.assert_allclose(rolling_mean(values, window), series.rolling(window).mean(), rtol=1e-12)
+    np.testing.assert_array_equal(rolling_max(values, window), series.rolling(window).max())
+    np.testing.assert_array_equal(rolling_min(values, window), series.rolling(window).min())
+
+
+def test_ema_is_seeded_with_the_first_window_mean():
+    values = closes()
+    result = ema(values, 10)
+    assert np.isnan(result[:9]).all()
+    expected = pd.Series(np.r_[values[:10].mean(), values[10:]]).ewm(span=10, adjust=False).mean()
+    np.testing.assert_allclose(result[9:], expected, rtol=1e-12)
+
+
+def test_rsi_matches_wilder_smoothing():
+    values = closes()
+    change = pd.Series(values).diff()
+    gain = change.clip(lower=0).to_numpy()
+    loss = (-change).clip(lower=0).to_numpy()
+    avg_gain, avg_loss = gain[1:15].mean(), loss[1:15].mean()
+    for i in range(15, 40):
+        avg_gain = (avg_gain * 13 + gain[i]) / 14
+        avg_loss = (avg_loss * 13 + loss[i]) / 14
+    result = rsi(values, 14)
+    assert np.isnan(result[:14]).all()
+    assert result[39] == pytest.approx(100 - 100 / (1 + avg_gain / avg_loss), rel=1e-12)
+    assert rsi(np.arange(1.0, 50.0))[-1] == 100
+
+
+def test_macd_histogram_is_line_minus_signal():
+    result = macd(closes(), 12, 26, 9)
+    assert np.isnan(result['macd'][:25]).all() and not np.isnan(result['macd'][25])
+    assert np.isnan(result['signal'][:33]).all() and not np.isnan(result['signal'][33])
+    np.testing.assert_array_equal(result['histogram'], result['macd'] - result['signal'])
+
+
+def test_results_are_shared_per_series_indicator_and_params():
+    values = closes()
+    first = sma(values, 20)
+    assert sma(values.copy(), window=20) is first
+    assert sma(values, 21) is not first
+    assert indicators.cache_stats() == {'entries': 2, 'hits': 1, 'misses': 2}
+    with pytest.raises(ValueError):
+        first[0] = 1.0
+
+
+def test_support_resistance_keys_on_both_series():
+    high, low = closes(seed=1) + 1, closes(seed=1) - 1
+    levels = support_resistance(high, low, 20)
+    assert (levels['support'][19:] <= levels['resistance'][19:]).all()
+    assert support_resistance(high, low - 0.5, 20) is not levels
@@ -0,0 +1,54 @@
+# tests/test_local_parser.py
+from datetime import date
+import pytest
+from src.agents.local_parser import LocalQueryParser
+from src.agents.query_cache import QueryCache, normalize_query
+
+TODAY = date(2026, 10, 14)  # a Wednesday
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Mostrar datos diarios de AAPL del último año", ("AAPL", "2025-10-14", "2026-10-14", "daily")),
+    ("Datos semanales de Tesla del mes pasado", ("TSLA", "2026-09-01", "2026-09-30", "weekly")),
+    ("monthly data for microsoft this year", ("MSFT", "2026-01-01", "2026-10-14", "monthly")),
+    ("NVDA últimos 6 meses", ("NVDA", "2026-04-14", "2026-10-14", "daily")),
+    ("GOOGL last week", ("GOOGL", "2026-10-05", "2026-10-11", "daily")),
+    ("MSFT 2023", ("MSFT", "2023-01-01", "2023-12-31", "daily")),
+    ("apple from 2024-03-01 to 2024-01-05", ("AAPL", "2024-01-05", "2024-03-01", "daily")),
+    ("Datos de AMZN", ("AMZN", None, None, "daily")),
+    ("barras de 5 minutos de AAPL last week", ("AAPL", "2026-10-05", "2026-10-11", "5min")),
+    ("hourly TSLA data 2023", ("TSLA", "2023-01-01", "2023-12-31", "60min")),
+])
+def test_local_parser_resolves_common_queries(query, expected):
+    result = LocalQueryParser().parse(query, TODAY)
+    assert (result["ticker"], result["start_date"], result["end_date"], result["timeframe"]) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "AAPL vs MSFT",  # two tickers
+    "Datos mensuales de NVDA desde 2020",  # open range the local parser does not know
+    "Muestra los datos de META de marzo",  # month name
+    "cómo va el mercado",  # no ticker
+])
+def test_local_parser_defers_to_llm(query):
+    assert LocalQueryParser().parse(query, TODAY) is None
+
+
+def test_cache_key_is_normalized_and_date_aware():
+    assert normalize_query("  Mostrar datos de AAPL del Último Año!") == "mostrar datos de aapl del ultimo ano"
+    cache = QueryCache()
+    cache.put("AAPL último año", {"ticker": "AAPL"}, today=TODAY)
+    assert cache.get("aapl ultimo  año", today=TODAY) == {"ticker": "AAPL"}
+    assert cache.get("AAPL último año", today=date(2026, 10, 15)) is None
+
+
+def test_cache_expires_and_evicts_least_recently_used():
+    now = [0.0]
+    cache = QueryCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", {"ticker": "A"}, today=TODAY)
+    cache.put("b", {"ticker": "B"}, today=TODAY)
+    assert cache.get("a", today=TODAY) == {"ticker": "A"}
+    cache.put("c", {"ticker": "C"}, today=TODAY)
+    assert cache.get("b", today=TODAY) is None
+    now[0] = 11
+    assert cache.get("a", today=TODAY) is None
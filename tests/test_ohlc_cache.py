@@ -0,0 +1,79 @@
+# tests/test_ohlc_cache.py
+import numpy as np
+import pandas as pd
+import pytest
+from src.database.arrays import OHLC_ARRAY_COLUMNS, fill_columns
+from src.database.cache import OHLCCache
+
+
+def minute_chunks(n_bars: int, chunk_rows: int):
+    timestamp = pd.date_range('2024-01-02 09:30', periods=n_bars, freq='min').to_numpy()
+    close = np.arange(n_bars, dtype=np.float64)
+    for start in range(0, n_bars, chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        yield {'timestamp': timestamp[rows], 'open_price': close[rows], 'high_price': close[rows] + 1,
+               'low_price': close[rows] - 1, 'close_price': close[rows], 'volume': close[rows] * 10}
+
+
+def test_streamed_series_is_written_chunk_by_chunk_and_sliced_from_disk(tmp_path):
+    cache = OHLCCache(str(tmp_path))
+    cache.store_chunks('AAPL', '1min', 25_000, np.int64, minute_chunks(25_000, 4_000))
+    columns = cache.load('AAPL', '1min')
+    assert set(columns) == set(OHLC_ARRAY_COLUMNS)
+    assert isinstance(columns['close_price'], np.memmap) and columns['volume'].dtype == np.int64
+    np.testing.assert_array_equal(columns['close_price'], np.arange(25_000))
+
+    window = cache.slice(columns, '2024-01-03', '2024-01-03')
+    assert len(window['timestamp']) == 1440
+    assert pd.Timestamp(window['timestamp'][0]) == pd.Timestamp('2024-01-03')
+
+
+def test_short_stream_leaves_no_generation_behind(tmp_path):
+    cache = OHLCCache(str(tmp_path))
+    with pytest.raises(ValueError):
+        cache.store_chunks('AAPL', '1min', 10_000, np.int64, minute_chunks(9_000, 4_000))
+    assert cache.load('AAPL', '1min') is None
+    assert not list((tmp_path / '1min' / 'AAPL').glob('gen-*'))
+
+
+def test_chunks_fill_preallocated_arrays():
+    columns = fill_columns(lambda name, dtype, size: np.empty(size, dtype=dtype), 10, np.float64, minute_chunks(10, 3))
+    np.testing.assert_array_equal(columns['high_price'], np.arange(10) + 1)
+    with pytest.raises(ValueError):
+        fill_columns(lambda name, dtype, size: np.empty(size, dtype=dtype), 5, np.float64, minute_chunks(10, 3))
+
+
+def test_invalidation_during_the_stream_discards_the_new_generation(tmp_path):
+    cache = OHLCCache(str(tmp_path))
+    cache.store_chunks('AAPL', '1min', 8_000, np.int64, minute_chunks(8_000, 4_000))
+
+    def chunks_read_before_a_write():
+        for number, chunk in enumerate(minute_chunks(10_000, 4_000)):
+            if number == 1:
+                # New bars are saved (and the cache invalidated) while the old snapshot is still streaming
+                cache.invalidate('AAPL', '1min')
+            yield chunk
+
+    assert cache.store_chunks('AAPL', '1min', 10_000, np.int64, chunks_read_before_a_write()) is False
+    assert cache.load('AAPL', '1min') is None
+    assert not list((tmp_path / '1min' / 'AAPL').glob('gen-*'))
+
+    # The next miss caches the series again
+    assert cache.store_chunks('AAPL', '1min', 10_000, np.int64, minute_chunks(10_000, 4_000)) is True
+    assert len(cache.load('AAPL', '1min')['timestamp']) == 10_000
+
+
+def test_invalidation_racing_the_publish_withdraws_it(tmp_path, monkeypatch):
+    cache = OHLCCache(str(tmp_path))
+    write_atomic = OHLCCache._write_atomic
+
+    def invalidated_just_before(series_dir, name, value):
+        if name == 'CURRENT':
+            monkeypatch.setattr(cache, '_write_atomic', write_atomic)
+            cache.invalidate('AAPL', '1min')
+        write_atomic(series_dir, name, value)
+
+    monkeypatch.setattr(cache, '_write_atomic', invalidated_just_before)
+    assert cache.store_chunks('AAPL', '1min', 5_000, np.int64, minute_chunks(5_000, 4_000)) is False
+    assert cache.load('AAPL', '1min') is None
+    assert not list((tmp_path / '1min' / 'AAPL').glob('gen-*'))
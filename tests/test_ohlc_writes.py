@@ -0,0 +1,270 @@
+# tests/test_ohlc_writes.py
+import csv
+import io
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.dialects import postgresql
+from src.database import operations
+from src.database.operations import DatabaseOperations
+from src.database.timeseries import LEGACY_LAYOUT, TIMESERIES_LAYOUT, to_layout_rows
+from tests.test_fast_engine import random_walk
+
+
+class FakeSession:
+    """Session the fundamental-data check runs in: no ticker is known yet"""
+
+    def __init__(self, added):
+        self.added = added
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def query(self, model):
+        return self
+
+    def filter_by(self, **kwargs):
+        return self
+
+    def first(self):
+        return None
+
+    def add(self, row):
+        self.added.append(row.ticker)
+
+    def commit(self):
+        pass
+
+
+class OHLCTable:
+    """In-memory stand-in for the OHLC table: key columns -> value columns, unique on the key"""
+
+    def __init__(self, layout, existing: pd.DataFrame = None):
+        self.layout = layout
+        self.rows = {}
+        if existing is not None:
+            for row in to_layout_rows(existing, layout).to_dict('records'):
+                self.insert(row)
+
+    def key(self, row):
+        # COPY payloads arrive as CSV text, so keys compare on normalized values
+        return tuple(str(pd.Timestamp(row[column])) if column == 'ts' else str(row[column])
+                     for column in self.layout.key_columns)
+
+    def insert(self, row) -> bool:
+        key = self.key(row)
+        if key in self.rows:
+            return False
+        self.rows[key] = row
+        return True
+
+    def update(self, row) -> bool:
+        """DO UPDATE ... WHERE any value IS DISTINCT FROM the stored one"""
+        stored = self.rows[self.key(row)]
+        if all(stored[column] == row[column] for column in operations.OHLC_VALUE_COLUMNS):
+            return False
+        stored.update(row)
+        return True
+
+
+class StagingCursor:
+    """Raw DBAPI cursor of the bulk path: records statements and applies the staged COPY on INSERT"""
+
+    def __init__(self, table: OHLCTable):
+        self.table = table
+        self.statements = []
+        self.staged = []
+        self.closed = False
+        self.rowcount = -1
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.statements.append(sql)
+        if sql.startswith('INSERT INTO'):
+            self.rowcount = sum(self.table.insert(row) for row in self.staged)
+
+    def copy_expert(self, sql, buffer):
+        self.statements.append(sql)
+        columns = sql[sql.index('(') + 1:sql.index(')')].split(', ')
+        self.staged = [dict(zip(columns, row)) for row in csv.reader(io.StringIO(buffer.read()))]
+
+    def close(self):
+        self.closed = True
+
+
+class RawConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+class FakeConnection:
+    """SQLAlchemy connection of an engine.begin() block over an OHLCTable"""
+
+    def __init__(self, table: OHLCTable):
+        self.table = table
+        self.raw_cursor = StagingCursor(table)
+        self.connection = RawConnection(self.raw_cursor)
+        self.statements = []
+
+    def execute(self, statement):
+        """Multi-row INSERT ... ON CONFLICT ... RETURNING xmax = 0: True per insert, False per update"""
+        compiled = statement.compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+        n_rows = len({name.rsplit('_m', 1)[1] for name in compiled.params})
+        records = [{column: compiled.params[f"{column}_m{i}"] for column in self.table.layout.columns}
+                   for i in range(n_rows)]
+        self.statements.append((sql, records))
+        written = []
+        for row in records:
+            if self.table.insert(row):
+                written.append(True)
+            elif 'DO UPDATE' in sql and self.table.update(row):
+                written.append(False)
+        return WrittenRows(written)
+
+
+class WrittenRows:
+    def __init__(self, values):
+        self.values = values
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.values
+
+
+class FakeEngine:
+    def __init__(self, connection):
+        self.connection = connection
+        self.transactions = 0
+
+    @contextmanager
+    def begin(self):
+        self.transactions += 1
+        yield self.connection
+
+
+class RecordingCache:
+    def __init__(self):
+        self.invalidated = []
+
+    def invalidate(self, ticker, timeframe):
+        self.invalidated.append((ticker, timeframe))
+
+
+def offline_operations(connection, layout=LEGACY_LAYOUT):
+    """DatabaseOperations wired to fakes instead of a PostgreSQL engine"""
+    ops = DatabaseOperations.__new__(DatabaseOperations)
+    ops.fundamentals = []
+    ops.engine = FakeEngine(connection)
+    ops.Session = lambda: FakeSession(ops.fundamentals)
+    ops.cache = RecordingCache()
+    ops.layout = layout
+    return ops
+
+
+@pytest.fixture
+def partitions(monkeypatch):
+    created = []
+    monkeypatch.setattr(operations, 'ensure_partitions', lambda conn, first, last: created.append((first, last)))
+    return created
+
+
+@pytest.mark.parametrize("layout", [LEGACY_LAYOUT, TIMESERIES_LAYOUT], ids=['legacy', 'timeseries'])
+def test_bulk_load_copies_through_a_staging_table(layout, partitions):
+    data = random_walk(50, 0)
+    connection = FakeConnection(OHLCTable(layout, existing=data.iloc[:20]))
+    ops = offline_operations(connection, layout)
+
+    stats = ops.bulk_load_stock_data(data)
+
+    assert stats == {'inserted': 30, 'updated': 0, 'skipped': 20}
+    columns = ', '.join(layout.columns)
+    create, copy, insert = connection.raw_cursor.statements
+    assert create == (f"CREATE TEMP TABLE ohlc_staging ON COMMIT DROP AS "
+                      f"SELECT {columns} FROM {layout.table} WITH NO DATA")
+    assert copy == f"COPY ohlc_staging ({columns}) FROM STDIN WITH (FORMAT csv)"
+    assert insert == (f"INSERT INTO {layout.table} ({columns}) SELECT {columns} FROM ohlc_staging "
+                      f"ON CONFLICT ({', '.join(layout.key_columns)}) DO NOTHING")
+    # Every row is staged in the table's own layout; the database decides which already exist
+    assert len(connection.raw_cursor.staged) == 50
+    staged_close = [float(row['close_price']) for row in connection.raw_cursor.staged]
+    np.testing.assert_allclose(staged_close, data['close_price'], rtol=1e-15)
+    assert connection.raw_cursor.closed
+    assert ops.engine.transactions == 1
+    assert ops.fundamentals == ['TEST']
+    assert ops.cache.invalidated == [('TEST', 'daily')]
+    assert partitions == ([] if layout is LEGACY_LAYOUT else [(data['bar_date'].min(), data['bar_date'].max())])
+
+
+def test_bulk_load_of_known_rows_skips_them_all_and_keeps_the_cache(partitions):
+    data = random_walk(50, 1)
+    connection = FakeConnection(OHLCTable(LEGACY_LAYOUT, existing=data))
+    ops = offline_operations(connection)
+
+    assert ops.bulk_load_stock_data(data) == {'inserted': 0, 'updated': 0, 'skipped': 50}
+    assert len(connection.table.rows) == 50
+    assert ops.cache.invalidated == []
+
+
+def test_upsert_splits_rows_into_chunks_and_counts_inserts_per_chunk(partitions):
+    data = random_walk(25, 2)
+    connection = FakeConnection(OHLCTable(LEGACY_LAYOUT, existing=data.iloc[:12]))
+    ops = offline_operations(connection)
+
+    chunk_stats = ops.upsert_stock_data(data, chunk_size=10)
+
+    assert chunk_stats == [
+        {'chunk': 1, 'rows': 10, 'inserted': 0, 'updated': 0, 'skipped': 10},
+        {'chunk': 2, 'rows': 10, 'inserted': 8, 'updated': 0, 'skipped': 2},
+        {'chunk': 3, 'rows': 5, 'inserted': 5, 'updated': 0, 'skipped': 0},
+    ]
+    assert [len(records) for _, records in connection.statements] == [10, 10, 5]
+    sql = connection.statements[0][0]
+    assert 'ON CONFLICT (ticker, bar_date, bar_time, timeframe) DO NOTHING' in sql
+    assert sql.endswith('RETURNING xmax = 0 AS inserted')
+    # All chunks share one transaction
+    assert ops.engine.transactions == 1
+    assert ops.cache.invalidated == [('TEST', 'daily')]
+
+
+def test_upsert_with_update_existing_tells_corrections_from_inserts(partitions):
+    data = random_walk(30, 3)
+    connection = FakeConnection(OHLCTable(LEGACY_LAYOUT, existing=data.iloc[:20]))
+    ops = offline_operations(connection)
+    corrected = data.copy()
+    corrected.loc[[4, 9, 15], 'close_price'] *= 1.01
+
+    chunk_stats = ops.upsert_stock_data(corrected, update_existing=True, chunk_size=1000)
+
+    assert chunk_stats == [{'chunk': 1, 'rows': 30, 'inserted': 10, 'updated': 3, 'skipped': 17}]
+    sql = connection.statements[0][0]
+    assert 'DO UPDATE SET open_price = excluded.open_price' in sql
+    assert 'ohlc_data.close_price IS DISTINCT FROM excluded.close_price' in sql
+    stored = connection.table.rows[connection.table.key(to_layout_rows(corrected, LEGACY_LAYOUT).iloc[9])]
+    assert stored['close_price'] == corrected.loc[9, 'close_price']
+
+
+def test_upsert_keeps_the_last_of_duplicate_keys_and_sends_nulls(partitions):
+    data = random_walk(10, 4)
+    data['volume'] = data['volume'].astype(float)
+    data.loc[3, 'volume'] = np.nan
+    retry = data.iloc[[7]].assign(close_price=data.loc[7, 'close_price'] + 1)
+    connection = FakeConnection(OHLCTable(LEGACY_LAYOUT))
+    ops = offline_operations(connection)
+
+    chunk_stats = ops.upsert_stock_data(pd.concat([data, retry]), update_existing=True)
+
+    assert chunk_stats[0]['rows'] == 10 and chunk_stats[0]['inserted'] == 10
+    records = connection.statements[0][1]
+    assert records[3]['volume'] is None
+    assert [record['close_price'] for record in records if record['bar_date'] == data.loc[7, 'bar_date']] \
+        == [data.loc[7, 'close_price'] + 1]
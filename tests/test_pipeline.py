@@ -0,0 +1,176 @@
+# tests/test_pipeline.py
+import threading
+import time
+from datetime import date
+import pytest
+from src.agents import data_fetcher
+from src.agents.data_fetcher import DataFetcher
+from src.agents.pipeline import STAGES, AnalysisPipeline, TTLCache
+from src.backtesting import two_sma
+from src.backtesting.memo import BacktestMemo
+from tests.test_backtest_memo import RecordingDatabase, prices
+
+
+class FakeParser:
+    def parse_query(self, query):
+        if 'AAPL' not in query:
+            return {'ticker': None, 'start_date': None, 'end_date': None, 'timeframe': 'daily'}
+        if 'hoy' in query:
+            return {'ticker': 'AAPL', 'start_date': None, 'end_date': None, 'timeframe': 'daily'}
+        return {'ticker': 'AAPL', 'start_date': '2024-01-01', 'end_date': '2024-12-31', 'timeframe': 'daily'}
+
+
+class CountingFetcher(DataFetcher):
+    """Real date resolution, canned bars"""
+
+    def __init__(self):
+        super().__init__(db_ops=None)
+        self.calls = 0
+
+    def fetch_data(self, parsed):
+        self.calls += 1
+        return prices()
+
+
+@pytest.fixture(autouse=True)
+def fresh_memo(monkeypatch):
+    monkeypatch.setattr(two_sma, '_memo', BacktestMemo())
+
+
+def make_pipeline(fetcher=None):
+    return AnalysisPipeline(FakeParser(), fetcher or CountingFetcher(), RecordingDatabase(), max_workers=2)
+
+
+def test_entries_expire_and_least_recent_is_evicted():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1
+    now[0] = 10
+    assert cache.get('a') is None and len(cache) == 0  # 'c' was stored at the same time
+
+
+def test_concurrent_misses_compute_once():
+    cache = TTLCache(maxsize=8, ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'value'
+
+    threads = [threading.Thread(target=cache.get_or_compute, args=('key', compute)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and cache.get('key') == 'value'
+
+
+def test_chart_stages_finish_while_the_backtest_is_still_running(monkeypatch):
+    pipeline = make_pipeline()
+    release = threading.Event()
+    slow_backtest = pipeline._backtest
+    monkeypatch.setattr(pipeline, '_backtest', lambda data, ticker: release.wait(5) and slow_backtest(data, ticker))
+
+    run = pipeline.submit('AAPL último año')
+    assert run.wait('indicators', timeout=5)
+    assert not run.done('backtest')
+    assert set(run.result('indicators')) == {'SMA_10', 'SMA_20'}
+
+    release.set()
+    assert run.wait('backtest', timeout=10)
+    assert run.result('backtest')['# Trades'] > 0 and run.progress == 1
+
+
+def test_identical_queries_reuse_the_session_run_and_the_global_memo():
+    fetcher = CountingFetcher()
+    pipeline = make_pipeline(fetcher)
+    session = TTLCache(maxsize=8, ttl=60)
+    first = pipeline.submit('AAPL último año', session)
+    assert pipeline.submit(' AAPL último año ', session) is first
+    assert first.wait('backtest', timeout=10)
+
+    other_session = pipeline.submit('AAPL último año', TTLCache(maxsize=8, ttl=60))
+    assert other_session is not first and other_session.wait('backtest', timeout=10)
+    assert fetcher.calls == 1
+    assert other_session.result('backtest')['Return [%]'] == first.result('backtest')['Return [%]']
+
+
+def test_sessions_get_their_own_copy_of_a_memoized_result():
+    pipeline = make_pipeline()
+    first = pipeline.submit('AAPL último año', TTLCache(maxsize=8, ttl=60))
+    assert first.wait('backtest', timeout=10)
+    first.result('backtest')['_trades'].drop(first.result('backtest')['_trades'].index, inplace=True)
+    first.result('backtest')['# Trades'] = 0
+
+    other = pipeline.submit('AAPL último año', TTLCache(maxsize=8, ttl=60))
+    assert other.wait('backtest', timeout=10)
+    assert pipeline.cache_stats()['results']['hits'] == 1
+    assert other.result('backtest')['# Trades'] == len(other.result('backtest')['_trades']) > 0
+
+
+def test_new_bars_under_the_same_query_get_a_new_backtest():
+    class UpdatingFetcher(CountingFetcher):
+        def fetch_data(self, parsed):
+            self.calls += 1
+            return prices(n=300 + self.calls)
+
+    pipeline = make_pipeline(UpdatingFetcher())
+    first = pipeline.submit('AAPL último año')
+    assert first.wait('backtest', timeout=10)
+    pipeline.data_cache.clear()  # the fetched bars expire, the query stays the same
+
+    second = pipeline.submit('AAPL último año')
+    assert second.wait('backtest', timeout=10)
+    assert len(second.result('fetch')) == len(first.result('fetch')) + 1
+    assert len(second.result('backtest')['_equity_curve']) == len(second.result('fetch'))
+    assert len(pipeline.db_ops.saved) == 2
+    assert pipeline.cache_stats()['results']['hits'] == 0
+
+
+def test_undated_queries_are_keyed_on_the_resolved_day(monkeypatch):
+    class Today(date):
+        current = date(2024, 6, 4)
+
+        @classmethod
+        def today(cls):
+            return cls.current
+
+    monkeypatch.setattr(data_fetcher, 'date', Today)
+    fetcher = CountingFetcher()
+    pipeline = make_pipeline(fetcher)
+    assert pipeline.submit('AAPL hoy').wait('backtest', timeout=10)
+    assert pipeline.submit('AAPL hoy').wait('backtest', timeout=10)
+    assert fetcher.calls == 1
+
+    Today.current = date(2024, 6, 5)
+    assert pipeline.submit('AAPL hoy').wait('backtest', timeout=10)
+    assert fetcher.calls == 2
+
+
+def test_failed_stage_skips_the_rest():
+    run = make_pipeline().submit('cómo va el mercado')
+    assert run.wait('backtest', timeout=5)
+    assert run.stages['parse']['status'] == 'failed' and run.failed
+    assert [run.stages[stage]['status'] for stage in STAGES[1:]] == ['skipped'] * 3
+    with pytest.raises(ValueError):
+        run.result('parse')
+
+
+def test_date_resolution_errors_fail_the_fetch_stage(monkeypatch):
+    def resolve_range(start, end):
+        raise ValueError(f"Invalid date range: {start} - {end}")
+
+    fetcher = CountingFetcher()
+    monkeypatch.setattr(fetcher, 'resolve_range', resolve_range)
+    run = make_pipeline(fetcher).submit('AAPL último año')
+    assert run.wait('backtest', timeout=5)
+    assert run.stages['parse']['status'] == 'done'
+    assert run.stages['fetch']['status'] == 'failed' and fetcher.calls == 0
+    assert [run.stages[stage]['status'] for stage in STAGES[2:]] == ['skipped'] * 2
+    with pytest.raises(ValueError):
+        run.result('fetch')
@@ -0,0 +1,110 @@
+# tests/test_portfolio.py
+import time
+import numpy as np
+import pandas as pd
+from src.backtesting.fast_engine import run_fast_two_sma
+from src.backtesting.portfolio import compute_portfolio_backtest, forward_fill, portfolio_signals
+from src.backtesting.two_sma import prepare_backtest_data
+from src.database.arrays import PriceMatrix
+from src.database.operations import DatabaseOperations
+from src.signals.indicators import sma
+from tests.test_backtest_persistence import CopyCursor
+from tests.test_fast_engine import random_walk
+
+
+class PortfolioCursor(CopyCursor):
+    """CopyCursor that also answers the portfolio_backtest INSERT ... RETURNING"""
+
+    def execute(self, sql, params=None):
+        self.round_trips += 1
+        self.insert = (sql, params)
+
+    def fetchone(self):
+        return (3,)
+
+
+def random_matrix(n_bars: int, n_tickers: int, seed: int = 0) -> PriceMatrix:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, (n_bars, n_tickers)), axis=0))
+    open_ = np.vstack((close[:1], close[:-1])) * (1 + rng.normal(0, 0.002, (n_bars, n_tickers)))
+    timestamp = pd.bdate_range('2014-01-01', periods=n_bars).to_numpy()
+    return PriceMatrix(timestamp, [f'T{i:03d}' for i in range(n_tickers)], open_, close)
+
+
+def test_long_rows_are_aligned_on_the_union_of_timestamps():
+    rows = pd.DataFrame({
+        'ticker': ['BBB', 'AAA', 'AAA', 'BBB'],
+        'timestamp': pd.to_datetime(['2024-01-03', '2024-01-02', '2024-01-03', '2024-01-04']),
+        'open_price': [20.0, 10.0, 11.0, 21.0],
+        'close_price': [20.5, 10.5, 11.5, 21.5],
+    })
+    prices = PriceMatrix.from_long(rows, ['AAA', 'BBB', 'CCC'])
+    assert prices.tickers == ['AAA', 'BBB']
+    assert list(pd.DatetimeIndex(prices.timestamp).day) == [2, 3, 4]
+    np.testing.assert_array_equal(prices.close, [[10.5, np.nan], [11.5, 20.5], [np.nan, 21.5]])
+    np.testing.assert_array_equal(forward_fill(prices.close), [[10.5, np.nan], [11.5, 20.5], [11.5, 21.5]])
+
+
+def test_matrix_signals_match_per_ticker_crossovers():
+    prices = random_matrix(400, 6, seed=1)
+    sides = portfolio_signals(prices.close, 10, 30)
+    for column in range(6):
+        fast, slow = sma(prices.close[:, column], 10), sma(prices.close[:, column], 30)
+        above = np.nan_to_num(np.sign(fast - slow))
+        golden = np.flatnonzero((above[1:] > 0) & (above[:-1] < 0)) + 1
+        death = np.flatnonzero((above[1:] < 0) & (above[:-1] > 0)) + 1
+        assert np.all(sides[golden, column] == 1) and np.all(sides[death, column] == -1)
+        changes = np.flatnonzero(np.diff(sides[:, column])) + 1
+        assert set(changes) <= set(golden) | set(death)
+
+
+def test_single_ticker_tracks_the_engine_until_its_first_reversal():
+    bt_data = prepare_backtest_data(random_walk(1000, 6))
+    prices = PriceMatrix(bt_data.index.to_numpy(), ['AAA'], bt_data[['Open']].to_numpy(), bt_data[['Close']].to_numpy())
+    # Large cash makes the engine's whole-share sizing negligible next to the portfolio's fractional shares
+    engine = run_fast_two_sma(bt_data, 10, 30, cash=1e7, commission=0)
+    _, _, equity = compute_portfolio_backtest(prices, 10, 30, cash=1e7, commission=0, rebalance_every=0)
+
+    fills = np.flatnonzero(np.diff(portfolio_signals(prices.close, 10, 30)[:, 0])) + 2
+    assert fills[0] == engine['_trades']['EntryBar'].iloc[0]
+    np.testing.assert_allclose(equity.to_numpy()[:fills[1]], engine['_equity_curve']['Equity'].to_numpy()[:fills[1]],
+                               rtol=1e-4)
+
+
+def test_ticker_pnl_adds_up_to_the_portfolio_result():
+    prices = random_matrix(750, 20, seed=2)
+    summary, tickers, equity = compute_portfolio_backtest(prices, 10, 40, cash=50000, commission=0.001)
+    assert np.isclose(equity.iloc[-1], 50000 + tickers['pnl'].sum())
+    assert np.isclose(summary['return_pct'], (equity.iloc[-1] / 50000 - 1) * 100)
+    assert summary['total_trades'] == tickers['total_trades'].sum() > 0
+    assert summary['commission_paid'] > 0 and summary['max_drawdown_pct'] < 0
+
+    free, _, _ = compute_portfolio_backtest(prices, 10, 40, cash=50000, commission=0.0)
+    assert free['equity_final'] > summary['equity_final']
+
+
+def test_flat_book_keeps_its_cash():
+    prices = random_matrix(30, 4, seed=3)
+    summary, tickers, equity = compute_portfolio_backtest(prices, 10, 40)
+    assert summary['total_trades'] == 0 and (equity == equity.iloc[0]).all()
+    assert (tickers['pnl'] == 0).all()
+
+
+def test_large_universe_runs_in_seconds():
+    prices = random_matrix(2520, 500, seed=4)
+    started = time.perf_counter()
+    summary, tickers, _ = compute_portfolio_backtest(prices)
+    assert time.perf_counter() - started < 5
+    assert summary['n_tickers'] == len(tickers) == 500
+
+
+def test_run_and_ticker_rows_are_written_together():
+    prices = random_matrix(300, 3, seed=5)
+    summary, tickers, equity = compute_portfolio_backtest(prices, 5, 20)
+    cursor = PortfolioCursor()
+    assert DatabaseOperations._copy_portfolio(cursor, summary, tickers, equity) == 3
+    assert cursor.round_trips == 2
+    sql, params = cursor.insert
+    assert sql.startswith('INSERT INTO portfolio_backtest') and len(params) == sql.count('%s')
+    rows = cursor.copies['portfolio_ticker']
+    assert [(row['portfolio_id'], row['ticker']) for row in rows] == [('3', 'T000'), ('3', 'T001'), ('3', 'T002')]
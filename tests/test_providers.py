@@ -0,0 +1,106 @@
+# tests/test_providers.py
+import datetime as dt
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from src.api.providers import DataProvider, HedgedFetcher, TABLE_COLUMNS
+from src.api.yahoo_finance import normalize_yahoo_history
+
+PARAMS = {"ticker": "TEST", "timeframe": "daily", "outputsize": "full"}
+
+
+def table_frame(source: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        'ticker': 'TEST',
+        'bar_date': [dt.date(2024, 1, 2)],
+        'bar_time': dt.time(0, 0),
+        'timeframe': 'daily',
+        'open_price': 1.0,
+        'high_price': 2.0,
+        'low_price': 0.5,
+        'close_price': 1.5,
+        'volume': 100,
+        'source': source,
+    })
+
+
+def stub_provider(name: str, delay: float = 0.0, fail: bool = False) -> DataProvider:
+    def fetch(params):
+        time.sleep(delay)
+        if fail:
+            raise ConnectionError(f"{name} is down")
+        return table_frame(name)
+    return DataProvider(name, fetch)
+
+
+def test_primary_within_budget_is_not_hedged():
+    fetcher = HedgedFetcher([stub_provider('primary'), stub_provider('secondary')], hedge_after=0.5)
+    data = fetcher.fetch(PARAMS)
+    assert list(data.columns) == TABLE_COLUMNS
+    stats = fetcher.provider_stats()
+    assert stats['primary']['wins'] == 1
+    assert stats['secondary']['requests'] == 0
+
+
+def test_slow_primary_is_hedged_and_secondary_wins():
+    fetcher = HedgedFetcher([stub_provider('primary', delay=0.5), stub_provider('secondary')], hedge_after=0.05)
+    started = time.perf_counter()
+    data = fetcher.fetch(PARAMS)
+    assert not data.empty
+    assert time.perf_counter() - started < 0.4
+    assert fetcher.provider_stats()['secondary']['wins'] == 1
+
+
+def test_failing_primary_fails_over_without_waiting_for_budget():
+    fetcher = HedgedFetcher([stub_provider('primary', fail=True), stub_provider('secondary')], hedge_after=5)
+    started = time.perf_counter()
+    assert not fetcher.fetch(PARAMS).empty
+    assert time.perf_counter() - started < 1
+    stats = fetcher.provider_stats()
+    assert stats['primary']['errors'] == 1
+    assert stats['primary']['error_rate'] == 1.0
+    assert stats['secondary']['wins'] == 1
+
+
+def test_all_providers_failing_returns_empty_frame():
+    fetcher = HedgedFetcher([stub_provider('a', fail=True), stub_provider('b', fail=True)], hedge_after=0.05)
+    assert fetcher.fetch(PARAMS).empty
+
+
+@pytest.mark.parametrize("timeframe, label, expected", [
+    ("daily", "2024-01-02", dt.date(2024, 1, 2)),
+    ("weekly", "2024-01-01", dt.date(2024, 1, 5)),  # Monday label -> Friday, as Alpha Vantage
+    ("monthly", "2024-03-01", dt.date(2024, 3, 29)),  # first of month -> last business day
+])
+def test_normalize_yahoo_history(timeframe, label, expected):
+    hist = pd.DataFrame({
+        'Open': [1.0], 'High': [2.0], 'Low': [0.5], 'Close': [1.5], 'Adj Close': [1.4], 'Volume': [100]
+    }, index=pd.DatetimeIndex([label], name='Date').tz_localize('America/New_York'))
+    data = normalize_yahoo_history(hist, 'TEST', timeframe)
+    assert list(data.columns) == TABLE_COLUMNS
+    assert data['bar_date'].iloc[0] == expected
+    assert data['bar_time'].iloc[0] == dt.time(0, 0)
+    assert data['close_price'].iloc[0] == 1.5
+    assert data['volume'].dtype == np.int64
+
+
+def test_yahoo_split_adjustment_is_undone_to_match_alpha_vantage():
+    # As traded (Alpha Vantage TIME_SERIES_DAILY): a 4-for-1 split on Jan 4, then 3-for-2 on Jan 9
+    raw_close = np.array([400.0, 404.0, 101.0, 102.0, 103.0, 68.0])
+    raw_volume = np.array([1_000, 1_100, 4_000, 4_200, 4_300, 6_300])
+    ratios = np.array([0, 0, 4, 0, 0, 1.5])
+    # Yahoo divides every bar before a split by its ratio and multiplies the volume
+    later = np.array([6.0, 6.0, 1.5, 1.5, 1.5, 1.0])
+    dates = pd.DatetimeIndex(['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05', '2024-01-08', '2024-01-09'],
+                             name='Date').tz_localize('America/New_York')
+    hist = pd.DataFrame({'Open': raw_close / later, 'High': raw_close * 1.01 / later, 'Low': raw_close * 0.99 / later,
+                         'Close': raw_close / later, 'Volume': raw_volume * later, 'Dividends': 0.0,
+                         'Stock Splits': ratios}, index=dates)
+
+    data = normalize_yahoo_history(hist, 'TEST', 'daily')
+
+    np.testing.assert_allclose(data['close_price'], raw_close, rtol=1e-12)
+    np.testing.assert_allclose(data['high_price'], raw_close * 1.01, rtol=1e-12)
+    np.testing.assert_array_equal(data['volume'], raw_volume)
+    assert list(data.columns) == TABLE_COLUMNS
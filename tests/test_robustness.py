@@ -0,0 +1,48 @@
+# tests/test_robustness.py
+import time
+import numpy as np
+import pytest
+from src.backtesting.robustness import (
+    METRICS, _stitched_metrics, analyze_robustness, block_summaries, path_metrics, trade_returns
+)
+from src.backtesting.two_sma import compute_two_sma_backtest
+from tests.test_fast_engine import random_walk
+
+
+@pytest.fixture(scope='module')
+def result():
+    return compute_two_sma_backtest(random_walk(2520, 2), 'TEST')[0]
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 10])
+def test_block_summaries_reproduce_full_paths(block_size):
+    returns = np.random.default_rng(0).normal(0.0005, 0.02, 1000)
+    n_blocks = -(-len(returns) // block_size)
+    starts = np.random.default_rng(1).integers(0, len(returns), size=(50, n_blocks))
+    full = block_summaries(returns, block_size)
+    tail = block_summaries(returns, len(returns) - (n_blocks - 1) * block_size)
+    stitched = _stitched_metrics(full, tail, starts, len(returns), 252)
+
+    index = ((starts[:, :, None] + np.arange(block_size)) % len(returns)).reshape(50, -1)[:, :len(returns)]
+    expected = path_metrics(returns[index], 252)
+    for metric in METRICS:
+        np.testing.assert_allclose(stitched[metric], expected[metric], rtol=1e-10, atol=1e-10)
+
+
+def test_trade_returns_compound_to_the_final_equity(result):
+    equity = result['_equity_curve']['Equity']
+    closed = equity.iloc[0] + result['_trades']['PnL'].sum()
+    assert equity.iloc[0] * np.prod(1 + trade_returns(result)) == pytest.approx(closed, rel=1e-12)
+
+
+def test_intervals_bracket_their_mean_and_are_reproducible(result):
+    started = time.perf_counter()
+    intervals = analyze_robustness(result, n_paths=10000, seed=3)
+    assert time.perf_counter() - started < 1
+    assert list(intervals['method'].unique()) == ['trade_bootstrap', 'block_bootstrap']
+    assert (intervals['ci_low'] <= intervals['mean']).all() and (intervals['mean'] <= intervals['ci_high']).all()
+    drawdowns = intervals[intervals['metric'] == 'max_drawdown_pct']
+    assert (drawdowns['ci_high'] <= 0).all()
+    block = intervals.set_index(['method', 'metric']).loc[('block_bootstrap', 'return_pct')]
+    assert block['observed'] == pytest.approx(result['Return [%]'])
+    assert analyze_robustness(result, n_paths=10000, seed=3).equals(intervals)
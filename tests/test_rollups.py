@@ -0,0 +1,96 @@
+# tests/test_rollups.py
+from datetime import date
+import pandas as pd
+import pytest
+from src.agents.data_fetcher import DataFetcher
+from src.database import operations
+from src.database.timeseries import LEGACY_LAYOUT, TIMESERIES_LAYOUT
+from tests.test_ohlc_writes import offline_operations
+
+
+class RollupConnection:
+    """Records each rollup statement with its parameters; `written` is the rowcount per timeframe"""
+
+    def __init__(self, written):
+        self.written = written
+        self.executed = []
+
+    def execute(self, statement, params):
+        self.executed.append((' '.join(str(statement).split()), params))
+        return type('Result', (), {'rowcount': self.written[params['timeframe']]})()
+
+
+@pytest.mark.parametrize("layout, timestamp", [(LEGACY_LAYOUT, 'bar_date + bar_time'), (TIMESERIES_LAYOUT, 'ts')],
+                         ids=['legacy', 'timeseries'])
+def test_refresh_rollups_aggregates_only_the_touched_periods(layout, timestamp):
+    connection = RollupConnection({'weekly': 2, 'monthly': 0})
+    ops = offline_operations(connection, layout)
+
+    written = ops.refresh_rollups('AAPL', date(2024, 3, 6), date(2024, 3, 12))
+
+    assert written == {'weekly': 2, 'monthly': 0}
+    assert ops.engine.transactions == 1
+    (weekly_sql, weekly), (monthly_sql, monthly) = connection.executed
+    assert weekly == {'ticker': 'AAPL', 'timeframe': 'weekly', 'unit': 'week', 'source': 'daily',
+                      'start_date': '2024-03-06', 'end_date': '2024-03-12'}
+    assert monthly['unit'] == 'month'
+    # Whole periods around the range, grouped on the period start, from the layout's timestamp
+    assert f"date_trunc(:unit, {timestamp})::date" in weekly_sql
+    assert f"{layout.range_column} >= date_trunc(:unit, CAST(:start_date AS timestamp))" in weekly_sql
+    assert (f"{layout.range_column} < date_trunc(:unit, CAST(:end_date AS timestamp)) "
+            f"+ CAST('1 ' || :unit AS interval)") in weekly_sql
+    assert f"(array_agg(open_price ORDER BY {timestamp}))[1]" in weekly_sql
+    assert f"(array_agg(close_price ORDER BY {timestamp} DESC))[1]" in weekly_sql
+    assert f"FROM {layout.table}" in weekly_sql
+    # Unchanged periods are not rewritten
+    assert "ON CONFLICT ON CONSTRAINT uix_ohlc_rollup DO UPDATE" in weekly_sql
+    assert "IS DISTINCT FROM" in weekly_sql
+    # Only timeframes whose rollups changed drop their cached series
+    assert ops.cache.invalidated == [('AAPL', 'weekly')]
+
+
+def test_refresh_rollups_can_be_limited_to_one_timeframe():
+    connection = RollupConnection({'monthly': 1})
+    ops = offline_operations(connection)
+    assert ops.refresh_rollups('AAPL', '2024-01-01', '2024-01-31', timeframes=['monthly']) == {'monthly': 1}
+    assert [params['timeframe'] for _, params in connection.executed] == ['monthly']
+
+
+@pytest.mark.parametrize("period, bucket", [
+    ('quarter', "date_trunc(:period, bar_date + bar_time)"),
+    ('2 weeks', "date_bin(CAST(:period AS interval), bar_date + bar_time, TIMESTAMP '2000-01-03')"),
+])
+def test_custom_bars_bucket_daily_bars(monkeypatch, period, bucket):
+    queries = []
+
+    def read_sql_query(query, engine, params):
+        queries.append((' '.join(str(query).split()), params))
+        return pd.DataFrame({'ticker': ['AAPL'], 'bar_date': [date(2024, 3, 28)]})
+
+    monkeypatch.setattr(operations.pd, 'read_sql_query', read_sql_query)
+    ops = offline_operations(None)
+
+    bars = ops.get_custom_bars('AAPL', '2024-01-01', '2024-06-30', period)
+
+    assert len(bars) == 1
+    sql, params = queries[0]
+    assert f"GROUP BY ticker, {bucket} ORDER BY 2" in sql
+    assert "max(bar_date) AS bar_date" in sql and ":period AS timeframe" in sql
+    assert params == {'ticker': 'AAPL', 'period': period, 'source': 'daily',
+                      'start_date': '2024-01-01', 'end_date': '2024-06-30'}
+
+
+def test_custom_bars_without_rows_are_none(monkeypatch):
+    monkeypatch.setattr(operations.pd, 'read_sql_query', lambda query, engine, params: pd.DataFrame())
+    assert offline_operations(None).get_custom_bars('AAPL', '2024-01-01', '2024-06-30', 'month') is None
+
+
+@pytest.mark.parametrize("day, timeframe, expected", [
+    (date(2024, 3, 6), 'weekly', date(2024, 3, 4)),  # Wednesday -> Monday
+    (date(2024, 3, 4), 'weekly', date(2024, 3, 4)),  # already a Monday
+    (date(2024, 3, 10), 'weekly', date(2024, 3, 4)),  # Sunday belongs to the week before
+    (date(2024, 3, 6), 'monthly', date(2024, 3, 1)),
+    (date(2024, 2, 29), 'monthly', date(2024, 2, 1)),
+])
+def test_period_start(day, timeframe, expected):
+    assert DataFetcher._period_start(day, timeframe) == expected
@@ -0,0 +1,77 @@
+# tests/test_sma_crossover.py
+import datetime as dt
+import numpy as np
+import pandas as pd
+import pytest
+from src.signals.sma_crossover import DEATH_CROSS, GOLDEN_CROSS, RunningSMA, SMACrossoverStream
+from tests.test_fast_engine import random_walk
+
+
+def intraday_walk(n_days: int = 6, seed: int = 0) -> pd.DataFrame:
+    """Five-minute ohlc_data rows of a regular session: 78 bars per bar_date"""
+    times = pd.date_range('09:30', periods=78, freq='5min').time
+    days = pd.bdate_range('2024-03-04', periods=n_days).date
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.002, n_days * len(times))))
+    return pd.DataFrame({
+        'ticker': 'TEST',
+        'bar_date': np.repeat(days, len(times)),
+        'bar_time': np.tile(times, n_days),
+        'timeframe': '5min',
+        'close_price': close,
+    })
+
+
+def recomputed_events(data: pd.DataFrame, n_fast: int, n_slow: int):
+    """(timestamp, signal) of every crossover, from SMAs recomputed over the whole frame"""
+    timestamps = pd.to_datetime(data['bar_date'].astype(str)) + pd.to_timedelta(data['bar_time'].astype(str))
+    fast = data['close_price'].rolling(n_fast).mean().to_numpy()
+    slow = data['close_price'].rolling(n_slow).mean().to_numpy()
+    events = []
+    for i in range(1, len(data)):
+        if fast[i - 1] < slow[i - 1] and fast[i] > slow[i]:
+            events.append((timestamps[i], GOLDEN_CROSS))
+        elif slow[i - 1] < fast[i - 1] and slow[i] > fast[i]:
+            events.append((timestamps[i], DEATH_CROSS))
+    return events
+
+
+@pytest.mark.parametrize("window", [1, 5, 20])
+def test_running_sma_matches_a_full_recompute(window):
+    values = random_walk(500, 1)['close_price'].to_numpy()
+    running = RunningSMA(window)
+    streamed = [running.update(value) for value in values]
+    expected = pd.Series(values).rolling(window).mean()
+    assert streamed[:window - 1] == [None] * (window - 1)
+    np.testing.assert_allclose(streamed[window - 1:], expected[window - 1:], rtol=1e-12)
+
+
+@pytest.mark.parametrize("data", [random_walk(600, 2), intraday_walk()], ids=['daily', 'intraday'])
+def test_events_match_a_full_recompute(data):
+    events = SMACrossoverStream('TEST', 10, 20).update_many(data)
+    expected = recomputed_events(data, 10, 20)
+    assert len(expected) > 5
+    assert [(event['timestamp'], event['signal']) for event in events] == expected
+
+
+def test_intraday_bars_after_the_first_of_the_day_are_used():
+    data = intraday_walk(n_days=2)
+    stream = SMACrossoverStream('TEST', 10, 20)
+    stream.update_many(data)
+    assert len(stream.slow.values) == 20
+    assert stream.last_timestamp == pd.Timestamp(dt.datetime.combine(data['bar_date'].iloc[-1],
+                                                                     data['bar_time'].iloc[-1]))
+
+
+@pytest.mark.parametrize("data", [random_walk(600, 3), intraday_walk(seed=3)], ids=['daily', 'intraday'])
+def test_snapshot_restore_replays_an_overlap_without_double_counting(data):
+    uninterrupted = SMACrossoverStream('TEST', 10, 20).update_many(data)
+
+    stream = SMACrossoverStream('TEST', 10, 20)
+    split = len(data) // 2
+    first = stream.update_many(data.iloc[:split])
+    restored = SMACrossoverStream.from_snapshot(stream.snapshot())
+    # The refresh job re-reads a window overlapping what was already processed
+    second = restored.update_many(data.iloc[split - 30:])
+
+    assert [event['timestamp'] for event in first + second] == [event['timestamp'] for event in uninterrupted]
+    assert restored.snapshot()['closes'] == pytest.approx(list(data['close_price'].iloc[-20:]))
@@ -0,0 +1,67 @@
+# tests/test_sweep.py
+import time
+import numpy as np
+import pytest
+from src.backtesting.fast_engine import position_mask, simulate_signal_matrix, simulate_signals
+from src.backtesting.sweep import run_two_sma_sweep
+from src.backtesting.two_sma import BACKTEST_CASH, BACKTEST_COMMISSION, compute_two_sma_backtest, prepare_backtest_data
+from tests.test_fast_engine import random_walk
+
+PARITY_COLUMNS = ['Equity Final [$]', 'Return [%]', 'Exposure Time [%]', 'Volatility (Ann.) [%]',
+                  'Sharpe Ratio', 'Max. Drawdown [%]', '# Trades']
+
+
+@pytest.mark.parametrize("seed, pairs", [(3, [(20, 49), (10, 20), (5, 12)]), (5, [(15, 20), (8, 40)])])
+def test_sweep_rows_match_the_engine(seed, pairs):
+    data = random_walk(1258, seed)
+    ranking = run_two_sma_sweep(data, range(5, 25), range(10, 50),
+                                cash=BACKTEST_CASH, commission=BACKTEST_COMMISSION).set_index(['n_fast', 'n_slow'])
+    for n_fast, n_slow in pairs:
+        result, _, _ = compute_two_sma_backtest(data, 'TEST', n_fast, n_slow)
+        row = ranking.loc[(n_fast, n_slow)]
+        np.testing.assert_allclose(row[PARITY_COLUMNS].to_numpy(dtype=float),
+                                   result[PARITY_COLUMNS].to_numpy(dtype=float), rtol=1e-9, equal_nan=True)
+
+
+def test_ranking_is_sorted_on_the_objective():
+    ranking = run_two_sma_sweep(random_walk(600, 1), range(5, 15), range(10, 40), maximize='Sharpe Ratio', top=10)
+    assert len(ranking) == 10
+    assert ranking['Sharpe Ratio'].is_monotonic_decreasing
+    assert (ranking['n_fast'] < ranking['n_slow']).all()
+
+
+@pytest.mark.parametrize("seed, trend", [(0, 1), (1, 0.05), (2, 64)])
+def test_signal_matrix_matches_the_single_column_broker(seed, trend):
+    # Dense random signals stack several same-side trades and reduce them partially; the rising
+    # trend wipes out short positions, the falling one long positions
+    rng = np.random.default_rng(seed)
+    bt_data = prepare_backtest_data(random_walk(300, seed))
+    drift = np.linspace(1, trend, len(bt_data))
+    open_, close = bt_data['Open'].to_numpy() * drift, bt_data['Close'].to_numpy() * drift
+    draws = rng.random((len(close), 40))
+    density = rng.choice([0.02, 0.1, 0.4], 40)
+    buy, sell = draws < density / 2, (draws >= density / 2) & (draws < density)
+    starts = rng.integers(0, 60, 40)
+    for column, start in enumerate(starts):
+        buy[:start, column] = sell[:start, column] = False
+
+    equity, closed = simulate_signal_matrix(open_, close, buy, sell, 10000, 0.002)
+    for column, start in enumerate(starts):
+        expected_equity, expected_closed = simulate_signals(open_, close, buy[:, column], sell[:, column], start,
+                                                            10000, 0.002)
+        expected_closed = np.array(expected_closed, dtype=float).reshape(-1, 5)[:, 1:3].astype(int)
+        pair_closed = closed[closed[:, 0] == column]
+        np.testing.assert_array_equal(equity[column], expected_equity)
+        assert len(pair_closed) == len(expected_closed)
+        np.testing.assert_array_equal(position_mask(pair_closed[:, 1], pair_closed[:, 2], len(close)),
+                                      position_mask(expected_closed[:, 0], expected_closed[:, 1], len(close)))
+
+
+def test_full_grid_on_five_years_of_daily_bars_stays_under_a_second():
+    # 680 pairs of the default 20 x 40 grid on 1,258 bars (about 0.2 s here); the budget leaves room for slow CI
+    data = random_walk(1258, 7)
+    run_two_sma_sweep(data)
+    began = time.perf_counter()
+    ranking = run_two_sma_sweep(data)
+    assert len(ranking) == 680
+    assert time.perf_counter() - began < 1.0
@@ -0,0 +1,67 @@
+# tests/test_timeseries_layout.py
+import datetime as dt
+from contextlib import nullcontext
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from src.database import timeseries
+from src.database.timeseries import (
+    LEGACY_LAYOUT, TIMESERIES_LAYOUT, ensure_partitions, partition_bounds, to_layout_rows
+)
+
+
+def table_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        'ticker': 'TEST',
+        'bar_date': [dt.date(2024, 1, 2), dt.date(2024, 1, 2)],
+        'bar_time': [dt.time(9, 30), dt.time(9, 35)],
+        'timeframe': '5min',
+        'open_price': [1.0, 1.1],
+        'high_price': [2.0, 2.1],
+        'low_price': [0.5, 0.6],
+        'close_price': [1.5, 1.6],
+        'volume': [100, 200],
+    })
+
+
+def test_timeseries_rows_merge_date_and_time():
+    rows = to_layout_rows(table_frame(), TIMESERIES_LAYOUT)
+    assert list(rows.columns) == TIMESERIES_LAYOUT.columns
+    assert list(rows['ts']) == [pd.Timestamp('2024-01-02 09:30'), pd.Timestamp('2024-01-02 09:35')]
+    assert rows['close_price'].dtype == np.float64
+
+
+def test_legacy_rows_are_unchanged():
+    data = table_frame()
+    assert to_layout_rows(data, LEGACY_LAYOUT).equals(data[LEGACY_LAYOUT.columns])
+
+
+@pytest.mark.parametrize("interval, names, first_start, last_end", [
+    ('year', ['ohlc_bars_2023', 'ohlc_bars_2024'], dt.date(2023, 1, 1), dt.date(2025, 1, 1)),
+    ('month', ['ohlc_bars_2023_12', 'ohlc_bars_2024_01', 'ohlc_bars_2024_02'], dt.date(2023, 12, 1),
+     dt.date(2024, 3, 1)),
+])
+def test_partition_bounds_cover_the_range(interval, names, first_start, last_end):
+    partitions = partition_bounds(dt.date(2023, 12, 15), dt.date(2024, 2, 10), interval)
+    assert [p['name'] for p in partitions] == names
+    assert partitions[0]['start'] == first_start
+    assert partitions[-1]['end'] == last_end
+    assert all(a['end'] == b['start'] for a, b in zip(partitions, partitions[1:]))
+
+
+@pytest.mark.parametrize("fails", [False, True])
+def test_partitions_are_remembered_only_once_committed(monkeypatch, fails):
+    monkeypatch.setattr(timeseries, '_known_partitions', set())
+    statements = []
+    engine = create_engine('sqlite://')
+    with pytest.raises(RuntimeError) if fails else nullcontext():
+        with engine.begin() as conn:
+            # SQLite has no partitions: record the DDL instead of running it
+            monkeypatch.setattr(conn, 'execute', lambda statement: statements.append(str(statement)))
+            ensure_partitions(conn, dt.date(2023, 6, 1), dt.date(2024, 2, 1), 'year')
+            assert not timeseries._known_partitions
+            if fails:
+                raise RuntimeError("upsert failed")
+    assert sum('CREATE TABLE' in statement for statement in statements) == 2
+    assert timeseries._known_partitions == (set() if fails else {'ohlc_bars_2023', 'ohlc_bars_2024'})
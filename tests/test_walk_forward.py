@@ -0,0 +1,93 @@
+# tests/test_walk_forward.py
+import pytest
+from src.backtesting.two_sma import compute_two_sma_backtest, prepare_backtest_data
+from src.backtesting.walk_forward import compute_walk_forward, walk_forward_folds
+from src.database.operations import DatabaseOperations
+from tests.test_backtest_persistence import CopyCursor
+from tests.test_fast_engine import random_walk
+
+
+class WalkForwardCursor(CopyCursor):
+    """CopyCursor that also answers the walk_forward_run INSERT ... RETURNING"""
+
+    def execute(self, sql, params=None):
+        if sql.startswith('INSERT INTO walk_forward_run'):
+            self.round_trips += 1
+            self.run = params
+        else:
+            super().execute(sql, params)
+
+    def fetchone(self):
+        return (7,)
+
+
+@pytest.mark.parametrize("anchored", [False, True])
+def test_folds_tile_the_end_of_the_series(anchored):
+    folds = walk_forward_folds(1000, 8, anchored=anchored)
+    assert folds[-1].test_end == 1000
+    assert all(a.test_end == b.test_start for a, b in zip(folds, folds[1:]))
+    assert all(fold.train_end == fold.test_start for fold in folds)
+    test_bars = folds[0].test_end - folds[0].test_start
+    if anchored:
+        assert len({fold.train_start for fold in folds}) == 1
+    else:
+        assert len({fold.train_end - fold.train_start for fold in folds}) == 1
+        assert folds[0].train_end - folds[0].train_start >= 4 * test_bars
+
+
+def test_too_many_folds_are_rejected():
+    with pytest.raises(ValueError):
+        walk_forward_folds(30, 40)
+
+
+def test_out_of_sample_trades_stay_in_their_test_window():
+    run, folds = compute_walk_forward(random_walk(900, 4), 'TEST', n_folds=5, max_workers=1,
+                                      fast_windows=range(5, 10), slow_windows=range(15, 30, 5))
+    assert run['n_folds'] == 5 and run['start_date'] == folds[0]['test_start']
+    for fold in folds:
+        assert fold['train_end'] < fold['test_start']
+        assert 5 <= fold['n_fast'] < 10 and fold['n_slow'] in (15, 20, 25)
+        assert all(trade['buy_date'] >= fold['test_start'].date() for trade in fold['details'])
+
+
+def test_out_of_sample_stats_cover_the_test_window_only():
+    data = random_walk(900, 8)
+    bt_data = prepare_backtest_data(data)
+    run, folds = compute_walk_forward(data, 'TEST', n_folds=4, max_workers=1,
+                                      fast_windows=range(5, 10), slow_windows=range(15, 45, 10))
+    for fold in folds:
+        test = bt_data.loc[fold['test_start']:fold['test_end']]
+        equity = fold['equity']
+        # No warm-up bar before test_start in the curve, the stats or the trades
+        assert equity.index[0] == fold['test_start'] and len(equity) == len(test)
+        assert equity.iloc[0] == 10000
+        assert fold['summary']['start_date'] == fold['test_start']
+        assert fold['summary']['buy_hold_return_pct'] == pytest.approx(
+            (test['Close'].iloc[-1] / test['Close'].iloc[0] - 1) * 100)
+        assert all((trade['buy_date'], trade['buy_time']) > (fold['test_start'].date(), fold['test_start'].time())
+                   for trade in fold['details'])
+
+
+@pytest.mark.parametrize("maximize", ['Return [%]', 'Sharpe Ratio'])
+def test_in_sample_figures_come_from_the_engine(maximize):
+    data = random_walk(800, 6)
+    bt_data = prepare_backtest_data(data)
+    run, folds = compute_walk_forward(data, 'TEST', n_folds=3, max_workers=1, maximize=maximize,
+                                      fast_windows=range(5, 15), slow_windows=range(15, 40, 5))
+    for fold in folds:
+        train = bt_data.loc[fold['train_start']:fold['train_end']]
+        result, _, _ = compute_two_sma_backtest(train, 'TEST', fold['n_fast'], fold['n_slow'])
+        assert fold['in_sample_return_pct'] == pytest.approx(result['Return [%]'], rel=1e-9)
+        assert fold['in_sample_score'] == pytest.approx(result[maximize], rel=1e-9)
+
+
+def test_run_folds_and_backtests_are_written_together():
+    run, folds = compute_walk_forward(random_walk(600, 5), 'TEST', n_folds=3, max_workers=1,
+                                      fast_windows=[5, 10], slow_windows=[20, 30])
+    cursor = WalkForwardCursor()
+    assert DatabaseOperations._copy_walk_forward(cursor, run, folds) == 7
+    assert cursor.round_trips == 6  # reserve ids, 3 backtest COPYs, run insert, fold COPY
+    rows = cursor.copies['walk_forward_fold']
+    assert [(row['run_id'], row['fold_number'], row['test_id']) for row in rows] == [
+        ('7', '1', '100'), ('7', '2', '101'), ('7', '3', '102')
+    ]